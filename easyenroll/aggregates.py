@@ -0,0 +1,196 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, CharField, Count, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import TruncMonth
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from modulo_secundaria import bulk, response_cache
+
+from .models import Inscripcion, Pago, ResumenPagoDiario
+
+CENTS = Decimal('0.01')
+# (label, lowest, highest) discount percentages of each bucket.
+DISCOUNT_BUCKETS = [('0', 0, 0), ('1-10', 1, 10), ('11-25', 11, 25), ('26-50', 26, 50), ('51-100', 51, 100)]
+GROUPINGS = ('day', 'month', 'metodoPago', 'descuento', 'modalidadPago')
+SUMMARIZED_FIELDS = ('fechaPago', 'metodoPago', 'descuento', 'monto')
+
+
+def discount_bucket(field='descuento'):
+    return Case(
+        *[When(**{field + '__range': (low, high)}, then=Value(label)) for label, low, high in DISCOUNT_BUCKETS],
+        default=Value('otro'),
+        output_field=CharField(),
+    )
+
+
+def record(payments):
+    """Add newly created payments to the daily summary, in the caller's transaction.
+
+    Payments saved or deleted one at a time, or inserted by
+    modulo_secundaria.bulk, are kept in the summary by the signal handlers
+    below; other bulk_create callers call this.
+    """
+    _apply(_deltas([_summarized(payment) for payment in payments], 1))
+
+
+def _summarized(payment):
+    return payment.fechaPago, payment.metodoPago, payment.descuento, payment.monto
+
+
+def _deltas(rows, sign, deltas=None):
+    deltas = defaultdict(lambda: [0, Decimal(0)]) if deltas is None else deltas
+    for fecha, metodo_pago, descuento, monto in rows:
+        delta = deltas[(fecha, metodo_pago, descuento)]
+        delta[0] += sign
+        delta[1] += sign * Decimal(str(monto)).quantize(CENTS)
+    return deltas
+
+
+def _apply(deltas):
+    deltas = {key: delta for key, delta in deltas.items() if delta[0] or delta[1]}
+    if not deltas:
+        return
+    with transaction.atomic():
+        # A fixed order keeps concurrent writers from deadlocking on the rows.
+        for (fecha, metodo_pago, descuento), (cantidad, total) in sorted(deltas.items()):
+            _add(fecha, metodo_pago, descuento, cantidad, total)
+    response_cache.bump_on_commit(ResumenPagoDiario)
+
+
+def _add(fecha, metodo_pago, descuento, cantidad, total):
+    rows = ResumenPagoDiario.objects.filter(fecha=fecha, metodoPago=metodo_pago, descuento=descuento)
+    if cantidad < 0:
+        # Only removes payments the row already counts; an emptied row goes away.
+        rows.update(cantidad=F('cantidad') + cantidad, total=F('total') + total)
+        rows.filter(cantidad__lte=0).delete()
+        return
+    if rows.update(cantidad=F('cantidad') + cantidad, total=F('total') + total):
+        return
+    try:
+        with transaction.atomic():
+            rows.create(fecha=fecha, metodoPago=metodo_pago, descuento=descuento, cantidad=cantidad, total=total)
+    except IntegrityError:
+        # Another transaction created the row between our update and insert.
+        rows.update(cantidad=F('cantidad') + cantidad, total=F('total') + total)
+
+
+def _on_pre_save(sender, instance, raw=False, using=None, update_fields=None, **kwargs):
+    # What the stored row contributes, to be taken out again once the update is saved.
+    instance._summarized = None
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and set(SUMMARIZED_FIELDS).isdisjoint(update_fields):
+        return
+    instance._summarized = Pago.objects.using(using).filter(pk=instance.pk).values_list(*SUMMARIZED_FIELDS).first()
+
+
+def _on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    stored = getattr(instance, '_summarized', None)
+    if created or stored is not None:
+        _apply(_deltas([_summarized(instance)], 1, _deltas([stored] if stored else [], -1)))
+    instance._summarized = None
+
+
+def _on_delete(sender, instance, **kwargs):
+    _apply(_deltas([_summarized(instance)], -1))
+
+
+def _on_insert(sender, instances, **kwargs):
+    record(instances)
+
+
+def connect_signals():
+    pre_save.connect(_on_pre_save, sender=Pago, dispatch_uid='payment_summary_pre_save')
+    post_save.connect(_on_save, sender=Pago, dispatch_uid='payment_summary_save')
+    post_delete.connect(_on_delete, sender=Pago, dispatch_uid='payment_summary_delete')
+    bulk.inserted.connect(_on_insert, sender=Pago, dispatch_uid='payment_summary_insert')
+
+
+@transaction.atomic
+def rebuild(desde=None, hasta=None):
+    """Recompute the summary from Pago, optionally only for a date range.
+
+    Returns the number of summary rows written.
+    """
+    if connection.vendor == 'postgresql':
+        # Payments recorded meanwhile wait for the rebuild instead of being lost.
+        with connection.cursor() as cursor:
+            cursor.execute('LOCK TABLE %s IN EXCLUSIVE MODE' % connection.ops.quote_name(ResumenPagoDiario._meta.db_table))
+    summary = ResumenPagoDiario.objects.all()
+    payments = Pago.objects.all()
+    if desde is not None:
+        summary = summary.filter(fecha__gte=desde)
+        payments = payments.filter(fechaPago__gte=desde)
+    if hasta is not None:
+        summary = summary.filter(fecha__lte=hasta)
+        payments = payments.filter(fechaPago__lte=hasta)
+    summary.delete()
+
+    rows = payments.values('fechaPago', 'metodoPago', 'descuento').annotate(cantidad=Count('pk'), total=Sum('monto')).order_by()
+    created = ResumenPagoDiario.objects.bulk_create([
+        ResumenPagoDiario(
+            fecha=row['fechaPago'], metodoPago=row['metodoPago'], descuento=row['descuento'],
+            cantidad=row['cantidad'], total=row['total'],
+        )
+        for row in rows.iterator()
+    ], batch_size=1000)
+    response_cache.bump_on_commit(ResumenPagoDiario)
+    return len(created)
+
+
+def totals(group_by=None, desde=None, hasta=None, metodo_pago=None):
+    """Payment count, total and average, overall or per ``group_by`` key.
+
+    Everything but ``modalidadPago`` reads the daily summary; modalidadPago
+    lives on Inscripcion, so enrolled payments are aggregated directly, each
+    once under the modalidadPago of its first enrollment.
+    """
+    if group_by == 'modalidadPago':
+        first_enrollment = Inscripcion.objects.filter(idPago=OuterRef('pk')).order_by('pk')
+        rows = Pago.objects.annotate(
+            modalidadPago=Subquery(first_enrollment.values('modalidadPago')[:1]),
+        ).filter(modalidadPago__isnull=False)
+        date_field = 'fechaPago'
+        key = F('modalidadPago')
+        count, total = Count('pk'), Sum('monto')
+    else:
+        rows = ResumenPagoDiario.objects.all()
+        date_field = 'fecha'
+        key = {
+            None: None,
+            'day': F('fecha'),
+            'month': TruncMonth('fecha'),
+            'metodoPago': F('metodoPago'),
+            'descuento': discount_bucket(),
+        }[group_by]
+        count, total = Sum('cantidad'), Sum('total')
+    if desde is not None:
+        rows = rows.filter(**{date_field + '__gte': desde})
+    if hasta is not None:
+        rows = rows.filter(**{date_field + '__lte': hasta})
+    if metodo_pago is not None:
+        rows = rows.filter(metodoPago=metodo_pago)
+
+    if key is None:
+        results = [dict(rows.aggregate(count=count, total=total), key=None)]
+    else:
+        results = rows.values(key=key).annotate(count=count, total=total).order_by('key')
+    return [_total(row, group_by) for row in results]
+
+
+def _total(row, group_by):
+    key, count, total = row['key'], row['count'] or 0, row['total'] or Decimal(0)
+    if group_by == 'month':
+        key = key.strftime('%Y-%m')
+    elif group_by == 'day':
+        key = key.isoformat()
+    return {
+        'key': key,
+        'count': count,
+        'total': total,
+        'average': (total / count).quantize(CENTS) if count else None,
+    }
@@ -3,3 +3,15 @@ from django.apps import AppConfig
 
 class EasyenrollConfig(AppConfig):
     name = 'easyenroll'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from modulo_secundaria import response_cache
+
+        from . import aggregates, changes, search
+
+        response_cache.connect_signals()
+        changes.connect_signals()
+        aggregates.connect_signals()
+        connection_created.connect(search.register_functions, dispatch_uid='search_functions')
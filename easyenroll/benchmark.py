@@ -0,0 +1,331 @@
+import asyncio
+import datetime
+import json
+import math
+import time
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from modulo_secundaria.pagination import pk_to_cursor
+from modulo_secundaria.views import in_flight
+
+from .models import Alumno, Documento, Inscripcion, Pago
+from .seed import APELLIDOS, GRUPOS, METODOS_PAGO, NOMBRES
+
+
+class State:
+    """Ids and counters that workloads draw their variables from."""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.counter = 0
+        self.student_ids = list(Alumno.objects.values_list('id', flat=True))
+        self.payment_ids = list(Pago.objects.values_list('idPago', flat=True))
+        self.enrollment_ids = list(Inscripcion.objects.values_list('id', flat=True))
+        self.user_ids = list(get_user_model().objects.values_list('pk', flat=True))
+        self.document_ids = list(Documento.objects.values_list('sha256', flat=True)[:100])
+
+    def next(self):
+        self.counter += 1
+        return self.counter
+
+    def student(self):
+        return self.rng.choice(self.student_ids)
+
+    def payment(self):
+        return self.rng.choice(self.payment_ids)
+
+    def enrollment(self):
+        return self.rng.choice(self.enrollment_ids)
+
+    def user(self):
+        return self.rng.choice(self.user_ids)
+
+    def document(self):
+        return self.rng.choice(self.document_ids)
+
+
+class Workload:
+    def __init__(self, name, query, variables=None, weight=1):
+        self.name = name
+        self.query = query
+        self.variables = variables or (lambda state: {})
+        self.weight = weight
+
+
+def student_input(state):
+    number = state.next()
+    return {
+        'nombre': 'Bench',
+        'apellidoPaterno': 'Alumno',
+        'apellidoMaterno': str(number),
+        'correoInstitucional': 'bench%d@secundaria.edu.mx' % number,
+        'curp': 'BENC%014d' % number,
+        'sexo': state.rng.choice('HM'),
+        'escuelaProcedencia': 'Primaria Benito Juárez',
+        'gradoGrupoAsignado': state.rng.choice(GRUPOS),
+    }
+
+
+def payment_input(state):
+    return {
+        'recibo': state.document(),
+        'descuento': 0,
+        'idRecibo': 10 ** 8 + state.next(),
+        'monto': 2500,
+        'fechaPago': datetime.date.today().isoformat(),
+        'metodoPago': state.rng.choice(METODOS_PAGO),
+    }
+
+
+def tutor_input(state):
+    return {
+        'nombrePadreTutor': 'Tutor Bench',
+        'curpTutor': 'TUTB%014d' % state.next(),
+        'scanIne': state.document(),
+        'telefono': '5555555555',
+        'scanComprobanteDomicilio': state.document(),
+        'emailPadreTutor': 'tutor@example.com',
+    }
+
+
+WORKLOADS = [
+    Workload('studentsPage', '''
+        query ($after: String) {
+          students(first: 50, after: $after) {
+            edges { node { id nombre apellidoPaterno apellidoMaterno curp gradoGrupoAsignado } }
+            pageInfo { hasNextPage endCursor }
+          }
+        }''', lambda state: {'after': pk_to_cursor(state.student())}, weight=4),
+    Workload('studentsByGroup', '''
+        query ($grupo: String) {
+          students(first: 50, gradoGrupoAsignado: $grupo) { edges { node { id nombre curp } } }
+        }''', lambda state: {'grupo': state.rng.choice(GRUPOS)}, weight=2),
+    Workload('studentsNested', '''
+        query ($after: String) {
+          students(first: 20, after: $after) {
+            edges { node {
+              id nombre curp
+              inscripcionSet { tipoInscripcion modalidadPago idPago { monto fechaPago metodoPago } }
+              padrestutoresSet { nombrePadreTutor telefono }
+              anexoalumnosSet { lateralidad usoDeLentes }
+            } }
+          }
+        }''', lambda state: {'after': pk_to_cursor(state.student())}, weight=3),
+    Workload('enrollmentsNested', '''
+        query ($after: String) {
+          enrollments(first: 50, after: $after) {
+            edges { node {
+              id factura tipoInscripcion
+              idAlumno { nombre curp gradoGrupoAsignado }
+              idPago { monto fechaPago }
+              idUsuario { username }
+            } }
+          }
+        }''', lambda state: {'after': pk_to_cursor(state.enrollment())}, weight=3),
+    Workload('paymentsByDate', '''
+        query ($desde: Date, $metodo: String) {
+          payments(first: 50, fechaPagoDesde: $desde, metodoPago: $metodo) {
+            edges { node { idPago monto fechaPago metodoPago inscripcionSet { idAlumno { nombre } } } }
+          }
+        }''', lambda state: {
+            'desde': (datetime.date.today() - datetime.timedelta(days=state.rng.randrange(365))).isoformat(),
+            'metodo': state.rng.choice(METODOS_PAGO),
+        }, weight=2),
+    Workload('searchStudents', '''
+        query ($text: String!) { searchStudents(text: $text, first: 10) { id nombre apellidoPaterno apellidoMaterno curp } }
+    ''', lambda state: {
+        'text': '%s %s' % (state.rng.choice(NOMBRES)[:3], state.rng.choice(APELLIDOS)[:2]),
+    }, weight=3),
+    Workload('tutorsNested', '''
+        query { tutors(first: 50) { edges { node { nombrePadreTutor curpTutor alumno { nombre curp } } } } }
+    '''),
+    Workload('annexesNested', '''
+        query { annexes(first: 50) { edges { node { lateralidad observaciones idAlumno { nombre } } } } }
+    '''),
+    Workload('users', 'query { users(first: 20) { edges { node { id username email } } } }'),
+    Workload('dashboard', '''
+        query ($grupo: String) {
+          students(first: 20, gradoGrupoAsignado: $grupo) { edges { node { id nombre curp } } }
+          payments(first: 20) { edges { node { idPago monto fechaPago } } }
+          paymentTotals(groupBy: METODO_PAGO) { key count total }
+          users(first: 10) { edges { node { username } } }
+        }''', lambda state: {'grupo': state.rng.choice(GRUPOS)}),
+    Workload('createStudent', '''
+        mutation ($nombre: String, $apellidoPaterno: String, $apellidoMaterno: String, $correoInstitucional: String,
+                  $curp: String, $sexo: String, $escuelaProcedencia: String, $gradoGrupoAsignado: String) {
+          createStudent(nombre: $nombre, apellidoPaterno: $apellidoPaterno, apellidoMaterno: $apellidoMaterno,
+                        correoInstitucional: $correoInstitucional, curp: $curp, sexo: $sexo,
+                        escuelaProcedencia: $escuelaProcedencia, gradoGrupoAsignado: $gradoGrupoAsignado) { id }
+        }''', student_input),
+    Workload('createPayment', '''
+        mutation ($recibo: String, $descuento: Int, $idRecibo: Int, $monto: Float, $fechaPago: Date, $metodoPago: String) {
+          createPayment(recibo: $recibo, descuento: $descuento, idRecibo: $idRecibo, monto: $monto,
+                        fechaPago: $fechaPago, metodoPago: $metodoPago) { idPago }
+        }''', payment_input),
+    Workload('createTutor', '''
+        mutation ($nombrePadreTutor: String, $curpTutor: String, $scanIne: String, $telefono: String,
+                  $scanComprobanteDomicilio: String, $emailPadreTutor: String, $alumnoId: Int) {
+          createTutor(nombrePadreTutor: $nombrePadreTutor, curpTutor: $curpTutor, scanIne: $scanIne,
+                      telefono: $telefono, scanComprobanteDomicilio: $scanComprobanteDomicilio,
+                      emailPadreTutor: $emailPadreTutor, alumnoId: $alumnoId) { id alumno { nombre } }
+        }''', lambda state: dict(tutor_input(state), alumnoId=state.student())),
+    Workload('createEnrollment', '''
+        mutation ($idAlumno: Int, $idPago: Int, $idUsuario: Int) {
+          createEnrollment(factura: false, tipoInscripcion: "R", modalidadPago: "C",
+                           idAlumno: $idAlumno, idPago: $idPago, idUsuario: $idUsuario) { id alumno { nombre } pago { monto } }
+        }''', lambda state: {'idAlumno': state.student(), 'idPago': state.payment(), 'idUsuario': state.user()}),
+    Workload('createAnnex', '''
+        mutation ($idAlumno: Int) {
+          createAnnex(cartaBuenaConducta: true, certificadoPrimaria: true, curpAlumno: true, actaNacimiento: true,
+                      observaciones: "", cda: "", autorizacionIrseSolo: false, autorizacionPublicitaria: true,
+                      atencionPsicologica: false, padecimiento: "", usoAparatoAuditivo: false, usoDeLentes: false,
+                      lateralidad: "D", idAlumno: $idAlumno) { id }
+        }''', lambda state: {'idAlumno': state.student()}),
+    Workload('createStudentsBulk', '''
+        mutation ($input: [StudentInput!]!) { createStudents(input: $input) { students { id } errors { index } } }
+    ''', lambda state: {'input': [student_input(state) for _ in range(20)]}),
+    Workload('enrollStudent', '''
+        mutation ($student: StudentInput!, $tutors: [TutorInput!], $payment: PaymentInput!, $idUsuario: Int!) {
+          enrollStudent(student: $student, tutors: $tutors, payment: $payment, annex: {lateralidad: "D"},
+                        tipoInscripcion: "N", modalidadPago: "C", idUsuario: $idUsuario) {
+            enrollment { id idAlumno { id } }
+          }
+        }''', lambda state: {
+            'student': student_input(state),
+            'tutors': [tutor_input(state), tutor_input(state)],
+            'payment': payment_input(state),
+            'idUsuario': state.user(),
+        }),
+    Workload('createUser', '''
+        mutation ($username: String!) {
+          createUser(username: $username, password: "bench-password", email: "bench@example.com") { user { id } }
+        }''', lambda state: {'username': 'bench%d' % state.next()}),
+    Workload('createUsersBulk', '''
+        mutation ($input: [UserInput!]!) { createUsers(input: $input) { users { id } errors { index } } }
+    ''', lambda state: {'input': [
+        {'username': 'bench%d' % state.next(), 'password': 'bench-password', 'email': 'bench@example.com'}
+        for _ in range(8)
+    ]}),
+]
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def summarize(latencies, sql_counts, errors):
+    latencies = sorted(latencies)
+    total = sum(latencies)
+    return {
+        'operations': len(latencies),
+        'opsPerSecond': round(len(latencies) / total, 2) if total else 0.0,
+        'p50Ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95Ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99Ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'sqlQueries': max(sql_counts) if sql_counts else 0,
+        'errors': errors,
+    }
+
+
+def execute(client, workload, state, path='/graphql/'):
+    """Run one operation; return (seconds, SQL statements, GraphQL errors)."""
+    body = json.dumps({'query': workload.query, 'variables': workload.variables(state)})
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        response = client.post(path, body, content_type='application/json')
+        elapsed = time.perf_counter() - started
+    errors = response.status_code != 200 or bool(json.loads(response.content).get('errors'))
+    return elapsed, len(queries), errors
+
+
+def run(client, workloads, state, iterations, warmup=2):
+    """Run every workload ``iterations * weight`` times in a seeded random order."""
+    for workload in workloads:
+        for _ in range(warmup):
+            execute(client, workload, state)
+
+    schedule = [workload for workload in workloads for _ in range(iterations * workload.weight)]
+    state.rng.shuffle(schedule)
+    samples = {workload.name: {'latencies': [], 'sql_counts': [], 'errors': 0} for workload in workloads}
+    started = time.perf_counter()
+    for workload in schedule:
+        elapsed, sql, failed = execute(client, workload, state)
+        sample = samples[workload.name]
+        sample['latencies'].append(elapsed)
+        sample['sql_counts'].append(sql)
+        sample['errors'] += failed
+    wall = time.perf_counter() - started
+
+    return {
+        'total': {
+            'operations': len(schedule),
+            'seconds': round(wall, 3),
+            'opsPerSecond': round(len(schedule) / wall, 2) if wall else 0.0,
+        },
+        'operations': {name: summarize(**sample) for name, sample in samples.items()},
+    }
+
+
+def run_concurrently(client, workloads, state, path, requests, concurrency):
+    """Send ``requests`` read operations to ``path`` through an AsyncClient,
+    at most ``concurrency`` in flight at once."""
+    reads = [workload for workload in workloads if not workload.query.lstrip().startswith('mutation')]
+    params = []
+    for _ in range(requests if reads else 0):
+        workload = state.rng.choice(reads)
+        params.append(urlencode({'query': workload.query, 'variables': json.dumps(workload.variables(state))}))
+
+    async def send(semaphore, query_string):
+        async with semaphore:
+            started = time.perf_counter()
+            # GET with the query string in the path: Django 3.1's AsyncClient
+            # mangles POST bodies' Content-Length and drops GET data.
+            response = await client.get(path + '?' + query_string)
+            elapsed = time.perf_counter() - started
+        return elapsed, response.status_code != 200 or bool(json.loads(response.content).get('errors'))
+
+    async def send_all():
+        semaphore = asyncio.Semaphore(concurrency)
+        return await asyncio.gather(*[send(semaphore, query_string) for query_string in params])
+
+    in_flight.reset_peak()
+    started = time.perf_counter()
+    responses = asyncio.run(send_all())
+    wall = time.perf_counter() - started
+    latencies = sorted(elapsed for elapsed, failed in responses)
+    return {
+        'concurrency': concurrency,
+        'operations': len(responses),
+        'opsPerSecond': round(len(responses) / wall, 2) if wall else 0.0,
+        'p50Ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95Ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'peakInFlight': in_flight.peak,
+        'errors': sum(failed for elapsed, failed in responses),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Regressions of ``results`` against ``baseline``, as readable messages.
+
+    Any extra SQL statement is a regression; latency may drift by ``tolerance``.
+    """
+    recorded_on = baseline.get('meta', {}).get('database')
+    if recorded_on != results['meta']['database']:
+        return ['baseline was recorded on %s, this run used %s' % (recorded_on, results['meta']['database'])]
+    regressions = []
+    for name, before in baseline['operations'].items():
+        after = results['operations'].get(name)
+        if after is None:
+            continue
+        if after['sqlQueries'] > before['sqlQueries']:
+            regressions.append('%s: %d SQL queries, baseline %d' % (name, after['sqlQueries'], before['sqlQueries']))
+        if after['p95Ms'] > before['p95Ms'] * (1 + tolerance):
+            regressions.append('%s: p95 %.1f ms, baseline %.1f ms' % (name, after['p95Ms'], before['p95Ms']))
+    return regressions
@@ -0,0 +1,111 @@
+from django.db import connection, connections, router
+from django.db.models import BigIntegerField, Exists, Func, Max, OuterRef, Q
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+
+from modulo_secundaria import bulk, response_cache
+
+from .models import Alumno, AnexoAlumnos, Cambio, Inscripcion, PadresTutores, Pago
+
+INSERT, UPDATE, DELETE = 'I', 'U', 'D'
+# Rows the front-desk clients keep offline copies of, by Cambio.modelo.
+TRACKED = {model._meta.model_name: model for model in [Alumno, PadresTutores, Inscripcion, Pago, AnexoAlumnos]}
+BATCH_SIZE = 1000
+TRANSACTION_ID = Func(function='txid_current', output_field=BigIntegerField())
+# Transactions below this id have all committed or rolled back.
+OLDEST_RUNNING = RawSQL('txid_snapshot_xmin(txid_current_snapshot())', [], output_field=BigIntegerField())
+
+
+def record(model, pks, operation, using=None):
+    """Log ``operation`` on the rows ``pks`` of ``model``.
+
+    Call it inside the transaction that makes the change: the entries commit
+    (or roll back) with it. On PostgreSQL each entry holds the id of its
+    transaction, which changes_since uses to hand entries out in an order no
+    later commit can go back on.
+    """
+    name = model._meta.model_name
+    if name not in TRACKED:
+        return
+    pks = list(pks)
+    if not pks:
+        return
+    using = using or router.db_for_write(model)
+    transaccion = TRANSACTION_ID if connections[using].vendor == 'postgresql' else 0
+    Cambio.objects.using(using).bulk_create(
+        [Cambio(modelo=name, objetoId=pk, operacion=operation, transaccion=transaccion) for pk in pks],
+        batch_size=BATCH_SIZE,
+    )
+    response_cache.bump_on_commit(Cambio)
+
+
+def _on_save(sender, instance, created, raw=False, using=None, **kwargs):
+    if not raw:
+        record(sender, [instance.pk], INSERT if created else UPDATE, using)
+
+
+def _on_delete(sender, instance, using=None, **kwargs):
+    record(sender, [instance.pk], DELETE, using)
+
+
+def _on_insert(sender, instances, using=None, **kwargs):
+    record(sender, [instance.pk for instance in instances], INSERT, using)
+
+
+def connect_signals():
+    for model in TRACKED.values():
+        post_save.connect(_on_save, sender=model, dispatch_uid='change_log_save')
+        post_delete.connect(_on_delete, sender=model, dispatch_uid='change_log_delete')
+        bulk.inserted.connect(_on_insert, sender=model, dispatch_uid='change_log_insert')
+
+
+def parse_position(value):
+    """The ``(transaccion, id)`` of a changes_since position written by
+    format_position; positions from before transactions were logged are an id."""
+    parts = [int(part) for part in value.split(':')]
+    if len(parts) == 1:
+        parts.insert(0, 0)
+    if len(parts) != 2:
+        raise ValueError(value)
+    return tuple(parts)
+
+
+def format_position(position):
+    return '%d:%d' % position
+
+
+def changes_since(after, first):
+    """Up to ``first`` entries logged after the position ``after``, as
+    ``(entries, position, has_more)``. A row changed several times in the page
+    appears once, at its latest entry.
+
+    Entries are ordered by transaction, then id. On PostgreSQL ids are handed
+    out before commit, so only entries of transactions older than every one
+    still running are returned: whatever commits later sorts after them.
+    """
+    transaccion, id = after
+    entries = Cambio.objects.filter(Q(transaccion__gt=transaccion) | Q(transaccion=transaccion, id__gt=id))
+    if connection.vendor == 'postgresql':
+        entries = entries.filter(transaccion__lt=OLDEST_RUNNING)
+    entries = list(entries.order_by('transaccion', 'id')[:first + 1])
+    has_more = len(entries) > first
+    entries = entries[:first]
+    latest = {(entry.modelo, entry.objetoId): entry for entry in entries}
+    last = (entries[-1].transaccion, entries[-1].id) if entries else after
+    return sorted(latest.values(), key=lambda entry: (entry.transaccion, entry.id)), last, has_more
+
+
+def compact(batch_size=10000):
+    """Delete the entries of rows that have a later entry, which is all a client
+    needs; returns how many were deleted. The log keeps one entry per row."""
+    newer = Cambio.objects.filter(modelo=OuterRef('modelo'), objetoId=OuterRef('objetoId')).filter(
+        Q(transaccion__gt=OuterRef('transaccion')) | Q(transaccion=OuterRef('transaccion'), id__gt=OuterRef('id'))
+    )
+    last = Cambio.objects.aggregate(last=Max('id'))['last'] or 0
+    deleted = 0
+    for start in range(0, last, batch_size):
+        count, _ = Cambio.objects.filter(id__gt=start, id__lte=start + batch_size).filter(Exists(newer)).delete()
+        deleted += count
+    if deleted:
+        response_cache.bump(Cambio)
+    return deleted
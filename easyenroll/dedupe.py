@@ -0,0 +1,206 @@
+import re
+import unicodedata
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+from django.db import connections
+
+from .models import Alumno, PadresTutores
+
+BLOCKS_PER_TASK = 200
+
+
+def normalize(value):
+    """Uppercase ASCII letters and digits separated by single spaces."""
+    value = unicodedata.normalize('NFKD', value or '').encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(re.findall(r'[A-Z0-9]+', value.upper()))
+
+
+PHONETIC_RULES = [
+    (r'LL', 'Y'), (r'CH', 'X'), (r'QU', 'K'), (r'C(?=[EI])', 'S'), (r'G(?=[EI])', 'J'),
+    (r'C', 'K'), (r'Z', 'S'), (r'V', 'B'), (r'W', 'U'), (r'H', ''), (r'(.)\1+', r'\1'),
+]
+
+
+def phonetic(value):
+    """A Spanish-leaning sound key: vowels after the first letter are dropped."""
+    key = normalize(value).replace(' ', '')
+    for pattern, replacement in PHONETIC_RULES:
+        key = re.sub(pattern, replacement, key)
+    return key[:1] + re.sub(r'[AEIOUY]', '', key[1:])
+
+
+def jaro_winkler(first, second):
+    if first == second:
+        return 1.0 if first else 0.0
+    if not first or not second:
+        return 0.0
+    window = max(0, max(len(first), len(second)) // 2 - 1)
+    first_matches = [False] * len(first)
+    second_matches = [False] * len(second)
+    matches = 0
+    for i, char in enumerate(first):
+        for j in range(max(0, i - window), min(len(second), i + window + 1)):
+            if not second_matches[j] and second[j] == char:
+                first_matches[i] = second_matches[j] = True
+                matches += 1
+                break
+    if not matches:
+        return 0.0
+    second_matched = [char for char, matched in zip(second, second_matches) if matched]
+    first_matched = [char for char, matched in zip(first, first_matches) if matched]
+    transpositions = sum(a != b for a, b in zip(first_matched, second_matched)) / 2
+    jaro = (matches / len(first) + matches / len(second) + (matches - transpositions) / matches) / 3
+    prefix = 0
+    for a, b in zip(first[:4], second[:4]):
+        if a != b:
+            break
+        prefix += 1
+    return jaro + prefix * 0.1 * (1 - jaro)
+
+
+def positional(first, second):
+    """Share of equal characters at the same position, for fixed-layout codes like CURP."""
+    if not first or not second:
+        return 0.0
+    return sum(a == b for a, b in zip(first, second)) / max(len(first), len(second))
+
+
+def curp_score(names, first, second):
+    # A missing CURP is no evidence either way; a different one (birth date,
+    # state, homoclave) is what tells namesakes apart.
+    if not first or not second:
+        return 0.95 * names
+    return 0.6 * names + 0.4 * positional(first, second)
+
+
+class StudentSpec:
+    model = Alumno
+    fields = ['id', 'curp', 'nombre', 'apellidoPaterno', 'apellidoMaterno']
+
+    def prepare(self, row):
+        pk, curp, nombre, paterno, materno = row
+        return (pk, normalize(curp).replace(' ', ''), normalize(nombre), normalize(paterno), normalize(materno))
+
+    def block_keys(self, record):
+        pk, curp, nombre, paterno, materno = record
+        keys = ['sound:%s:%s:%s' % (phonetic(paterno), phonetic(materno), nombre[:1])]
+        if len(curp) >= 10:
+            # Letters and birth date; the rest of a mistyped CURP rarely matters.
+            keys.append('curp:' + curp[:10])
+            keys.append('born:%s:%s' % (curp[4:10], phonetic(paterno)))
+            keys.append('initials:%s:%s' % (curp[:4], phonetic(paterno)))
+        return keys
+
+    def score(self, a, b):
+        names = 0.3 * jaro_winkler(a[2], b[2]) + 0.4 * jaro_winkler(a[3], b[3]) + 0.3 * jaro_winkler(a[4], b[4])
+        return curp_score(names, a[1], b[1])
+
+
+class TutorSpec:
+    model = PadresTutores
+    fields = ['id', 'curpTutor', 'nombrePadreTutor', 'telefono', 'emailPadreTutor']
+
+    def prepare(self, row):
+        pk, curp, nombre, telefono, email = row
+        return (pk, normalize(curp).replace(' ', ''), normalize(nombre), re.sub(r'\D', '', telefono or '')[-10:],
+                (email or '').strip().lower())
+
+    def block_keys(self, record):
+        pk, curp, nombre, telefono, email = record
+        words = nombre.split()
+        keys = ['sound:%s:%s' % (words[0][:1] if words else '', ''.join(phonetic(word) for word in words[1:]))]
+        if len(curp) >= 10:
+            keys.append('curp:' + curp[:10])
+        if telefono:
+            keys.append('phone:' + telefono)
+        if email:
+            keys.append('email:' + email)
+        return keys
+
+    def score(self, a, b):
+        names = jaro_winkler(a[2], b[2])
+        if (a[3] and a[3] == b[3]) or (a[4] and a[4] == b[4]):
+            # Same phone or email: siblings' records of one tutor.
+            names = min(1.0, names + 0.1)
+        return curp_score(names, a[1], b[1])
+
+
+SPECS = {'alumnos': StudentSpec(), 'tutores': TutorSpec()}
+
+
+def load(kind, using='default'):
+    spec = SPECS[kind]
+    rows = spec.model.objects.using(using).values_list(*spec.fields).iterator(chunk_size=5000)
+    return [spec.prepare(row) for row in rows]
+
+
+def make_blocks(kind, records, max_block):
+    """Group records by every blocking key; return (blocks, oversized block count)."""
+    spec = SPECS[kind]
+    groups = defaultdict(list)
+    for record in records:
+        for key in spec.block_keys(record):
+            groups[key].append(record)
+    blocks = [group for group in groups.values() if 1 < len(group) <= max_block]
+    oversized = sum(1 for group in groups.values() if len(group) > max_block)
+    return blocks, oversized
+
+
+def compare_blocks(kind, blocks, threshold):
+    spec = SPECS[kind]
+    pairs = {}
+    for block in blocks:
+        for a, b in combinations(block, 2):
+            key = (a[0], b[0]) if a[0] < b[0] else (b[0], a[0])
+            if key in pairs:
+                continue
+            score = spec.score(a, b)
+            if score >= threshold:
+                pairs[key] = score
+    return pairs
+
+
+def find_duplicates(kind, records, threshold=0.9, max_block=500, workers=None):
+    """Scored candidate pairs ``{(low_id, high_id): score}`` and the oversized block count.
+
+    Only records sharing a blocking key are compared, so the work grows with
+    the block sizes instead of with the square of the table.
+    """
+    blocks, oversized = make_blocks(kind, records, max_block)
+    # Largest first so a single huge block does not finish last.
+    blocks.sort(key=len, reverse=True)
+    tasks = [blocks[start:start + BLOCKS_PER_TASK] for start in range(0, len(blocks), BLOCKS_PER_TASK)]
+    pairs = {}
+    if workers == 1:
+        for task in tasks:
+            pairs.update(compare_blocks(kind, task, threshold))
+        return pairs, oversized
+    # Forked workers must not share the parent's database sockets.
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for result in executor.map(compare_blocks, [kind] * len(tasks), tasks, [threshold] * len(tasks)):
+            pairs.update(result)
+    return pairs, oversized
+
+
+def clusters(pairs):
+    """Group paired ids transitively; each group is sorted, oldest id first."""
+    parent = {}
+
+    def find(pk):
+        parent.setdefault(pk, pk)
+        while parent[pk] != pk:
+            parent[pk] = parent[parent[pk]]
+            pk = parent[pk]
+        return pk
+
+    for a, b in pairs:
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+    groups = defaultdict(list)
+    for pk in parent:
+        groups[find(pk)].append(pk)
+    return sorted(sorted(group) for group in groups.values())
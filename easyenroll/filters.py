@@ -0,0 +1,34 @@
+import django_filters
+
+from .models import Inscripcion, Pago, Alumno
+
+
+class StudentFilter(django_filters.FilterSet):
+    class Meta:
+        model = Alumno
+        fields = ['gradoGrupoAsignado', 'curp']
+
+
+class PaymentFilter(django_filters.FilterSet):
+    fechaPagoDesde = django_filters.DateFilter(field_name='fechaPago', lookup_expr='gte')
+    fechaPagoHasta = django_filters.DateFilter(field_name='fechaPago', lookup_expr='lte')
+
+    class Meta:
+        model = Pago
+        fields = ['metodoPago']
+
+
+class EnrollmentFilter(django_filters.FilterSet):
+    class Meta:
+        model = Inscripcion
+        fields = ['tipoInscripcion']
+
+
+class EnrollmentExportFilter(django_filters.FilterSet):
+    grupo = django_filters.CharFilter(field_name='idAlumno__gradoGrupoAsignado')
+    fechaPagoDesde = django_filters.DateFilter(field_name='idPago__fechaPago', lookup_expr='gte')
+    fechaPagoHasta = django_filters.DateFilter(field_name='idPago__fechaPago', lookup_expr='lte')
+
+    class Meta:
+        model = Inscripcion
+        fields = ['tipoInscripcion']
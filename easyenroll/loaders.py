@@ -0,0 +1,96 @@
+from collections import defaultdict
+
+from promise import Promise
+from promise.dataloader import DataLoader
+
+
+class ModelLoader(DataLoader):
+    def __init__(self, model):
+        self.model = model
+        super().__init__()
+
+    def batch_load_fn(self, keys):
+        objects = self.model._default_manager.in_bulk(keys)
+        return Promise.resolve([objects.get(key) for key in keys])
+
+
+class RelatedListLoader(DataLoader):
+    def __init__(self, model, field_name):
+        self.model = model
+        self.field = model._meta.get_field(field_name)
+        super().__init__()
+
+    def batch_load_fn(self, keys):
+        groups = defaultdict(list)
+        queryset = self.model._default_manager.filter(
+            **{'%s__in' % self.field.name: keys}
+        ).order_by('pk')
+        for obj in queryset:
+            groups[getattr(obj, self.field.attname)].append(obj)
+        return Promise.resolve([groups[key] for key in keys])
+
+
+class Loaders:
+    def __init__(self):
+        self._loaders = {}
+
+    def by_pk(self, model):
+        key = (model, None)
+        if key not in self._loaders:
+            self._loaders[key] = ModelLoader(model)
+        return self._loaders[key]
+
+    def by_fk(self, model, field_name):
+        key = (model, field_name)
+        if key not in self._loaders:
+            self._loaders[key] = RelatedListLoader(model, field_name)
+        return self._loaders[key]
+
+    def prime(self, *instances):
+        for instance in instances:
+            self.by_pk(type(instance)).clear(instance.pk).prime(instance.pk, instance)
+
+    def forget_related(self, instance):
+        # A new child row makes any cached list for its parents stale.
+        for field in instance._meta.concrete_fields:
+            if field.is_relation and field.many_to_one:
+                self.by_fk(type(instance), field.name).clear(getattr(instance, field.attname))
+
+
+def get_loaders(info):
+    context = info.context
+    if context is None:
+        return Loaders()
+    loaders = getattr(context, 'loaders', None)
+    if loaders is None:
+        loaders = Loaders()
+        context.loaders = loaders
+    return loaders
+
+
+def load_related(info, instance, field_name):
+    field = instance._meta.get_field(field_name)
+    if field.is_cached(instance):
+        return field.get_cached_value(instance)
+    value = getattr(instance, field.attname)
+    if value is None:
+        return None
+    return get_loaders(info).by_pk(field.related_model).load(value)
+
+
+def load_related_set(info, instance, accessor):
+    prefetched = getattr(instance, '_prefetched_objects_cache', {})
+    if accessor in prefetched:
+        return list(prefetched[accessor])
+    relation = next(
+        rel for rel in instance._meta.related_objects
+        if rel.get_accessor_name() == accessor
+    )
+    return get_loaders(info).by_fk(relation.related_model, relation.field.name).load(instance.pk)
+
+
+def load_instance(info, model, pk):
+    instance = get_loaders(info).by_pk(model).load(pk).get()
+    if instance is None:
+        raise model.DoesNotExist('%s matching query does not exist.' % model._meta.object_name)
+    return instance
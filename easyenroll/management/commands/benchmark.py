@@ -0,0 +1,121 @@
+import json
+import platform
+import random
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import (
+    setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+
+from easyenroll import benchmark, seed
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a throwaway test database and measure ops/s, latency percentiles and SQL count '
+        'of every GraphQL workload, optionally failing on regressions against a stored baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=2000)
+        parser.add_argument('--iterations', type=int, default=20, help='Runs per workload and unit of weight.')
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--workload', action='append', help='Only run these workloads.')
+        parser.add_argument('--baseline', help='JSON file produced by --save-baseline to compare against.')
+        parser.add_argument('--save-baseline', action='store_true', help='Write the results to --baseline.')
+        parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed p95 latency growth.')
+        parser.add_argument('--output', help='Also write the results as JSON to this file.')
+        parser.add_argument(
+            '--concurrency', type=int, default=0,
+            help='Also send read workloads this many at a time to the synchronous and async endpoints.',
+        )
+
+    def handle(self, *args, **options):
+        workloads = benchmark.WORKLOADS
+        if options['workload']:
+            names = {workload.name for workload in workloads}
+            unknown = set(options['workload']) - names
+            if unknown:
+                raise CommandError('Unknown workloads: %s' % ', '.join(sorted(unknown)))
+            workloads = [workload for workload in workloads if workload.name in options['workload']]
+        if options['save_baseline'] and not options['baseline']:
+            raise CommandError('--save-baseline needs --baseline.')
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            results = self.measure(workloads, options)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        self.report(results)
+        if options['output']:
+            self.write(options['output'], results)
+        if options['save_baseline']:
+            self.write(options['baseline'], results)
+            self.stdout.write('Baseline written to %s' % options['baseline'])
+        elif options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as baseline_file:
+                baseline = json.load(baseline_file)
+            regressions = benchmark.compare(results, baseline, options['tolerance'])
+            if regressions:
+                for regression in regressions:
+                    self.stderr.write(regression)
+                raise CommandError('%d regressions against %s' % (len(regressions), options['baseline']))
+            self.stdout.write(self.style.SUCCESS('No regressions against %s' % options['baseline']))
+
+        failed = [name for name, stats in results['operations'].items() if stats['errors']]
+        failed += [path for path, stats in results.get('concurrency', {}).items() if stats['errors']]
+        if failed:
+            raise CommandError('Workloads returned errors: %s' % ', '.join(failed))
+
+    def measure(self, workloads, options):
+        rows = seed.generate(students=options['students'], seed=options['seed'])
+        user = get_user_model().objects.filter(is_staff=True).first()
+        client = Client()
+        client.force_login(user)
+        state = benchmark.State(random.Random(options['seed']))
+        results = benchmark.run(client, workloads, state, options['iterations'], options['warmup'])
+        if options['concurrency']:
+            async_client = AsyncClient()
+            async_client.force_login(user)
+            requests = options['iterations'] * options['concurrency']
+            results['concurrency'] = {
+                path: benchmark.run_concurrently(async_client, workloads, state, path, requests, options['concurrency'])
+                for path in ('/graphql/', '/graphql/async/')
+            }
+        results['meta'] = {
+            'rows': rows,
+            'iterations': options['iterations'],
+            'seed': options['seed'],
+            'database': connection.vendor,
+            'python': platform.python_version(),
+        }
+        return results
+
+    def report(self, results):
+        self.stdout.write('%-20s %6s %9s %9s %9s %9s %5s %6s' % (
+            'operation', 'runs', 'ops/s', 'p50 ms', 'p95 ms', 'p99 ms', 'sql', 'errors',
+        ))
+        for name, stats in results['operations'].items():
+            self.stdout.write('%-20s %6d %9.1f %9.2f %9.2f %9.2f %5d %6d' % (
+                name, stats['operations'], stats['opsPerSecond'], stats['p50Ms'], stats['p95Ms'], stats['p99Ms'],
+                stats['sqlQueries'], stats['errors'],
+            ))
+        total = results['total']
+        self.stdout.write('%d operations in %.1f s: %.1f ops/s' % (total['operations'], total['seconds'], total['opsPerSecond']))
+        for path, stats in results.get('concurrency', {}).items():
+            self.stdout.write('%s at concurrency %d: %.1f ops/s, p50 %.2f ms, p95 %.2f ms, peak %d in flight, %d errors' % (
+                path, stats['concurrency'], stats['opsPerSecond'], stats['p50Ms'], stats['p95Ms'],
+                stats['peakInFlight'], stats['errors'],
+            ))
+
+    def write(self, path, results):
+        with open(path, 'w', encoding='utf-8') as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+            output.write('\n')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from easyenroll import changes
+
+
+class Command(BaseCommand):
+    help = 'Drop change log entries superseded by a later change to the same row.'
+
+    def handle(self, *args, **options):
+        deleted = changes.compact()
+        self.stdout.write(self.style.SUCCESS('Deleted %d superseded change log entries.' % deleted))
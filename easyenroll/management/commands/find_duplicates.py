@@ -0,0 +1,57 @@
+import csv
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from easyenroll import dedupe
+
+
+class Command(BaseCommand):
+    help = (
+        'Suggest merges of duplicate students or tutors. Writes one CSV row per record that '
+        'should be merged into the group\'s oldest record.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(dedupe.SPECS))
+        parser.add_argument('--threshold', type=float, default=0.9, help='Minimum similarity score, 0 to 1.')
+        parser.add_argument('--max-block', type=int, default=500, help='Skip blocking keys shared by more records.')
+        parser.add_argument('--workers', type=int, default=None, help='Worker processes; defaults to the CPU count.')
+        parser.add_argument('--output', help='CSV file to write; defaults to stdout.')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        kind = options['kind']
+        started = time.monotonic()
+        records = dedupe.load(kind, options['database'])
+        pairs, oversized = dedupe.find_duplicates(
+            kind, records, options['threshold'], options['max_block'], options['workers'],
+        )
+        groups = dedupe.clusters(pairs)
+
+        by_id = {record[0]: record for record in records}
+        # Each merge suggestion carries the record's strongest match in its group.
+        best = {}
+        for pair, score in pairs.items():
+            for pk in pair:
+                best[pk] = max(best.get(pk, 0), score)
+        fields = dedupe.SPECS[kind].fields[1:]
+        output = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else sys.stdout
+        try:
+            writer = csv.writer(output)
+            writer.writerow(['group', 'keep_id', 'merge_id', 'score'] + ['keep_' + f for f in fields] + ['merge_' + f for f in fields])
+            for number, group in enumerate(groups, 1):
+                keep = group[0]
+                for pk in group[1:]:
+                    writer.writerow([number, keep, pk, '%.3f' % best[pk]] + list(by_id[keep][1:]) + list(by_id[pk][1:]))
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        self.stderr.write(
+            '%d %s: %d candidate pairs in %d groups in %.1f s; %d blocking keys over --max-block skipped.' % (
+                len(records), kind, len(pairs), len(groups), time.monotonic() - started, oversized,
+            )
+        )
+
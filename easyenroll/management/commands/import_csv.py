@@ -0,0 +1,220 @@
+import abc
+import csv
+import io
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router, transaction
+
+from easyenroll import changes
+from easyenroll.models import Alumno, PadresTutores, AnexoAlumnos
+from modulo_secundaria import response_cache
+
+# Tutor and annex files point at their student through this column.
+STUDENT_COLUMN = 'alumnoCurp'
+
+
+class Importer(abc.ABC):
+    model = None
+    exclude = []
+
+    def __init__(self, using):
+        self.using = using
+        self.fields = [field for field in self.model._meta.concrete_fields if not field.primary_key]
+
+    def prepare(self, rows):
+        """Resolve whatever the batch needs from the database; return rejected rows."""
+        return []
+
+    def build(self, row):
+        names = {field.name for field in self.fields}
+        return self.model(**{key: value for key, value in row.items() if key in names})
+
+    @abc.abstractmethod
+    def key(self, instance):
+        """The natural key that makes a row a duplicate."""
+
+    @abc.abstractmethod
+    def find(self, keys):
+        """``(key, pk)`` of the stored rows with one of ``keys``."""
+
+
+class StudentImporter(Importer):
+    model = Alumno
+
+    def key(self, instance):
+        return instance.curp.strip().upper()
+
+    def build(self, row):
+        instance = super().build(row)
+        instance.curp = (instance.curp or '').strip().upper()
+        return instance
+
+    def find(self, keys):
+        return Alumno.objects.using(self.using).filter(curp__in=keys).values_list('curp', 'id')
+
+
+class StudentReferenceImporter(Importer):
+    student_field = None
+
+    def prepare(self, rows):
+        curps = {(row.get(STUDENT_COLUMN) or '').strip().upper() for _, row in rows}
+        self.students = dict(
+            Alumno.objects.using(self.using).filter(curp__in=curps).values_list('curp', 'id')
+        )
+        rejected = []
+        for line, row in rows:
+            student = self.students.get((row.get(STUDENT_COLUMN) or '').strip().upper())
+            if student is None:
+                rejected.append((line, row, {STUDENT_COLUMN: ['Unknown student CURP.']}))
+            else:
+                row[self.student_field + '_id'] = student
+        return rejected
+
+    def build(self, row):
+        instance = super().build(row)
+        setattr(instance, self.student_field + '_id', row[self.student_field + '_id'])
+        return instance
+
+
+class TutorImporter(StudentReferenceImporter):
+    model = PadresTutores
+    exclude = ['alumno']
+    student_field = 'alumno'
+
+    def key(self, instance):
+        return (instance.curpTutor.strip().upper(), instance.alumno_id)
+
+    def find(self, keys):
+        students = {student for _, student in keys}
+        rows = PadresTutores.objects.using(self.using).filter(alumno_id__in=students).values_list('curpTutor', 'alumno_id', 'id')
+        return [((curp.strip().upper(), student), pk) for curp, student, pk in rows]
+
+
+class AnnexImporter(StudentReferenceImporter):
+    model = AnexoAlumnos
+    exclude = ['idAlumno']
+    student_field = 'idAlumno'
+
+    def key(self, instance):
+        return instance.idAlumno_id
+
+    def find(self, keys):
+        return AnexoAlumnos.objects.using(self.using).filter(idAlumno_id__in=keys).values_list('idAlumno_id', 'id')
+
+
+IMPORTERS = {
+    'alumnos': StudentImporter,
+    'tutores': TutorImporter,
+    'anexos': AnnexImporter,
+}
+
+
+def copy_instances(connection, model, fields, instances):
+    """Load ``instances`` with PostgreSQL's COPY FROM STDIN."""
+    buffer = io.StringIO()
+    # Quote everything so empty strings are not read back as NULL.
+    writer = csv.writer(buffer, quoting=csv.QUOTE_ALL)
+    for instance in instances:
+        # pre_save fills auto_now timestamps, as bulk_create would.
+        writer.writerow([field.get_db_prep_save(field.pre_save(instance, True), connection) for field in fields])
+    buffer.seek(0)
+    quote = connection.ops.quote_name
+    sql = 'COPY %s (%s) FROM STDIN WITH (FORMAT csv)' % (
+        quote(model._meta.db_table),
+        ', '.join(quote(field.column) for field in fields),
+    )
+    with connection.cursor() as cursor:
+        cursor.copy_expert(sql, buffer)
+
+
+class Command(BaseCommand):
+    help = 'Stream a CSV of students, tutors or annexes into the database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTERS))
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--rejects', help='Write rejected rows and their errors to this CSV file.')
+        parser.add_argument('--database', help='Database alias (defaults to the router choice).')
+
+    def handle(self, *args, **options):
+        model = IMPORTERS[options['kind']].model
+        using = options['database'] or router.db_for_write(model)
+        importer = IMPORTERS[options['kind']](using)
+        connection = connections[using]
+        batch_size = options['batch_size']
+        self.verbosity = options['verbosity']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be positive.')
+
+        self.imported = self.duplicates = self.rejected = 0
+        started = time.monotonic()
+        rejects = open(options['rejects'], 'w', newline='', encoding='utf-8') if options['rejects'] else None
+        self.rejects = csv.writer(rejects) if rejects else None
+        if self.rejects:
+            self.rejects.writerow(['line', 'errors'])
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as source:
+                reader = csv.DictReader(source)
+                batch = []
+                for row in reader:
+                    batch.append((reader.line_num, row))
+                    if len(batch) >= batch_size:
+                        self.load(importer, connection, batch)
+                        batch = []
+                if batch:
+                    self.load(importer, connection, batch)
+        finally:
+            if rejects:
+                rejects.close()
+
+        elapsed = time.monotonic() - started
+        total = self.imported + self.duplicates + self.rejected
+        self.stdout.write(
+            '%d rows read, %d imported, %d duplicates skipped, %d rejected in %.1fs (%.0f rows/s)' % (
+                total, self.imported, self.duplicates, self.rejected, elapsed, total / elapsed if elapsed else 0,
+            )
+        )
+
+    def load(self, importer, connection, rows):
+        rejected = importer.prepare(rows)
+        skip = {line for line, _, _ in rejected}
+        instances = {}
+        for line, row in rows:
+            if line in skip:
+                continue
+            instance = importer.build(row)
+            try:
+                instance.full_clean(exclude=importer.exclude, validate_unique=False)
+            except ValidationError as error:
+                rejected.append((line, row, error.message_dict))
+                continue
+            key = importer.key(instance)
+            if key in instances:
+                self.duplicates += 1
+            else:
+                instances[key] = instance
+
+        with transaction.atomic(using=connection.alias):
+            existing = {key for key, _ in importer.find(list(instances))} & set(instances)
+            self.duplicates += len(existing)
+            batch = {key: instance for key, instance in instances.items() if key not in existing}
+            if connection.vendor == 'postgresql':
+                copy_instances(connection, importer.model, importer.fields, batch.values())
+            else:
+                importer.model._default_manager.db_manager(connection.alias).bulk_create(batch.values())
+            if batch:
+                # Neither returns the new pks, so they are found by the keys just inserted.
+                pks = [pk for key, pk in importer.find(list(batch)) if key in batch]
+                changes.record(importer.model, pks, changes.INSERT, connection.alias)
+                response_cache.bump_on_commit(importer.model)
+        self.imported += len(batch)
+
+        self.rejected += len(rejected)
+        for line, row, errors in rejected:
+            if self.rejects:
+                self.rejects.writerow([line, errors])
+            if self.verbosity > 1:
+                self.stderr.write('line %d rejected: %s' % (line, errors))
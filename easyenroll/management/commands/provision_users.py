@@ -0,0 +1,44 @@
+import csv
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users import provisioning
+
+
+class Command(BaseCommand):
+    help = (
+        'Create user accounts from a CSV with username, password and email columns, '
+        'hashing the passwords on every core and inserting them in one transaction.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file, or '-' for stdin.")
+        parser.add_argument('--workers', type=int, default=None, help='Hashing processes; defaults to the core count.')
+        parser.add_argument('--all-or-nothing', action='store_true', help='Create nobody if any row is rejected.')
+
+    def handle(self, *args, **options):
+        if options['workers'] is not None and options['workers'] < 1:
+            raise CommandError('--workers must be positive.')
+        source = sys.stdin if options['path'] == '-' else open(options['path'], newline='', encoding='utf-8-sig')
+        try:
+            rows = list(csv.DictReader(source))
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        missing = {'username', 'password', 'email'} - set(rows[0] if rows else ())
+        if rows and missing:
+            raise CommandError('Missing columns: %s' % ', '.join(sorted(missing)))
+
+        started = time.monotonic()
+        created, errors = provisioning.provision(rows, options['all_or_nothing'], options['workers'])
+        elapsed = time.monotonic() - started
+
+        for index, field, messages in errors:
+            # +2: the header is line 1.
+            self.stderr.write('line %d rejected: %s: %s' % (index + 2, field, ' '.join(messages)))
+        self.stdout.write('%d rows read, %d users created, %d rejected in %.1fs (%.0f users/s, %d workers)' % (
+            len(rows), len(created), len({index for index, _, _ in errors}), elapsed,
+            len(created) / elapsed if elapsed else 0, options['workers'] or provisioning.cpu_count(),
+        ))
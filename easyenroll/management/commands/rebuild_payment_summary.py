@@ -0,0 +1,25 @@
+import argparse
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from easyenroll import aggregates
+
+
+def date(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError('invalid date %r, expected YYYY-MM-DD' % value)
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily payment summary behind paymentTotals from the Pago table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=date, help='First payment date to rebuild (YYYY-MM-DD).')
+        parser.add_argument('--hasta', type=date, help='Last payment date to rebuild (YYYY-MM-DD).')
+
+    def handle(self, *args, **options):
+        rows = aggregates.rebuild(options['desde'], options['hasta'])
+        self.stdout.write(self.style.SUCCESS('Wrote %d summary rows.' % rows))
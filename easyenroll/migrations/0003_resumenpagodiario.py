@@ -0,0 +1,27 @@
+# Generated by Django 3.1.3 on 2026-10-18 02:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('easyenroll', '0002_auto_20240508_1217'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenPagoDiario',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('fecha', models.DateField()),
+                ('metodoPago', models.CharField(max_length=2)),
+                ('descuento', models.IntegerField(default=0)),
+                ('cantidad', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'unique_together': {('fecha', 'metodoPago', 'descuento')},
+            },
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 3.1.3 on 2026-10-18 02:43
+
+from django.db import migrations, models
+
+NAME = """(nombre || ' ' || "apellidoPaterno" || ' ' || "apellidoMaterno")"""
+
+POSTGRESQL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX alumno_nombre_trgm_idx ON easyenroll_alumno USING gin (%s gin_trgm_ops)' % NAME,
+]
+POSTGRESQL_REVERSE = ['DROP INDEX IF EXISTS alumno_nombre_trgm_idx']
+
+SQLITE = [
+    """CREATE VIRTUAL TABLE easyenroll_alumno_fts USING fts5(
+        nombre, "apellidoPaterno", "apellidoMaterno",
+        content='easyenroll_alumno', content_rowid='id', prefix='2 3'
+    )""",
+    """CREATE TRIGGER easyenroll_alumno_fts_insert AFTER INSERT ON easyenroll_alumno BEGIN
+        INSERT INTO easyenroll_alumno_fts(rowid, nombre, "apellidoPaterno", "apellidoMaterno")
+        VALUES (new.id, new.nombre, new."apellidoPaterno", new."apellidoMaterno");
+    END""",
+    """CREATE TRIGGER easyenroll_alumno_fts_delete AFTER DELETE ON easyenroll_alumno BEGIN
+        INSERT INTO easyenroll_alumno_fts(easyenroll_alumno_fts, rowid, nombre, "apellidoPaterno", "apellidoMaterno")
+        VALUES ('delete', old.id, old.nombre, old."apellidoPaterno", old."apellidoMaterno");
+    END""",
+    """CREATE TRIGGER easyenroll_alumno_fts_update AFTER UPDATE ON easyenroll_alumno BEGIN
+        INSERT INTO easyenroll_alumno_fts(easyenroll_alumno_fts, rowid, nombre, "apellidoPaterno", "apellidoMaterno")
+        VALUES ('delete', old.id, old.nombre, old."apellidoPaterno", old."apellidoMaterno");
+        INSERT INTO easyenroll_alumno_fts(rowid, nombre, "apellidoPaterno", "apellidoMaterno")
+        VALUES (new.id, new.nombre, new."apellidoPaterno", new."apellidoMaterno");
+    END""",
+    "INSERT INTO easyenroll_alumno_fts(easyenroll_alumno_fts) VALUES ('rebuild')",
+]
+SQLITE_REVERSE = [
+    'DROP TRIGGER IF EXISTS easyenroll_alumno_fts_insert',
+    'DROP TRIGGER IF EXISTS easyenroll_alumno_fts_delete',
+    'DROP TRIGGER IF EXISTS easyenroll_alumno_fts_update',
+    'DROP TABLE IF EXISTS easyenroll_alumno_fts',
+]
+
+
+def sqlite_has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return 'ENABLE_FTS5' in {row[0] for row in cursor.fetchall()}
+
+
+def run(statements_by_vendor):
+    def operation(apps, schema_editor):
+        connection = schema_editor.connection
+        if connection.vendor == 'sqlite' and not sqlite_has_fts5(connection):
+            # easyenroll.search falls back to LIKE without the FTS table.
+            return
+        for statement in statements_by_vendor.get(connection.vendor, []):
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('easyenroll', '0003_resumenpagodiario'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='alumno',
+            name='correoInstitucional',
+            field=models.EmailField(db_index=True, max_length=254),
+        ),
+        migrations.AlterField(
+            model_name='alumno',
+            name='curp',
+            field=models.CharField(db_index=True, max_length=18),
+        ),
+        migrations.AlterField(
+            model_name='padrestutores',
+            name='curpTutor',
+            field=models.CharField(db_index=True, max_length=18),
+        ),
+        migrations.AddIndex(
+            model_name='alumno',
+            index=models.Index(fields=['apellidoPaterno', 'apellidoMaterno', 'nombre'], name='alumno_apellidos_idx'),
+        ),
+        migrations.RunPython(
+            run({'postgresql': POSTGRESQL, 'sqlite': SQLITE}),
+            run({'postgresql': POSTGRESQL_REVERSE, 'sqlite': SQLITE_REVERSE}),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 3.1.3 on 2026-10-18 03:04
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import easyenroll.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('easyenroll', '0004_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='anexoalumnos',
+            name='cda',
+            field=easyenroll.models.DocumentField(blank=True, max_length=200),
+        ),
+        migrations.AlterField(
+            model_name='padrestutores',
+            name='scanComprobanteDomicilio',
+            field=easyenroll.models.DocumentField(max_length=200),
+        ),
+        migrations.AlterField(
+            model_name='padrestutores',
+            name='scanIne',
+            field=easyenroll.models.DocumentField(max_length=200),
+        ),
+        migrations.AlterField(
+            model_name='pago',
+            name='recibo',
+            field=easyenroll.models.DocumentField(max_length=200),
+        ),
+        migrations.CreateModel(
+            name='Documento',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('tamano', models.BigIntegerField()),
+                ('tipoContenido', models.CharField(max_length=100)),
+                ('fechaSubida', models.DateTimeField(auto_now_add=True)),
+                ('subidoPor', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.1.3 on 2026-10-18 03:09
+
+from django.db import migrations
+import easyenroll.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('easyenroll', '0005_documento'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pago',
+            name='recibo',
+            field=easyenroll.models.DocumentField(blank=True, max_length=200),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 3.1.3 on 2026-10-18 03:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('easyenroll', '0006_pago_recibo_blank'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Cambio',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('modelo', models.CharField(max_length=30)),
+                ('objetoId', models.IntegerField()),
+                ('operacion', models.CharField(max_length=1)),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='alumno',
+            name='fechaActualizacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='anexoalumnos',
+            name='fechaActualizacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='inscripcion',
+            name='fechaActualizacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='padrestutores',
+            name='fechaActualizacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='pago',
+            name='fechaActualizacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='cambio',
+            index=models.Index(fields=['modelo', 'objetoId'], name='cambio_objeto_idx'),
+        ),
+    ]
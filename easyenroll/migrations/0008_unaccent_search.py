@@ -0,0 +1,51 @@
+# Generated by Django 3.1.3 on 2026-10-18 04:20
+
+from importlib import import_module
+
+from django.db import migrations
+
+lookup_indexes = import_module('easyenroll.migrations.0004_lookup_indexes')
+
+NAME = lookup_indexes.NAME
+
+# unaccent() is only STABLE; an IMMUTABLE wrapper with a fixed dictionary can be indexed.
+POSTGRESQL = [
+    'CREATE EXTENSION IF NOT EXISTS unaccent',
+    """CREATE OR REPLACE FUNCTION easyenroll_unaccent(text) RETURNS text AS
+        $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT""",
+    'DROP INDEX IF EXISTS alumno_nombre_trgm_idx',
+    'CREATE INDEX alumno_nombre_trgm_idx ON easyenroll_alumno USING gin (easyenroll_unaccent%s gin_trgm_ops)' % NAME,
+]
+POSTGRESQL_REVERSE = [
+    'DROP INDEX IF EXISTS alumno_nombre_trgm_idx',
+    'CREATE INDEX alumno_nombre_trgm_idx ON easyenroll_alumno USING gin (%s gin_trgm_ops)' % NAME,
+    'DROP FUNCTION IF EXISTS easyenroll_unaccent(text)',
+]
+# Rebuilding easyenroll_alumno for 0007's AddField dropped the FTS triggers;
+# put them back and reindex the rows added since.
+SQLITE = lookup_indexes.SQLITE_REVERSE[:3] + lookup_indexes.SQLITE[1:]
+
+
+def run(statements_by_vendor):
+    def operation(apps, schema_editor):
+        connection = schema_editor.connection
+        if connection.vendor == 'sqlite' and 'easyenroll_alumno_fts' not in connection.introspection.table_names():
+            return
+        for statement in statements_by_vendor.get(connection.vendor, []):
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('easyenroll', '0007_change_log'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'postgresql': POSTGRESQL, 'sqlite': SQLITE}),
+            run({'postgresql': POSTGRESQL_REVERSE}),
+        ),
+    ]
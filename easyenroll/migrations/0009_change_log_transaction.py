@@ -0,0 +1,22 @@
+# Generated by Django 3.1.3 on 2026-10-18 04:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('easyenroll', '0008_unaccent_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cambio',
+            name='transaccion',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='cambio',
+            index=models.Index(fields=['transaccion', 'id'], name='cambio_transaccion_idx'),
+        ),
+    ]
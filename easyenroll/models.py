@@ -1,6 +1,23 @@
+from django.core.validators import RegexValidator
 from django.db import models
 from django.conf import settings
 
+validate_content_id = RegexValidator(r'^[0-9a-f]{64}\Z', 'Enter the id of an uploaded document.')
+
+
+class DocumentField(models.CharField):
+    """The content id of a Documento.
+
+    Rows saved (or imported) from before uploads existed keep their URLs, so
+    the field takes any value; the mutations require uploaded ids through
+    ``storage.check_documents``.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('max_length', 200)
+        super().__init__(*args, **kwargs)
+
+
 class Inscripcion(models.Model):
     id = models.AutoField(primary_key=True)
     factura = models.BooleanField(default=False)
@@ -9,37 +26,47 @@ class Inscripcion(models.Model):
     idAlumno = models.ForeignKey('easyenroll.Alumno', on_delete=models.CASCADE)
     tipoInscripcion = models.CharField(max_length=10)
     modalidadPago = models.CharField(max_length=2)
+    fechaActualizacion = models.DateTimeField(auto_now=True)
 
 class Pago(models.Model):
     idPago = models.AutoField(primary_key=True)
-    recibo = models.URLField()
+    # Generated by the generate_receipt job when a payment is saved without one.
+    recibo = DocumentField(blank=True)
     descuento = models.IntegerField(default=0)
     idRecibo = models.IntegerField(null=False)
     monto = models.DecimalField(max_digits=10, decimal_places=2)
     fechaPago = models.DateField()
     metodoPago = models.CharField(max_length=2)
+    fechaActualizacion = models.DateTimeField(auto_now=True)
 
 class Alumno(models.Model):
     id = models.AutoField(primary_key=True)
     nombre = models.CharField(max_length=100)
     apellidoPaterno = models.CharField(max_length=100)
     apellidoMaterno = models.CharField(max_length=100)
-    correoInstitucional = models.EmailField()
-    curp = models.CharField(max_length=18)
+    correoInstitucional = models.EmailField(db_index=True)
+    curp = models.CharField(max_length=18, db_index=True)
     sexo = models.CharField(max_length=1)
     escuelaProcedencia = models.CharField(max_length=100)
     gradoGrupoAsignado = models.CharField(max_length=2)
+    fechaActualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # Name search has its own trigram (PostgreSQL) or FTS5 (SQLite) index,
+        # see migration 0004; this one serves exact surname lookups and sorting.
+        indexes = [models.Index(fields=['apellidoPaterno', 'apellidoMaterno', 'nombre'], name='alumno_apellidos_idx')]
 
 
 class PadresTutores(models.Model):
     id = models.AutoField(primary_key=True)
     nombrePadreTutor = models.CharField(max_length=100)
-    curpTutor = models.CharField(max_length=18)
-    scanIne = models.URLField()
+    curpTutor = models.CharField(max_length=18, db_index=True)
+    scanIne = DocumentField()
     telefono = models.CharField(max_length=20)
-    scanComprobanteDomicilio = models.URLField()
+    scanComprobanteDomicilio = DocumentField()
     emailPadreTutor = models.EmailField()
     alumno = models.ForeignKey('easyenroll.Alumno', on_delete=models.CASCADE)
+    fechaActualizacion = models.DateTimeField(auto_now=True)
 
 
 class AnexoAlumnos(models.Model):
@@ -49,7 +76,7 @@ class AnexoAlumnos(models.Model):
     curpAlumno = models.BooleanField(default=False)
     actaNacimiento = models.BooleanField(default=False)
     observaciones = models.TextField(blank=True)
-    cda = models.URLField(blank=True)
+    cda = DocumentField(blank=True)
     autorizacionIrseSolo = models.BooleanField(default=False)
     autorizacionPublicitaria = models.BooleanField(default=False)
     atencionPsicologica = models.BooleanField(default=False)
@@ -57,4 +84,43 @@ class AnexoAlumnos(models.Model):
     usoAparatoAuditivo = models.BooleanField(default=False)
     usoDeLentes = models.BooleanField(default=False)
     lateralidad = models.CharField(max_length=1)
-    idAlumno = models.ForeignKey('easyenroll.Alumno', on_delete=models.CASCADE)
\ No newline at end of file
+    idAlumno = models.ForeignKey('easyenroll.Alumno', on_delete=models.CASCADE)
+    fechaActualizacion = models.DateTimeField(auto_now=True)
+
+class ResumenPagoDiario(models.Model):
+    """Payments per day, method and discount, maintained by easyenroll.aggregates."""
+    id = models.AutoField(primary_key=True)
+    fecha = models.DateField()
+    metodoPago = models.CharField(max_length=2)
+    descuento = models.IntegerField(default=0)
+    cantidad = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = [('fecha', 'metodoPago', 'descuento')]
+
+
+class Documento(models.Model):
+    """An uploaded file, stored once per content under its SHA-256 by easyenroll.storage."""
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    tamano = models.BigIntegerField()
+    tipoContenido = models.CharField(max_length=100)
+    fechaSubida = models.DateTimeField(auto_now_add=True)
+    subidoPor = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, on_delete=models.SET_NULL, related_name='+')
+
+
+class Cambio(models.Model):
+    """An insert, update or delete of a synced row, logged by easyenroll.changes."""
+    id = models.BigAutoField(primary_key=True)
+    modelo = models.CharField(max_length=30)
+    objetoId = models.IntegerField()
+    operacion = models.CharField(max_length=1)
+    fecha = models.DateTimeField(auto_now_add=True)
+    # The PostgreSQL transaction that logged the change (0 elsewhere).
+    transaccion = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['modelo', 'objetoId'], name='cambio_objeto_idx'),
+            models.Index(fields=['transaccion', 'id'], name='cambio_transaccion_idx'),
+        ]
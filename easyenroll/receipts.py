@@ -0,0 +1,43 @@
+METODOS_PAGO = {'EF': 'Efectivo', 'TR': 'Transferencia', 'TC': 'Tarjeta'}
+
+
+def render(payment):
+    """A one-page PDF receipt; a payment always renders to the same bytes."""
+    return pdf([
+        'Recibo de pago %s' % payment.idRecibo,
+        'Fecha de pago: %s' % payment.fechaPago.isoformat(),
+        'Monto: $%s' % payment.monto,
+        'Descuento: %s%%' % payment.descuento,
+        'Método de pago: %s' % METODOS_PAGO.get(payment.metodoPago, payment.metodoPago),
+    ])
+
+
+def pdf(lines):
+    """A PDF with ``lines`` of Helvetica text, the first as a heading."""
+    def text(line):
+        line = line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+        return '(%s) Tj' % line
+
+    commands = ['BT', '/F1 18 Tf', '72 740 Td', text(lines[0]), '/F1 12 Tf']
+    for line in lines[1:]:
+        commands += ['0 -24 Td', text(line)]
+    commands.append('ET')
+    content = '\n'.join(commands).encode('cp1252', 'replace')
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+        b'<< /Length %d >>\nstream\n%s\nendstream' % (len(content), content),
+    ]
+    output = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref = len(output)
+    output += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    for offset in offsets:
+        output += b'%010d 00000 n \n' % offset
+    output += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(output)
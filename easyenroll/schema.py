@@ -1,36 +1,132 @@
+from collections import defaultdict
+
 from django.conf import settings
 import graphene
-from graphene_django import DjangoObjectType
-from .models import Inscripcion, Pago, Alumno, PadresTutores, AnexoAlumnos
+from .models import Inscripcion, Pago, Alumno, PadresTutores, AnexoAlumnos, ResumenPagoDiario, Cambio
+from .filters import StudentFilter, PaymentFilter, EnrollmentFilter
+from . import aggregates, changes
+from .storage import check_documents, missing_documents
+from .tasks import generate_receipt
+from .search import normalize_curp, search_students
+from .loaders import get_loaders, load_instance, load_related, load_related_set
 from users.schema import UserType
+from modulo_secundaria.jobs.schema import JobType
+from modulo_secundaria.optimizer import OptimizedDjangoObjectType
+from modulo_secundaria.pagination import KeysetConnectionField, cursor_to_pk, pk_to_cursor
+from modulo_secundaria import response_cache
+from modulo_secundaria.bulk import BulkError, bulk_create, bulk_errors, insert
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from graphene_django.settings import graphene_settings
+from graphql import GraphQLError
 
-class StudentType(DjangoObjectType):
+class StudentType(OptimizedDjangoObjectType):
     class Meta: 
         model = Alumno
 
-class EnrollmentType(DjangoObjectType):
+    def resolve_inscripcion_set(self, info):
+        return load_related_set(info, self, 'inscripcion_set')
+
+    def resolve_padrestutores_set(self, info):
+        return load_related_set(info, self, 'padrestutores_set')
+
+    def resolve_anexoalumnos_set(self, info):
+        return load_related_set(info, self, 'anexoalumnos_set')
+
+class EnrollmentType(OptimizedDjangoObjectType):
     class Meta:
         model = Inscripcion
 
-class PaymentType(DjangoObjectType):
+    def resolve_idUsuario(self, info):
+        return load_related(info, self, 'idUsuario')
+
+    def resolve_idPago(self, info):
+        return load_related(info, self, 'idPago')
+
+    def resolve_idAlumno(self, info):
+        return load_related(info, self, 'idAlumno')
+
+class PaymentType(OptimizedDjangoObjectType):
     class Meta:
         model = Pago
 
-class TutorType(DjangoObjectType):
+    def resolve_inscripcion_set(self, info):
+        return load_related_set(info, self, 'inscripcion_set')
+
+class TutorType(OptimizedDjangoObjectType):
     class Meta:
         model = PadresTutores
 
-class AnnexType(DjangoObjectType):
+    def resolve_alumno(self, info):
+        return load_related(info, self, 'alumno')
+
+class AnnexType(OptimizedDjangoObjectType):
     class Meta:
         model = AnexoAlumnos
 
+    def resolve_idAlumno(self, info):
+        return load_related(info, self, 'idAlumno')
+
+class PaymentGrouping(graphene.Enum):
+    DAY = 'day'
+    MONTH = 'month'
+    METODO_PAGO = 'metodoPago'
+    DESCUENTO = 'descuento'
+    MODALIDAD_PAGO = 'modalidadPago'
+
+class PaymentTotal(graphene.ObjectType):
+    key = graphene.String()
+    count = graphene.Int()
+    total = graphene.Float()
+    average = graphene.Float()
+
+class ChangeOperation(graphene.Enum):
+    INSERT = changes.INSERT
+    UPDATE = changes.UPDATE
+    DELETE = changes.DELETE
+
+class Change(graphene.ObjectType):
+    """A changed row, in the field for its type; that field is null once the row is deleted."""
+    cursor = graphene.String()
+    model = graphene.String()
+    object_id = graphene.Int()
+    operation = ChangeOperation()
+    student = graphene.Field(StudentType)
+    tutor = graphene.Field(TutorType)
+    enrollment = graphene.Field(EnrollmentType)
+    payment = graphene.Field(PaymentType)
+    annex = graphene.Field(AnnexType)
+
+CHANGE_FIELDS = {'alumno': 'student', 'padrestutores': 'tutor', 'inscripcion': 'enrollment', 'pago': 'payment', 'anexoalumnos': 'annex'}
+
+class ChangeFeed(graphene.ObjectType):
+    # Pass back as changesSince(cursor:) to get what changed after this page.
+    cursor = graphene.String()
+    has_more = graphene.Boolean()
+    changes = graphene.List(graphene.NonNull(Change))
+
 class Query(graphene.ObjectType):
-    students = graphene.List(StudentType)
-    enrollments = graphene.List(EnrollmentType)
-    payments = graphene.List(PaymentType)
-    tutors = graphene.List(TutorType)
-    annexes = graphene.List(AnnexType)
+    students = KeysetConnectionField(StudentType, filterset_class=StudentFilter)
+    enrollments = KeysetConnectionField(EnrollmentType, filterset_class=EnrollmentFilter)
+    payments = KeysetConnectionField(PaymentType, filterset_class=PaymentFilter)
+    tutors = KeysetConnectionField(TutorType)
+    annexes = KeysetConnectionField(AnnexType)
+    student_by_curp = graphene.Field(StudentType, curp=graphene.String(required=True))
+    tutors_by_curp = graphene.List(graphene.NonNull(TutorType), curp=graphene.String(required=True))
+    search_students = graphene.List(
+        graphene.NonNull(StudentType),
+        text=graphene.String(required=True),
+        first=graphene.Int(default_value=20),
+    )
+    payment_totals = graphene.List(
+        graphene.NonNull(PaymentTotal),
+        group_by=PaymentGrouping(),
+        fecha_pago_desde=graphene.Date(),
+        fecha_pago_hasta=graphene.Date(),
+        metodo_pago=graphene.String(),
+    )
+    changes_since = graphene.Field(ChangeFeed, cursor=graphene.String(), first=graphene.Int(default_value=100))
 
     def resolve_students(self, info):
         return Alumno.objects.all()
@@ -46,6 +142,57 @@ class Query(graphene.ObjectType):
 
     def resolve_annexes(self, info):
         return AnexoAlumnos.objects.all()
+
+    def resolve_student_by_curp(self, info, curp):
+        # CURP is not unique; the most recently registered student wins.
+        students = Alumno.objects.filter(curp=normalize_curp(curp)).order_by('-id')
+        return StudentType.get_queryset(students, info).first()
+
+    def resolve_tutors_by_curp(self, info, curp):
+        return TutorType.get_queryset(PadresTutores.objects.filter(curpTutor=normalize_curp(curp)).order_by('id'), info)
+
+    def resolve_search_students(self, info, text, first):
+        ids = search_students(text, min(max(first, 0), graphene_settings.RELAY_CONNECTION_MAX_LIMIT))
+        students = StudentType.get_queryset(Alumno.objects.filter(pk__in=ids), info).in_bulk()
+        return [students[pk] for pk in ids if pk in students]
+
+    def resolve_payment_totals(self, info, group_by=None, fecha_pago_desde=None, fecha_pago_hasta=None, metodo_pago=None):
+        return [
+            PaymentTotal(**row)
+            for row in aggregates.totals(group_by, fecha_pago_desde, fecha_pago_hasta, metodo_pago)
+        ]
+
+    def resolve_changes_since(self, info, first, cursor=None):
+        # Without a cursor the feed starts from the beginning of the (compacted) log.
+        try:
+            after = changes.parse_position(cursor_to_pk(cursor)) if cursor else (0, 0)
+        except ValueError:
+            raise GraphQLError('Invalid cursor: %s' % cursor)
+        entries, last, has_more = changes.changes_since(after, min(max(first, 0), graphene_settings.RELAY_CONNECTION_MAX_LIMIT))
+        pks = defaultdict(list)
+        for entry in entries:
+            pks[entry.modelo].append(entry.objetoId)
+        rows = {}
+        for name, ids in pks.items():
+            rows[name] = changes.TRACKED[name].objects.in_bulk(ids)
+            get_loaders(info).prime(*rows[name].values())
+        return ChangeFeed(
+            cursor=pk_to_cursor(changes.format_position(last)),
+            has_more=has_more,
+            changes=[
+                Change(
+                    cursor=pk_to_cursor(changes.format_position((entry.transaccion, entry.id))),
+                    model=entry.modelo,
+                    object_id=entry.objetoId,
+                    operation=entry.operacion,
+                    **{CHANGE_FIELDS[entry.modelo]: rows[entry.modelo].get(entry.objetoId)}
+                )
+                for entry in entries
+            ],
+        )
+
+response_cache.register_dependencies('paymentTotals', Pago, Inscripcion, ResumenPagoDiario)
+response_cache.register_dependencies('changesSince', Cambio)
     
 class CreateAlumno(graphene.Mutation):
     id = graphene.Int()
@@ -70,7 +217,9 @@ class CreateAlumno(graphene.Mutation):
 
     def mutate(self, info, nombre, apellido_paterno, apellido_materno, correo_institucional, curp, sexo, escuela_procedencia, grado_grupo_asignado):
         student = Alumno(nombre=nombre, apellidoPaterno=apellido_paterno, apellidoMaterno=apellido_materno, correoInstitucional=correo_institucional, curp=curp, sexo=sexo, escuelaProcedencia=escuela_procedencia, gradoGrupoAsignado=grado_grupo_asignado)
-        student.save()
+        with transaction.atomic():
+            student.save()
+        get_loaders(info).prime(student)
 
         return CreateAlumno(
             id=student.id,
@@ -92,6 +241,7 @@ class CreatePago(graphene.Mutation):
     monto = graphene.Float()
     fecha_pago = graphene.Date()
     metodo_pago = graphene.String()
+    receipt_job = graphene.Field(JobType)
 
     class Arguments:
         recibo = graphene.String()
@@ -101,9 +251,16 @@ class CreatePago(graphene.Mutation):
         fecha_pago = graphene.Date()
         metodo_pago = graphene.String()
 
-    def mutate(self, info, recibo, descuento, id_recibo, monto, fecha_pago, metodo_pago):
-        payment = Pago(recibo=recibo, descuento=descuento, idRecibo=id_recibo, monto=monto, fechaPago=fecha_pago, metodoPago=metodo_pago)
-        payment.save()
+    def mutate(self, info, descuento, id_recibo, monto, fecha_pago, metodo_pago, recibo=''):
+        payment = Pago(recibo=recibo or '', descuento=descuento, idRecibo=id_recibo, monto=monto, fechaPago=fecha_pago, metodoPago=metodo_pago)
+        check_documents(payment)
+        receipt_job = None
+        with transaction.atomic():
+            payment.save()
+            if not payment.recibo:
+                # Rendered by `manage.py run_jobs`, not while the client waits.
+                receipt_job = generate_receipt.enqueue(payment.idPago)
+        get_loaders(info).prime(payment)
 
         return CreatePago(
             id_pago=payment.idPago,
@@ -113,6 +270,7 @@ class CreatePago(graphene.Mutation):
             monto=payment.monto,
             fecha_pago=payment.fechaPago,
             metodo_pago=payment.metodoPago,
+            receipt_job=receipt_job,
         )
 
 class CreatePadresTutores(graphene.Mutation):
@@ -135,9 +293,12 @@ class CreatePadresTutores(graphene.Mutation):
         alumno_id = graphene.Int()
 
     def mutate(self, info, nombre_padre_tutor, curp_tutor, scan_ine, telefono, scan_comprobante_domicilio, email_padre_tutor, alumno_id):
-        student = Alumno.objects.get(pk=alumno_id)
+        student = load_instance(info, Alumno, alumno_id)
         tutor = PadresTutores(nombrePadreTutor=nombre_padre_tutor, curpTutor=curp_tutor, scanIne=scan_ine, telefono=telefono, scanComprobanteDomicilio=scan_comprobante_domicilio, emailPadreTutor=email_padre_tutor, alumno=student)
-        tutor.save()
+        check_documents(tutor)
+        with transaction.atomic():
+            tutor.save()
+        get_loaders(info).forget_related(tutor)
 
         return CreatePadresTutores(
             id=tutor.id,
@@ -168,9 +329,9 @@ class CreateInscripcion(graphene.Mutation):
         id_usuario = graphene.Int()
 
     def mutate(self, info, factura, tipo_inscripcion, modalidad_pago, id_alumno, id_pago, id_usuario):
-        student = Alumno.objects.get(pk=id_alumno)
-        payment = Pago.objects.get(pk=id_pago)
-        user = get_user_model().objects.get(pk=id_usuario)
+        student = load_instance(info, Alumno, id_alumno)
+        payment = load_instance(info, Pago, id_pago)
+        user = load_instance(info, get_user_model(), id_usuario)
         enrollment = Inscripcion(
             factura=factura,
             tipoInscripcion=tipo_inscripcion,
@@ -179,7 +340,10 @@ class CreateInscripcion(graphene.Mutation):
             idPago=payment,
             idUsuario=user
         )
-        enrollment.save()
+        with transaction.atomic():
+            enrollment.save()
+        get_loaders(info).prime(enrollment)
+        get_loaders(info).forget_related(enrollment)
 
         return CreateInscripcion(
             id=enrollment.id,
@@ -244,7 +408,7 @@ class createAnexoAlumnos(graphene.Mutation):
         id_alumno = graphene.Int()
 
     def mutate(self, info, carta_buena_conducta, certificado_primaria, curp_alumno, acta_nacimiento, observaciones, cda, autorizacion_irse_solo, autorizacion_publicitaria, atencion_psicologica, padecimiento, uso_aparato_auditivo, uso_de_lentes, lateralidad, id_alumno):
-        student = Alumno.objects.get(pk=id_alumno)
+        student = load_instance(info, Alumno, id_alumno)
         annex = AnexoAlumnos(
             cartaBuenaConducta=carta_buena_conducta,
             certificadoPrimaria=certificado_primaria,
@@ -261,7 +425,10 @@ class createAnexoAlumnos(graphene.Mutation):
             lateralidad=lateralidad,
             idAlumno=student
         )
-        annex.save()
+        check_documents(annex)
+        with transaction.atomic():
+            annex.save()
+        get_loaders(info).forget_related(annex)
 
         return createAnexoAlumnos(
             id=annex.id,
@@ -281,9 +448,210 @@ class createAnexoAlumnos(graphene.Mutation):
             alumno=annex.idAlumno,
         )
 
+class StudentInput(graphene.InputObjectType):
+    nombre = graphene.String()
+    apellido_paterno = graphene.String()
+    apellido_materno = graphene.String()
+    correo_institucional = graphene.String()
+    curp = graphene.String()
+    sexo = graphene.String()
+    escuela_procedencia = graphene.String()
+    grado_grupo_asignado = graphene.String()
+
+    def to_model(self):
+        return Alumno(nombre=self.nombre, apellidoPaterno=self.apellido_paterno, apellidoMaterno=self.apellido_materno, correoInstitucional=self.correo_institucional, curp=self.curp, sexo=self.sexo, escuelaProcedencia=self.escuela_procedencia, gradoGrupoAsignado=self.grado_grupo_asignado)
+
+class PaymentInput(graphene.InputObjectType):
+    recibo = graphene.String()
+    descuento = graphene.Int(default_value=0)
+    id_recibo = graphene.Int()
+    monto = graphene.Float()
+    fecha_pago = graphene.Date()
+    metodo_pago = graphene.String()
+
+    def to_model(self):
+        return Pago(recibo=self.recibo or '', descuento=self.descuento, idRecibo=self.id_recibo, monto=self.monto, fechaPago=self.fecha_pago, metodoPago=self.metodo_pago)
+
+class TutorInput(graphene.InputObjectType):
+    nombre_padre_tutor = graphene.String()
+    curp_tutor = graphene.String()
+    scan_ine = graphene.String()
+    telefono = graphene.String()
+    scan_comprobante_domicilio = graphene.String()
+    email_padre_tutor = graphene.String()
+    alumno_id = graphene.Int()
+
+    def to_model(self):
+        return PadresTutores(nombrePadreTutor=self.nombre_padre_tutor, curpTutor=self.curp_tutor, scanIne=self.scan_ine, telefono=self.telefono, scanComprobanteDomicilio=self.scan_comprobante_domicilio, emailPadreTutor=self.email_padre_tutor, alumno_id=self.alumno_id)
+
+class AnnexInput(graphene.InputObjectType):
+    carta_buena_conducta = graphene.Boolean(default_value=False)
+    certificado_primaria = graphene.Boolean(default_value=False)
+    curp_alumno = graphene.Boolean(default_value=False)
+    acta_nacimiento = graphene.Boolean(default_value=False)
+    observaciones = graphene.String(default_value='')
+    cda = graphene.String(default_value='')
+    autorizacion_irse_solo = graphene.Boolean(default_value=False)
+    autorizacion_publicitaria = graphene.Boolean(default_value=False)
+    atencion_psicologica = graphene.Boolean(default_value=False)
+    padecimiento = graphene.String(default_value='')
+    uso_aparato_auditivo = graphene.Boolean(default_value=False)
+    uso_de_lentes = graphene.Boolean(default_value=False)
+    lateralidad = graphene.String()
+    id_alumno = graphene.Int()
+
+    def to_model(self):
+        return AnexoAlumnos(
+            cartaBuenaConducta=self.carta_buena_conducta,
+            certificadoPrimaria=self.certificado_primaria,
+            curpAlumno=self.curp_alumno,
+            actaNacimiento=self.acta_nacimiento,
+            observaciones=self.observaciones,
+            cda=self.cda,
+            autorizacionIrseSolo=self.autorizacion_irse_solo,
+            autorizacionPublicitaria=self.autorizacion_publicitaria,
+            atencionPsicologica=self.atencion_psicologica,
+            padecimiento=self.padecimiento,
+            usoAparatoAuditivo=self.uso_aparato_auditivo,
+            usoDeLentes=self.uso_de_lentes,
+            lateralidad=self.lateralidad,
+            idAlumno_id=self.id_alumno,
+        )
+
+def run_bulk_create(info, model, items, all_or_nothing):
+    created, errors = bulk_create(model, [item.to_model() for item in items], all_or_nothing, [missing_documents])
+    loaders = get_loaders(info)
+    for instance in created:
+        loaders.prime(instance)
+        loaders.forget_related(instance)
+    return created, bulk_errors(errors)
+
+class CreateAlumnosBulk(graphene.Mutation):
+    students = graphene.List(StudentType)
+    errors = graphene.List(BulkError)
+
+    class Arguments:
+        input = graphene.List(graphene.NonNull(StudentInput), required=True)
+        all_or_nothing = graphene.Boolean(default_value=False)
+
+    def mutate(self, info, input, all_or_nothing):
+        students, errors = run_bulk_create(info, Alumno, input, all_or_nothing)
+        return CreateAlumnosBulk(students=students, errors=errors)
+
+class CreatePagosBulk(graphene.Mutation):
+    payments = graphene.List(PaymentType)
+    errors = graphene.List(BulkError)
+
+    class Arguments:
+        input = graphene.List(graphene.NonNull(PaymentInput), required=True)
+        all_or_nothing = graphene.Boolean(default_value=False)
+
+    def mutate(self, info, input, all_or_nothing):
+        with transaction.atomic():
+            payments, errors = run_bulk_create(info, Pago, input, all_or_nothing)
+            generate_receipt.enqueue_many([(payment.idPago,) for payment in payments if not payment.recibo])
+        return CreatePagosBulk(payments=payments, errors=errors)
+
+class CreatePadresTutoresBulk(graphene.Mutation):
+    tutors = graphene.List(TutorType)
+    errors = graphene.List(BulkError)
+
+    class Arguments:
+        input = graphene.List(graphene.NonNull(TutorInput), required=True)
+        all_or_nothing = graphene.Boolean(default_value=False)
+
+    def mutate(self, info, input, all_or_nothing):
+        tutors, errors = run_bulk_create(info, PadresTutores, input, all_or_nothing)
+        return CreatePadresTutoresBulk(tutors=tutors, errors=errors)
+
+class CreateAnexoAlumnosBulk(graphene.Mutation):
+    annexes = graphene.List(AnnexType)
+    errors = graphene.List(BulkError)
+
+    class Arguments:
+        input = graphene.List(graphene.NonNull(AnnexInput), required=True)
+        all_or_nothing = graphene.Boolean(default_value=False)
+
+    def mutate(self, info, input, all_or_nothing):
+        annexes, errors = run_bulk_create(info, AnexoAlumnos, input, all_or_nothing)
+        return CreateAnexoAlumnosBulk(annexes=annexes, errors=errors)
+
+class InscribirAlumno(graphene.Mutation):
+    enrollment = graphene.Field(EnrollmentType)
+
+    class Arguments:
+        student = StudentInput(required=True)
+        tutors = graphene.List(graphene.NonNull(TutorInput), default_value=[])
+        annex = AnnexInput()
+        payment = PaymentInput(required=True)
+        factura = graphene.Boolean(default_value=False)
+        tipo_inscripcion = graphene.String(required=True)
+        modalidad_pago = graphene.String(required=True)
+        id_usuario = graphene.Int(required=True)
+
+    def mutate(self, info, student, tutors, payment, factura, tipo_inscripcion, modalidad_pago, id_usuario, annex=None):
+        user = load_instance(info, get_user_model(), id_usuario)
+        student = student.to_model()
+        payment = payment.to_model()
+        tutors = [tutor.to_model() for tutor in tutors]
+        annexes = [annex.to_model()] if annex is not None else []
+        enrollment = Inscripcion(factura=factura, tipoInscripcion=tipo_inscripcion, modalidadPago=modalidad_pago, idUsuario=user)
+
+        errors = {}
+        for prefix, instances, exclude in [
+            ('student', [student], []),
+            ('payment', [payment], []),
+            ('tutors', tutors, ['alumno']),
+            ('annex', annexes, ['idAlumno']),
+            ('enrollment', [enrollment], ['idAlumno', 'idPago', 'idUsuario']),
+        ]:
+            for index, instance in enumerate(instances):
+                try:
+                    instance.full_clean(exclude=exclude, validate_unique=False)
+                except ValidationError as error:
+                    label = '%s.%d' % (prefix, index) if prefix == 'tutors' else prefix
+                    for name, messages in error.message_dict.items():
+                        errors['%s.%s' % (label, name)] = messages
+            for index, name, messages in missing_documents(instances):
+                label = '%s.%d' % (prefix, index) if prefix == 'tutors' else prefix
+                errors.setdefault('%s.%s' % (label, name), messages)
+        if errors:
+            raise ValidationError(errors)
+
+        with transaction.atomic():
+            student.save()
+            payment.save()
+            if not payment.recibo:
+                generate_receipt.enqueue(payment.idPago)
+            for instance in tutors:
+                instance.alumno = student
+            for instance in annexes:
+                instance.idAlumno = student
+            insert(PadresTutores, tutors)
+            insert(AnexoAlumnos, annexes)
+            enrollment.idAlumno = student
+            enrollment.idPago = payment
+            enrollment.save()
+
+        # Everything in the graph is new, so the loaders can answer every
+        # nested field of the response from memory.
+        loaders = get_loaders(info)
+        loaders.prime(student, payment, enrollment, *tutors, *annexes)
+        loaders.by_fk(PadresTutores, 'alumno').prime(student.pk, tutors)
+        loaders.by_fk(AnexoAlumnos, 'idAlumno').prime(student.pk, annexes)
+        loaders.by_fk(Inscripcion, 'idAlumno').prime(student.pk, [enrollment])
+        loaders.by_fk(Inscripcion, 'idPago').prime(payment.pk, [enrollment])
+        loaders.by_fk(Inscripcion, 'idUsuario').clear(user.pk)
+        return InscribirAlumno(enrollment=enrollment)
+
 class Mutation(graphene.ObjectType):
     create_student = CreateAlumno.Field()
     create_payment = CreatePago.Field()
     create_tutor = CreatePadresTutores.Field()
     create_enrollment = CreateInscripcion.Field()
     create_annex = createAnexoAlumnos.Field()
+    create_students = CreateAlumnosBulk.Field()
+    create_payments = CreatePagosBulk.Field()
+    create_tutors = CreatePadresTutoresBulk.Field()
+    create_annexes = CreateAnexoAlumnosBulk.Field()
+    enroll_student = InscribirAlumno.Field()
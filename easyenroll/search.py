@@ -0,0 +1,108 @@
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import BooleanField, F, Func, Q
+from django.db.models.expressions import RawSQL
+
+from .models import Alumno
+
+FTS_TABLE = 'easyenroll_alumno_fts'
+# Must match the trigram index expression in migration 0008 to use it.
+NAME = """easyenroll_unaccent("easyenroll_alumno"."nombre" || ' ' || "easyenroll_alumno"."apellidoPaterno" || ' ' || "easyenroll_alumno"."apellidoMaterno")"""
+# Defined by migration 0008 in PostgreSQL and by register_functions in SQLite.
+UNACCENT = 'easyenroll_unaccent'
+CURP_PREFIX = re.compile(r'[A-Za-z]{4}\d[A-Za-z0-9]*')
+
+_fts_tables = {}
+
+
+def normalize_curp(value):
+    return (value or '').strip().upper()
+
+
+def unaccent(value):
+    if value is None:
+        return None
+    return ''.join(char for char in unicodedata.normalize('NFKD', value) if not unicodedata.combining(char))
+
+
+def register_functions(sender, connection, **kwargs):
+    """connection_created handler giving SQLite the unaccent PostgreSQL gets from its extension."""
+    if connection.vendor == 'sqlite':
+        connection.connection.create_function(UNACCENT, 1, unaccent, deterministic=True)
+
+
+def has_fts_table():
+    if connection.alias not in _fts_tables:
+        _fts_tables[connection.alias] = FTS_TABLE in connection.introspection.table_names()
+    return _fts_tables[connection.alias]
+
+
+def search_students(text, limit=20):
+    """Ids of the students best matching ``text``, best first.
+
+    An email or a CURP prefix is looked up exactly through its index;
+    anything else is a prefix search over the student's full name.
+    """
+    text = (text or '').strip()
+    if not text:
+        return []
+    if '@' in text:
+        students = Alumno.objects.filter(correoInstitucional=text).order_by('-id')
+    elif CURP_PREFIX.fullmatch(text):
+        prefix = normalize_curp(text)
+        if connection.vendor == 'postgresql':
+            # Served by the varchar_pattern_ops index Django adds next to curp's.
+            students = Alumno.objects.filter(curp__startswith=prefix)
+        else:
+            # SQLite's LIKE is case-insensitive and cannot use the index; a range can.
+            students = Alumno.objects.filter(curp__gte=prefix, curp__lt=prefix + '\uffff')
+        students = students.order_by('curp', '-id')
+    else:
+        return _search_names(re.findall(r'\w+', text), limit)
+    return list(students.values_list('id', flat=True)[:limit])
+
+
+def _search_names(words, limit):
+    if not words:
+        return []
+    if connection.vendor == 'postgresql':
+        students = Alumno.objects.annotate(
+            rank=RawSQL('word_similarity(%%s, %s)' % NAME, [unaccent(' '.join(words))]),
+        )
+        for word in words:
+            # The word must start the name or follow one of its spaces.
+            pattern = _escape_like(unaccent(word))
+            students = students.filter(RawSQL(
+                '%s ILIKE %%s OR %s ILIKE %%s' % (NAME, NAME),
+                [pattern + '%', '% ' + pattern + '%'],
+                output_field=BooleanField(),
+            ))
+        return list(students.order_by('-rank', 'id').values_list('id', flat=True)[:limit])
+    if connection.vendor == 'sqlite' and has_fts_table():
+        # Every word must start some name; FTS5 ranks the matches with bm25.
+        query = ' '.join('"%s"*' % word for word in words)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT rowid FROM %s WHERE %s MATCH %%s ORDER BY rank LIMIT %%s' % (FTS_TABLE, FTS_TABLE),
+                [query, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+    students = Alumno.objects.all()
+    fields = ['nombre', 'apellidoPaterno', 'apellidoMaterno']
+    if connection.vendor == 'sqlite':
+        students = students.annotate(**{
+            'unaccented_' + field: Func(F(field), function=UNACCENT) for field in fields
+        })
+        fields = ['unaccented_' + field for field in fields]
+        words = [unaccent(word) for word in words]
+    condition = Q()
+    for word in words:
+        condition &= Q(*[Q(**{field + '__istartswith': word}) for field in fields], _connector=Q.OR)
+    students = students.filter(condition).order_by('apellidoPaterno', 'apellidoMaterno', 'nombre')
+    return list(students.values_list('id', flat=True)[:limit])
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
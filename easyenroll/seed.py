@@ -0,0 +1,168 @@
+import datetime
+import hashlib
+import random
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from . import aggregates, changes
+from .models import Alumno, AnexoAlumnos, Documento, Inscripcion, PadresTutores, Pago
+
+NOMBRES = ['Ana', 'Luis', 'María', 'José', 'Sofía', 'Diego', 'Valeria', 'Carlos', 'Fernanda', 'Jorge', 'Camila', 'Emiliano']
+APELLIDOS = ['Hernández', 'García', 'Martínez', 'López', 'González', 'Pérez', 'Rodríguez', 'Sánchez', 'Ramírez', 'Flores']
+ESCUELAS = ['Primaria Benito Juárez', 'Primaria Miguel Hidalgo', 'Colegio Morelos', 'Primaria Emiliano Zapata']
+GRUPOS = [grado + grupo for grado in '123' for grupo in 'ABCDE']
+METODOS_PAGO = ['EF', 'TR', 'TC']
+MODALIDADES_PAGO = ['C', 'P']
+TIPOS_INSCRIPCION = ['N', 'R']
+BATCH_SIZE = 1000
+# Distinct scans and receipts registered; rows share them, like siblings' tutors do.
+# Only their Documento rows are created: nothing is written to DOCUMENT_STORAGE.
+DOCUMENTS = 20
+
+
+def curp(rng, number):
+    # Unique per ``number`` so generated rows can be matched back to their keys.
+    return ''.join(rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in range(4)) + '%014d' % number
+
+
+def chunked_pks(model, field, values, flat=True):
+    """The pks of the rows of ``model`` whose ``field`` is in ``values``
+    (as ``(value, pk)`` pairs unless ``flat``), a few hundred values per query."""
+    pks = []
+    for offset in range(0, len(values), 500):
+        rows = model.objects.filter(**{field + '__in': values[offset:offset + 500]})
+        pks.extend(rows.values_list('pk', flat=True) if flat else rows.values_list(field, 'pk'))
+    return pks
+
+
+@transaction.atomic
+def generate(students=1000, users=None, seed=0):
+    """Fill the database with a reproducible school population.
+
+    Every student gets one payment, one enrollment and one annex, and one to
+    three tutors; enrollments are spread over ``users`` staff accounts.
+    Returns the number of rows created per model.
+    """
+    rng = random.Random(seed)
+    users = users or max(1, students // 100)
+    start = Alumno.objects.count()
+
+    User = get_user_model()
+    usernames = ['seed%d_%d' % (seed, number) for number in range(users)]
+    User.objects.bulk_create(
+        [User(username=username, email='%s@example.com' % username, is_staff=True) for username in usernames],
+        batch_size=BATCH_SIZE, ignore_conflicts=True,
+    )
+    user_ids = list(User.objects.filter(username__in=usernames).values_list('pk', flat=True))
+    contents = [b'%%PDF-1.4\n%% seed %d document %d\n' % (seed, number) for number in range(DOCUMENTS)]
+    Documento.objects.bulk_create([
+        Documento(sha256=hashlib.sha256(content).hexdigest(), tamano=len(content), tipoContenido='application/pdf')
+        for content in contents
+    ], ignore_conflicts=True)
+    documents = [hashlib.sha256(content).hexdigest() for content in contents]
+
+    curps = [curp(rng, start + number) for number in range(students)]
+    Alumno.objects.bulk_create([
+        Alumno(
+            nombre=rng.choice(NOMBRES),
+            apellidoPaterno=rng.choice(APELLIDOS),
+            apellidoMaterno=rng.choice(APELLIDOS),
+            correoInstitucional='alumno%d@secundaria.edu.mx' % (start + number),
+            curp=value,
+            sexo=rng.choice('HM'),
+            escuelaProcedencia=rng.choice(ESCUELAS),
+            gradoGrupoAsignado=rng.choice(GRUPOS),
+        )
+        for number, value in enumerate(curps)
+    ], batch_size=BATCH_SIZE)
+    # bulk_create does not return primary keys on every backend.
+    student_ids = dict(chunked_pks(Alumno, 'curp', curps, flat=False))
+    student_ids = [student_ids[value] for value in curps]
+
+    first_receipt = (Pago.objects.order_by('-idRecibo').values_list('idRecibo', flat=True).first() or 0) + 1
+    receipts = range(first_receipt, first_receipt + students)
+    today = datetime.date.today()
+    payments = [
+        Pago(
+            recibo=rng.choice(documents),
+            descuento=rng.choice([0, 0, 0, 10, 25, 50]),
+            idRecibo=receipt,
+            monto=Decimal(rng.choice([1500, 2500, 3200])).quantize(Decimal('0.01')),
+            fechaPago=today - datetime.timedelta(days=rng.randrange(365)),
+            metodoPago=rng.choice(METODOS_PAGO),
+        )
+        for receipt in receipts
+    ]
+    Pago.objects.bulk_create(payments, batch_size=BATCH_SIZE)
+    aggregates.record(payments)
+    payment_ids = dict(
+        Pago.objects.filter(idRecibo__range=(receipts.start, receipts.stop - 1)).values_list('idRecibo', 'idPago')
+    )
+
+    Inscripcion.objects.bulk_create([
+        Inscripcion(
+            factura=rng.random() < 0.3,
+            idUsuario_id=rng.choice(user_ids),
+            idPago_id=payment_ids[receipt],
+            idAlumno_id=student_id,
+            tipoInscripcion=rng.choice(TIPOS_INSCRIPCION),
+            modalidadPago=rng.choice(MODALIDADES_PAGO),
+        )
+        for receipt, student_id in zip(receipts, student_ids)
+    ], batch_size=BATCH_SIZE)
+
+    tutors = [
+        PadresTutores(
+            nombrePadreTutor='%s %s' % (rng.choice(NOMBRES), rng.choice(APELLIDOS)),
+            curpTutor=curp(rng, rng.randrange(10 ** 6)),
+            scanIne=rng.choice(documents),
+            telefono='55%08d' % rng.randrange(10 ** 8),
+            scanComprobanteDomicilio=rng.choice(documents),
+            emailPadreTutor='tutor%d_%d@example.com' % (student_id, number),
+            alumno_id=student_id,
+        )
+        for student_id in student_ids
+        for number in range(rng.choice([1, 2, 2, 3]))
+    ]
+    PadresTutores.objects.bulk_create(tutors, batch_size=BATCH_SIZE)
+
+    AnexoAlumnos.objects.bulk_create([
+        AnexoAlumnos(
+            cartaBuenaConducta=rng.random() < 0.9,
+            certificadoPrimaria=rng.random() < 0.95,
+            curpAlumno=True,
+            actaNacimiento=rng.random() < 0.97,
+            observaciones=rng.choice(['', '', 'Entregó documentos tarde.']),
+            autorizacionIrseSolo=rng.random() < 0.4,
+            autorizacionPublicitaria=rng.random() < 0.7,
+            atencionPsicologica=rng.random() < 0.1,
+            padecimiento=rng.choice(['', '', '', 'Asma']),
+            usoAparatoAuditivo=rng.random() < 0.02,
+            usoDeLentes=rng.random() < 0.2,
+            lateralidad=rng.choice('DDDDI'),
+            idAlumno_id=student_id,
+        )
+        for student_id in student_ids
+    ], batch_size=BATCH_SIZE)
+    # bulk_create sends no signals, so the change log is written here.
+    payment_ids = list(payment_ids.values())
+    changes.record(Alumno, student_ids, changes.INSERT)
+    changes.record(Pago, payment_ids, changes.INSERT)
+    for model, field, ids in [
+        (Inscripcion, 'idPago_id', payment_ids),
+        (PadresTutores, 'alumno_id', student_ids),
+        (AnexoAlumnos, 'idAlumno_id', student_ids),
+    ]:
+        changes.record(model, chunked_pks(model, field, ids), changes.INSERT)
+
+    return {
+        'users': users,
+        'documents': DOCUMENTS,
+        'students': students,
+        'payments': students,
+        'enrollments': students,
+        'tutors': len(tutors),
+        'annexes': students,
+    }
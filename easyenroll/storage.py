@@ -0,0 +1,193 @@
+import hashlib
+import os
+import re
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from .models import DocumentField, Documento, validate_content_id
+
+DEFAULTS = {
+    'ROOT': 'documents',
+    'MAX_SIZE': 20 * 1024 * 1024,
+    # With a front server that serves ROOT itself (nginx's internal location
+    # and X-Accel-Redirect, or Apache's X-Sendfile), downloads are handed over
+    # with this header and SENDFILE_PREFIX instead of streamed by Django.
+    'SENDFILE_HEADER': None,
+    'SENDFILE_PREFIX': '/protected/documents/',
+}
+CHUNK_SIZE = 64 * 1024
+# Leading bytes of the accepted formats: scans arrive as PDF, JPEG or PNG.
+SIGNATURES = [
+    (b'%PDF-', 'application/pdf'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+]
+EXTENSIONS = {'application/pdf': '.pdf', 'image/jpeg': '.jpg', 'image/png': '.png'}
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def config():
+    return dict(DEFAULTS, **getattr(settings, 'DOCUMENT_STORAGE', {}))
+
+
+def root():
+    return Path(settings.BASE_DIR, config()['ROOT'])
+
+
+def relative_path(content_id):
+    # Two levels of fan-out keep directories small.
+    return '%s/%s/%s' % (content_id[:2], content_id[2:4], content_id)
+
+
+def path_for(content_id):
+    return root() / relative_path(content_id)
+
+
+def sniff(head):
+    for signature, content_type in SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    return None
+
+
+def store(stream, user=None):
+    """Copy ``stream`` to disk in chunks, hashing as it goes; return ``(Documento, created)``.
+
+    The file is written to a temporary name and moved to its content address,
+    so content uploaded before (the same INE for two siblings) is kept once.
+    """
+    limit = config()['MAX_SIZE']
+    temporary = root() / 'tmp'
+    temporary.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    content_type = None
+    descriptor, name = tempfile.mkstemp(dir=temporary)
+    try:
+        with os.fdopen(descriptor, 'wb') as output:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                if content_type is None:
+                    content_type = sniff(chunk)
+                    if content_type is None:
+                        raise UploadError('Only PDF, JPEG and PNG files are accepted.', 415)
+                size += len(chunk)
+                if size > limit:
+                    raise UploadError('Files are limited to %d bytes.' % limit, 413)
+                digest.update(chunk)
+                output.write(chunk)
+            output.flush()
+            os.fsync(output.fileno())
+        if not size:
+            raise UploadError('The upload is empty.')
+        content_id = digest.hexdigest()
+        path = path_for(content_id)
+        if path.exists():
+            os.unlink(name)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(name, path)
+    except BaseException:
+        if os.path.exists(name):
+            os.unlink(name)
+        raise
+
+    try:
+        with transaction.atomic():
+            return Documento.objects.get_or_create(
+                sha256=content_id, defaults={'tamano': size, 'tipoContenido': content_type, 'subidoPor': user},
+            )
+    except IntegrityError:
+        # The same file uploaded at the same moment by someone else.
+        return Documento.objects.get(sha256=content_id), False
+
+
+def missing_documents(instances):
+    """``(index, field, messages)`` for document fields of ``instances`` naming
+    no uploaded document, found with one query."""
+    fields = [field for field in instances[0]._meta.concrete_fields if isinstance(field, DocumentField)] if instances else []
+    values = {getattr(instance, field.attname) for instance in instances for field in fields} - {'', None}
+    ids = {value for value in values if validate_content_id.regex.match(value)}
+    stored = set(Documento.objects.filter(sha256__in=ids).values_list('sha256', flat=True)) if ids else set()
+    errors = []
+    for index, instance in enumerate(instances):
+        for field in fields:
+            value = getattr(instance, field.attname)
+            if value in values - ids:
+                errors.append((index, field.name, [validate_content_id.message]))
+            elif value in ids - stored:
+                errors.append((index, field.name, ['Documento matching query does not exist.']))
+    return errors
+
+
+def check_documents(instance):
+    """Raise ValidationError unless every document field of ``instance`` holds an uploaded document's id."""
+    errors = {}
+    for field in instance._meta.concrete_fields:
+        if isinstance(field, DocumentField):
+            try:
+                field.clean(getattr(instance, field.attname), instance)
+            except ValidationError as error:
+                errors[field.name] = error.messages
+    for _, name, messages in missing_documents([instance]):
+        errors[name] = messages
+    if errors:
+        raise ValidationError(errors)
+
+
+def parse_range(header, size):
+    """The ``(start, end)`` bytes (inclusive) a Range header asks for.
+
+    None means serve the whole file (no header, or one this does not handle,
+    such as several ranges); ValueError means the range is unsatisfiable.
+    """
+    match = re.match(r'^bytes=(\d*)-(\d*)$', (header or '').strip())
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        length = int(last)
+        if not length:
+            raise ValueError(header)
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start > end:
+        if last and int(last) < start:
+            return None
+        raise ValueError(header)
+    return start, end
+
+
+class FileRange:
+    """``length`` bytes of an open file from its current position.
+
+    Iterating reads no further than the range, while fileno() lets a WSGI
+    server's file wrapper send it with sendfile(), which starts at the file's
+    offset and stops at the response's Content-Length.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size) if size else b''
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
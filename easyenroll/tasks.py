@@ -0,0 +1,21 @@
+import io
+
+from django.db import transaction
+
+from modulo_secundaria.jobs.queue import task
+
+from . import receipts, storage
+from .models import Pago
+
+
+@task
+def generate_receipt(payment_id):
+    """Render and store the receipt of a payment saved without one."""
+    payment = Pago.objects.filter(pk=payment_id).first()
+    if payment is None or payment.recibo:
+        return None
+    document, _ = storage.store(io.BytesIO(receipts.render(payment)))
+    payment.recibo = document.sha256
+    with transaction.atomic():
+        payment.save(update_fields=['recibo', 'fechaActualizacion'])
+    return document.sha256
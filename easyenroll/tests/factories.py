@@ -0,0 +1,77 @@
+import datetime
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+
+from easyenroll.models import Alumno, AnexoAlumnos, Inscripcion, PadresTutores, Pago
+
+# A well-formed document id; rows created here are not validated against Documento.
+DOCUMENT = '0' * 64
+
+
+def user(username='staff', **fields):
+    fields.setdefault('is_staff', True)
+    return get_user_model().objects.create(username=username, **fields)
+
+
+def student(number=0, **fields):
+    values = {
+        'nombre': 'Ana',
+        'apellidoPaterno': 'García',
+        'apellidoMaterno': 'López',
+        'correoInstitucional': 'alumno%d@secundaria.edu.mx' % number,
+        'curp': 'GALA%014d' % number,
+        'sexo': 'M',
+        'escuelaProcedencia': 'Primaria Benito Juárez',
+        'gradoGrupoAsignado': '1A',
+    }
+    values.update(fields)
+    return Alumno.objects.create(**values)
+
+
+def payment(number=0, **fields):
+    values = {
+        'recibo': DOCUMENT,
+        'idRecibo': number,
+        'monto': Decimal('1500.00'),
+        'fechaPago': datetime.date(2024, 8, 1),
+        'metodoPago': 'EF',
+    }
+    values.update(fields)
+    return Pago.objects.create(**values)
+
+
+def enrollment(student, payment, user, **fields):
+    values = {'tipoInscripcion': 'N', 'modalidadPago': 'C'}
+    values.update(fields)
+    return Inscripcion.objects.create(idAlumno=student, idPago=payment, idUsuario=user, **values)
+
+
+def tutor(student, number=0, **fields):
+    values = {
+        'nombrePadreTutor': 'Luis García',
+        'curpTutor': 'GALU%014d' % number,
+        'scanIne': DOCUMENT,
+        'telefono': '5500000000',
+        'scanComprobanteDomicilio': DOCUMENT,
+        'emailPadreTutor': 'tutor%d@example.com' % number,
+    }
+    values.update(fields)
+    return PadresTutores.objects.create(alumno=student, **values)
+
+
+def annex(student, **fields):
+    values = {'lateralidad': 'D', 'observaciones': 'Sin observaciones.'}
+    values.update(fields)
+    return AnexoAlumnos.objects.create(idAlumno=student, **values)
+
+
+def enrolled(count, user):
+    """``count`` students, each with a payment, an enrollment, a tutor and an annex."""
+    enrollments = []
+    for number in range(count):
+        pupil = student(number)
+        tutor(pupil, number)
+        annex(pupil)
+        enrollments.append(enrollment(pupil, payment(number), user))
+    return enrollments
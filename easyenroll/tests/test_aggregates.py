@@ -0,0 +1,89 @@
+import datetime
+import json
+from decimal import Decimal
+
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from django.test import TestCase
+
+from easyenroll import aggregates
+from easyenroll.models import Pago, ResumenPagoDiario
+
+from . import factories
+
+
+def plain(group_by, key):
+    """The totals computed straight from Pago, as paymentTotals reports them."""
+    rows = Pago.objects.values(key=key).annotate(count=Count('pk'), total=Sum('monto')).order_by('key')
+    return [aggregates._total(row, group_by) for row in rows]
+
+
+class SummaryTests(TestCase):
+    def setUp(self):
+        self.payments = [
+            factories.payment(0),
+            factories.payment(1, monto=Decimal('999.50'), metodoPago='TR'),
+            factories.payment(2, fechaPago=datetime.date(2024, 9, 3), descuento=25),
+        ]
+
+    def assertMatchesPago(self):
+        for group_by, key in [('day', F('fechaPago')), ('month', TruncMonth('fechaPago')), ('metodoPago', F('metodoPago'))]:
+            with self.subTest(group_by):
+                self.assertEqual(aggregates.totals(group_by), plain(group_by, key))
+        self.assertEqual(aggregates.totals()[0]['count'], Pago.objects.count())
+
+    def test_created_payments_are_counted_once(self):
+        self.assertMatchesPago()
+        self.assertEqual(ResumenPagoDiario.objects.aggregate(total=Sum('total'))['total'], Decimal('3999.50'))
+
+    def test_updates_move_the_payment(self):
+        payment = self.payments[0]
+        payment.monto = Decimal('1200.00')
+        payment.fechaPago = datetime.date(2024, 10, 1)
+        payment.save()
+        self.assertMatchesPago()
+        self.assertFalse(ResumenPagoDiario.objects.filter(fecha=datetime.date(2024, 8, 1), metodoPago='EF').exists())
+
+    def test_unrelated_updates_leave_the_summary_alone(self):
+        payment = self.payments[1]
+        payment.recibo = '1' * 64
+        # The UPDATE and its change log entry.
+        with self.assertNumQueries(2):
+            payment.save(update_fields=['recibo'])
+        payment.save()
+        self.assertMatchesPago()
+
+    def test_deletes(self):
+        self.payments[1].delete()
+        Pago.objects.filter(pk=self.payments[2].pk).delete()
+        self.assertMatchesPago()
+        self.assertEqual(ResumenPagoDiario.objects.count(), 1)
+
+    def test_rebuild_agrees(self):
+        self.payments[0].delete()
+        before = aggregates.totals('day')
+        self.assertEqual(aggregates.rebuild(), 2)
+        self.assertEqual(aggregates.totals('day'), before)
+
+
+class PaymentTotalsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = factories.user()
+        cls.siblings = factories.payment(0)
+        factories.enrollment(factories.student(0), cls.siblings, user, modalidadPago='C')
+        factories.enrollment(factories.student(1), cls.siblings, user, modalidadPago='P')
+        factories.enrollment(factories.student(2), factories.payment(1, monto=Decimal('800.00')), user, modalidadPago='P')
+        factories.payment(2)
+
+    def test_a_shared_payment_counts_once_per_modalidad_pago(self):
+        totals = {row['key']: (row['count'], row['total']) for row in aggregates.totals('modalidadPago')}
+        self.assertEqual(totals, {'C': (1, Decimal('1500.00')), 'P': (1, Decimal('800.00'))})
+
+    def test_graphql(self):
+        response = self.client.post('/graphql/', json.dumps({
+            'query': '{ paymentTotals(groupBy: METODO_PAGO) { key count total average } }',
+        }), content_type='application/json')
+        self.assertEqual(response.json()['data']['paymentTotals'], [
+            {'key': 'EF', 'count': 3, 'total': 3800.0, 'average': 1266.67},
+        ])
@@ -0,0 +1,93 @@
+import random
+
+from django.test import TestCase
+
+from easyenroll import benchmark
+
+from . import factories
+
+
+def results(database='sqlite', **operations):
+    return {'meta': {'database': database}, 'operations': operations}
+
+
+class StatisticsTests(TestCase):
+    def test_percentile_is_nearest_rank(self):
+        values = [float(value) for value in range(1, 101)]
+        self.assertEqual(benchmark.percentile(values, 0.50), 50.0)
+        self.assertEqual(benchmark.percentile(values, 0.99), 99.0)
+        self.assertEqual(benchmark.percentile([3.0], 0.95), 3.0)
+        self.assertEqual(benchmark.percentile([], 0.5), 0.0)
+
+    def test_summarize_reports_the_worst_sql_count(self):
+        summary = benchmark.summarize([0.002, 0.001, 0.003, 0.004], [3, 5, 3, 3], errors=1)
+        self.assertEqual(summary, {
+            'operations': 4, 'opsPerSecond': 400.0, 'p50Ms': 2.0, 'p95Ms': 4.0, 'p99Ms': 4.0,
+            'sqlQueries': 5, 'errors': 1,
+        })
+
+
+class CompareTests(TestCase):
+    baseline = results(students={'sqlQueries': 2, 'p95Ms': 10.0}, users={'sqlQueries': 1, 'p95Ms': 4.0})
+
+    def test_within_tolerance(self):
+        run = results(students={'sqlQueries': 2, 'p95Ms': 12.0}, users={'sqlQueries': 1, 'p95Ms': 1.0})
+        self.assertEqual(benchmark.compare(run, self.baseline, 0.25), [])
+
+    def test_extra_queries_and_slow_operations_regress(self):
+        run = results(students={'sqlQueries': 3, 'p95Ms': 10.0}, users={'sqlQueries': 1, 'p95Ms': 5.5})
+        self.assertEqual(benchmark.compare(run, self.baseline, 0.25), [
+            'students: 3 SQL queries, baseline 2',
+            'users: p95 5.5 ms, baseline 4.0 ms',
+        ])
+
+    def test_operations_missing_from_either_side_are_ignored(self):
+        run = results(students={'sqlQueries': 2, 'p95Ms': 10.0}, payments={'sqlQueries': 9, 'p95Ms': 99.0})
+        self.assertEqual(benchmark.compare(run, self.baseline, 0.25), [])
+
+    def test_other_database_vendor(self):
+        run = results('postgresql', students={'sqlQueries': 2, 'p95Ms': 10.0})
+        self.assertEqual(
+            benchmark.compare(run, self.baseline, 0.25), ['baseline was recorded on sqlite, this run used postgresql'],
+        )
+
+
+class RunTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = factories.user()
+        factories.enrolled(3, cls.user)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.state = benchmark.State(random.Random(0))
+
+    def workloads(self, *names):
+        return [workload for workload in benchmark.WORKLOADS if workload.name in names]
+
+    def test_every_run_is_sampled(self):
+        workloads = self.workloads('studentsPage', 'enrollmentsNested', 'users')
+        measured = benchmark.run(self.client, workloads, self.state, iterations=2, warmup=1)
+        # studentsPage has weight 4, enrollmentsNested 3 and users 1.
+        self.assertEqual(measured['total']['operations'], 2 * (4 + 3 + 1))
+        self.assertEqual({name: stats['operations'] for name, stats in measured['operations'].items()}, {
+            'studentsPage': 8, 'enrollmentsNested': 6, 'users': 2,
+        })
+        for name, stats in measured['operations'].items():
+            self.assertEqual(stats['errors'], 0, name)
+            self.assertGreater(stats['sqlQueries'], 0, name)
+            self.assertLessEqual(stats['p50Ms'], stats['p95Ms'])
+
+    def test_same_seed_same_variables(self):
+        workload, = self.workloads('studentsPage')
+        first = [workload.variables(benchmark.State(random.Random(7))) for _ in range(3)]
+        second = [workload.variables(benchmark.State(random.Random(7))) for _ in range(3)]
+        self.assertEqual(first, second)
+
+    def test_graphql_errors_count_as_failures(self):
+        broken = benchmark.Workload('broken', '{ nope }')
+        _, _, failed = benchmark.execute(self.client, broken, self.state)
+        self.assertTrue(failed)
+        _, sql, failed = benchmark.execute(self.client, self.workloads('users')[0], self.state)
+        self.assertFalse(failed)
+        self.assertGreater(sql, 0)
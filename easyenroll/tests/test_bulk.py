@@ -0,0 +1,87 @@
+from django.test import TestCase
+
+from easyenroll.models import Alumno, Documento, PadresTutores
+from modulo_secundaria.schema import schema
+
+from . import factories
+
+CREATE_STUDENTS = '''mutation ($input: [StudentInput!]!, $allOrNothing: Boolean) {
+    createStudents(input: $input, allOrNothing: $allOrNothing) {
+        students { id curp }
+        errors { index field messages }
+    }
+}'''
+
+CREATE_TUTORS = '''mutation ($input: [TutorInput!]!) {
+    createTutors(input: $input) {
+        tutors { id alumno { curp } }
+        errors { index field messages }
+    }
+}'''
+
+
+def student_input(number, **fields):
+    values = {
+        'nombre': 'Ana', 'apellidoPaterno': 'García', 'apellidoMaterno': 'López',
+        'correoInstitucional': 'alumno%d@secundaria.edu.mx' % number, 'curp': 'GALA%014d' % number,
+        'sexo': 'M', 'escuelaProcedencia': 'Primaria', 'gradoGrupoAsignado': '1A',
+    }
+    values.update(fields)
+    return values
+
+
+class BulkMutationTests(TestCase):
+    def test_valid_rows_are_created_and_invalid_ones_reported(self):
+        rows = [student_input(0), student_input(1, correoInstitucional='not an email'), student_input(2, sexo='')]
+        result = schema.execute(CREATE_STUDENTS, variables={'input': rows})
+        self.assertIsNone(result.errors)
+        data = result.data['createStudents']
+        self.assertEqual([student['curp'] for student in data['students']], ['GALA00000000000000'])
+        self.assertEqual(
+            [(error['index'], error['field']) for error in data['errors']],
+            [(1, 'correoInstitucional'), (2, 'sexo')],
+        )
+        self.assertEqual(Alumno.objects.count(), 1)
+
+    def test_all_or_nothing(self):
+        rows = [student_input(0), student_input(1, curp='')]
+        result = schema.execute(CREATE_STUDENTS, variables={'input': rows, 'allOrNothing': True})
+        self.assertEqual(result.data['createStudents']['students'], [])
+        self.assertEqual(len(result.data['createStudents']['errors']), 1)
+        self.assertFalse(Alumno.objects.exists())
+
+    def test_foreign_keys_and_documents_are_checked(self):
+        student = factories.student()
+        Documento.objects.create(sha256=factories.DOCUMENT, tamano=1, tipoContenido='application/pdf')
+        tutor = {
+            'nombrePadreTutor': 'Luis', 'curpTutor': 'GALU00000000000000', 'telefono': '5500000000',
+            'emailPadreTutor': 'tutor@example.com', 'scanIne': factories.DOCUMENT,
+            'scanComprobanteDomicilio': factories.DOCUMENT, 'alumnoId': student.pk,
+        }
+        rows = [
+            tutor, dict(tutor, alumnoId=student.pk + 1), dict(tutor, scanIne='1' * 64),
+            dict(tutor, scanIne='https://example.com/ine.pdf'),
+        ]
+        result = schema.execute(CREATE_TUTORS, variables={'input': rows})
+        self.assertIsNone(result.errors)
+        data = result.data['createTutors']
+        self.assertEqual(data['tutors'], [{'id': str(PadresTutores.objects.get().pk), 'alumno': {'curp': student.curp}}])
+        self.assertEqual(
+            [(error['index'], error['field']) for error in data['errors']],
+            [(1, 'alumno'), (2, 'scanIne'), (3, 'scanIne')],
+        )
+
+    def test_missing_documents_are_reported_per_row(self):
+        student = factories.student()
+        Documento.objects.create(sha256=factories.DOCUMENT, tamano=1, tipoContenido='application/pdf')
+        tutor = {
+            'nombrePadreTutor': 'Luis', 'curpTutor': 'GALU00000000000000', 'telefono': '5500000000',
+            'emailPadreTutor': 'tutor@example.com', 'scanIne': factories.DOCUMENT,
+            'scanComprobanteDomicilio': factories.DOCUMENT, 'alumnoId': student.pk,
+        }
+        without_scan = {name: value for name, value in tutor.items() if name != 'scanIne'}
+        result = schema.execute(CREATE_TUTORS, variables={'input': [tutor, without_scan]})
+        self.assertIsNone(result.errors)
+        data = result.data['createTutors']
+        self.assertEqual(len(data['tutors']), 1)
+        self.assertEqual(data['errors'], [{'index': 1, 'field': 'scanIne', 'messages': ['This field cannot be null.']}])
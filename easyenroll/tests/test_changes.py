@@ -0,0 +1,135 @@
+from unittest import mock
+
+from django.db import connection, transaction
+from django.test import RequestFactory, TestCase
+
+from easyenroll import changes
+from easyenroll.models import Alumno, Cambio
+from modulo_secundaria.pagination import pk_to_cursor
+from modulo_secundaria.schema import schema
+
+from . import factories
+
+FEED = '''query ($cursor: String, $first: Int) {
+    changesSince(cursor: $cursor, first: $first) { cursor hasMore changes {
+        cursor model objectId operation student { curp }
+    } }
+}'''
+
+
+class ChangeLogTests(TestCase):
+    def feed(self, cursor=None, first=100):
+        result = schema.execute(FEED, context_value=RequestFactory().post('/graphql/'), variable_values={
+            'cursor': cursor, 'first': first,
+        })
+        self.assertIsNone(result.errors)
+        return result.data['changesSince']
+
+    def summary(self, feed):
+        return [(change['objectId'], change['operation']) for change in feed['changes']]
+
+    def test_entries_are_written_with_the_change(self):
+        with transaction.atomic():
+            student = factories.student(0)
+            self.assertEqual(list(Cambio.objects.values_list('objetoId', 'operacion')), [(student.pk, changes.INSERT)])
+        try:
+            with transaction.atomic():
+                factories.student(1)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(Cambio.objects.count(), 1)
+
+    def test_paging(self):
+        students = [factories.student(number) for number in range(3)]
+        students[0].nombre = 'Eva'
+        students[0].save()
+        first = self.feed(first=2)
+        self.assertTrue(first['hasMore'])
+        self.assertEqual(self.summary(first), [(students[0].pk, 'INSERT'), (students[1].pk, 'INSERT')])
+        self.assertEqual(first['cursor'], first['changes'][-1]['cursor'])
+
+        second = self.feed(first['cursor'], first=2)
+        self.assertFalse(second['hasMore'])
+        self.assertEqual(self.summary(second), [(students[2].pk, 'INSERT'), (students[0].pk, 'UPDATE')])
+        # Only the latest entry of a row changed several times is listed.
+        self.assertEqual(self.summary(self.feed()), [
+            (students[1].pk, 'INSERT'), (students[2].pk, 'INSERT'), (students[0].pk, 'UPDATE'),
+        ])
+
+        deleted_pk = students[1].pk
+        students[1].delete()
+        third = self.feed(second['cursor'])
+        self.assertEqual(self.summary(third), [(deleted_pk, 'DELETE')])
+        self.assertIsNone(third['changes'][0]['student'])
+        self.assertEqual(self.feed(third['cursor']), {'cursor': third['cursor'], 'hasMore': False, 'changes': []})
+
+    def test_cursors(self):
+        first, second = factories.student(0), factories.student(1)
+        entry = Cambio.objects.get(objetoId=first.pk)
+        # Cursors from before transactions were logged hold only the entry id.
+        self.assertEqual(self.summary(self.feed(pk_to_cursor(entry.id))), [(second.pk, 'INSERT')])
+        self.assertEqual(changes.parse_position('7'), (0, 7))
+        self.assertEqual(changes.parse_position(changes.format_position((12, 7))), (12, 7))
+        for value in ['', 'x', '1:2:3']:
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                changes.parse_position(value)
+
+        result = schema.execute(FEED, context_value=RequestFactory().post('/graphql/'), variable_values={
+            'cursor': pk_to_cursor('1:x'),
+        })
+        self.assertIn('Invalid cursor', result.errors[0].message)
+
+    def test_compaction_keeps_the_latest_entry_per_row(self):
+        kept, deleted = factories.student(0), factories.student(1)
+        for student in [kept, deleted]:
+            student.nombre = 'Eva'
+            student.save()
+        deleted_pk = deleted.pk
+        deleted.delete()
+        self.assertEqual(changes.compact(batch_size=2), 3)
+        self.assertEqual(changes.compact(), 0)
+        self.assertEqual(
+            sorted(Cambio.objects.values_list('objetoId', 'operacion')),
+            sorted([(kept.pk, changes.UPDATE), (deleted_pk, changes.DELETE)]),
+        )
+        feed = self.feed()
+        self.assertEqual(self.summary(feed), [(kept.pk, 'UPDATE'), (deleted_pk, 'DELETE')])
+        self.assertEqual(feed['changes'][0]['student'], {'curp': kept.curp})
+        self.assertFalse(Alumno.objects.filter(pk=deleted_pk).exists())
+
+
+class TransactionOrderTests(TestCase):
+    """PostgreSQL's transaction ids, stood in for by SQLite functions."""
+
+    def setUp(self):
+        self.current, self.oldest_running = 0, 0
+        connection.ensure_connection()
+        connection.connection.create_function('txid_current', 0, lambda: self.current)
+        connection.connection.create_function('txid_current_snapshot', 0, lambda: None)
+        connection.connection.create_function('txid_snapshot_xmin', 1, lambda snapshot: self.oldest_running)
+        patcher = mock.patch.object(connection, 'vendor', 'postgresql')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def log(self, transaccion, number):
+        self.current = transaccion
+        return factories.student(number).pk
+
+    def test_entries_wait_for_older_transactions(self):
+        late = self.log(9, 0)
+        first = self.log(10, 1)
+        second = self.log(11, 2)
+        self.assertEqual(Cambio.objects.get(objetoId=first).transaccion, 10)
+
+        # Transaction 9 still runs: its entry, though the first id, could commit after the others.
+        self.oldest_running = 9
+        self.assertEqual(changes.changes_since((0, 0), 100), ([], (0, 0), False))
+
+        self.oldest_running = 11
+        entries, position, _ = changes.changes_since((0, 0), 100)
+        self.assertEqual([entry.objetoId for entry in entries], [late, first])
+
+        self.oldest_running = 12
+        entries, _, _ = changes.changes_since(position, 100)
+        self.assertEqual([entry.objetoId for entry in entries], [second])
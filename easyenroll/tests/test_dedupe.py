@@ -0,0 +1,94 @@
+import csv
+import io
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from easyenroll import dedupe
+
+from . import factories
+
+
+def students(*rows):
+    return [dedupe.SPECS['alumnos'].prepare((pk,) + row) for pk, row in enumerate(rows, 1)]
+
+
+class MatchingTests(SimpleTestCase):
+    def test_normalize(self):
+        self.assertEqual(dedupe.normalize('  José  María-Núñez '), 'JOSE MARIA NUNEZ')
+        self.assertEqual(dedupe.normalize(None), '')
+
+    def test_phonetic_keys_of_spelling_variants_agree(self):
+        for first, second in [('Hernández', 'Ernandes'), ('Vázquez', 'Basques'), ('Llamas', 'Yamas'), ('Cecilia', 'Sesilia')]:
+            with self.subTest(first):
+                self.assertEqual(dedupe.phonetic(first), dedupe.phonetic(second))
+        self.assertNotEqual(dedupe.phonetic('García'), dedupe.phonetic('Gómez'))
+
+    def test_jaro_winkler(self):
+        self.assertAlmostEqual(dedupe.jaro_winkler('MARTHA', 'MARHTA'), 0.961, places=3)
+        self.assertEqual(dedupe.jaro_winkler('ANA', 'ANA'), 1.0)
+        self.assertEqual(dedupe.jaro_winkler('', ''), 0.0)
+        self.assertEqual(dedupe.jaro_winkler('ABC', 'XYZ'), 0.0)
+
+    def test_different_curps_tell_namesakes_apart(self):
+        spec = dedupe.SPECS['alumnos']
+        same, typo, namesake, missing = students(
+            ('GALA100101HDFRPN01', 'Ana', 'García', 'López'),
+            ('GALA100101HDFRPN02', 'Anna', 'Garcia', 'Lopez'),
+            ('GALA121212MJCXYZ09', 'Ana', 'García', 'López'),
+            ('', 'Ana', 'García', 'López'),
+        )
+        self.assertGreater(spec.score(same, typo), 0.9)
+        self.assertLess(spec.score(same, namesake), 0.9)
+        self.assertEqual(spec.score(same, missing), 0.95)
+
+    def test_clusters_are_transitive(self):
+        self.assertEqual(dedupe.clusters({(5, 9): 0.95, (2, 9): 0.92, (3, 4): 0.99}), [[2, 5, 9], [3, 4]])
+
+
+class FindDuplicatesTests(SimpleTestCase):
+    records = students(
+        ('GALA100101HDFRPN01', 'Ana', 'García', 'López'),
+        ('GALA100101HDFRPN01', 'Ana', 'Garsia', 'Lopes'),
+        ('MEJO090909HDFRRS05', 'José', 'Méndez', 'Ruiz'),
+        ('', 'Jose', 'Mendes', 'Ruiz'),
+        ('PERO080808MDFRRS03', 'Rosa', 'Pérez', 'Ortiz'),
+    )
+
+    def test_only_blocked_pairs_above_the_threshold(self):
+        pairs, oversized = dedupe.find_duplicates('alumnos', self.records, workers=1)
+        self.assertEqual(set(pairs), {(1, 2), (3, 4)})
+        self.assertEqual(oversized, 0)
+
+    def test_worker_processes_agree(self):
+        self.assertEqual(
+            dedupe.find_duplicates('alumnos', self.records, workers=2),
+            dedupe.find_duplicates('alumnos', self.records, workers=1),
+        )
+
+    def test_oversized_blocks_are_skipped(self):
+        pairs, oversized = dedupe.find_duplicates('alumnos', self.records, max_block=1, workers=1)
+        # Ana's records share their sound, CURP, birth date and initials keys; José's their sound key.
+        self.assertEqual((pairs, oversized), ({}, 5))
+
+
+class FindDuplicatesCommandTests(TestCase):
+    def test_tutor_merges(self):
+        pupil = factories.student()
+        keep = factories.tutor(pupil, 1, nombrePadreTutor='Luis García Pérez', telefono='55 1234 5678')
+        merge = factories.tutor(pupil, 2, nombrePadreTutor='Luis Garcia Peres', telefono='5512345678')
+        factories.tutor(pupil, 3, nombrePadreTutor='Marta Ruiz Soto', telefono='5587654321')
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'tutores.csv')
+        stderr = io.StringIO()
+        call_command('find_duplicates', 'tutores', workers=1, output=path, stderr=stderr)
+
+        with open(path, encoding='utf-8') as output:
+            rows = list(csv.DictReader(output))
+        self.assertEqual([(row['keep_id'], row['merge_id']) for row in rows], [(str(keep.pk), str(merge.pk))])
+        self.assertEqual(rows[0]['merge_telefono'], '5512345678')
+        self.assertIn('3 tutores: 1 candidate pairs in 1 groups', stderr.getvalue())
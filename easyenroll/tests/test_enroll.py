@@ -0,0 +1,94 @@
+from unittest import mock
+
+from django.db import IntegrityError, connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from easyenroll.models import Alumno, AnexoAlumnos, Documento, Inscripcion, PadresTutores, Pago
+from modulo_secundaria.schema import schema
+
+from . import factories
+from .test_bulk import student_input
+
+ENROLL = '''mutation ($student: StudentInput!, $tutors: [TutorInput!], $payment: PaymentInput!, $idUsuario: Int!) {
+    enrollStudent(student: $student, tutors: $tutors, payment: $payment, annex: {lateralidad: "D"},
+                  tipoInscripcion: "N", modalidadPago: "C", idUsuario: $idUsuario) {
+        enrollment {
+            id tipoInscripcion idUsuario { username } idPago { monto inscripcionSet { id } }
+            idAlumno { curp padrestutoresSet { nombrePadreTutor } anexoalumnosSet { lateralidad } }
+        }
+    }
+}'''
+
+MODELS = [Alumno, Pago, Inscripcion, PadresTutores, AnexoAlumnos]
+
+
+def tutor_input(number, **fields):
+    values = {
+        'nombrePadreTutor': 'Tutor %d' % number, 'curpTutor': 'GALU%014d' % number, 'telefono': '5500000000',
+        'emailPadreTutor': 'tutor%d@example.com' % number, 'scanIne': factories.DOCUMENT,
+        'scanComprobanteDomicilio': factories.DOCUMENT,
+    }
+    values.update(fields)
+    return values
+
+
+class EnrollStudentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = factories.user()
+        Documento.objects.create(sha256=factories.DOCUMENT, tamano=1, tipoContenido='application/pdf')
+
+    def enroll(self, tutors):
+        values = {
+            'student': student_input(0),
+            'tutors': tutors,
+            'payment': {'idRecibo': 1, 'monto': 1500, 'fechaPago': '2024-08-01', 'metodoPago': 'EF'},
+            'idUsuario': self.user.pk,
+        }
+        with CaptureQueriesContext(connection) as queries:
+            result = schema.execute(ENROLL, variables=values, context_value=RequestFactory().post('/graphql/'))
+        return result, len(queries)
+
+    def counts(self):
+        return [model.objects.count() for model in MODELS]
+
+    def test_enrolls_the_whole_graph(self):
+        result, _ = self.enroll([tutor_input(0), tutor_input(1)])
+        self.assertIsNone(result.errors)
+        enrollment = result.data['enrollStudent']['enrollment']
+        self.assertEqual(enrollment['idUsuario']['username'], self.user.username)
+        self.assertEqual(enrollment['idPago']['inscripcionSet'], [{'id': enrollment['id']}])
+        self.assertEqual(enrollment['idAlumno']['padrestutoresSet'], [{'nombrePadreTutor': 'Tutor 0'}, {'nombrePadreTutor': 'Tutor 1'}])
+        self.assertEqual(enrollment['idAlumno']['anexoalumnosSet'], [{'lateralidad': 'D'}])
+        self.assertEqual(self.counts(), [1, 1, 1, 2, 1])
+
+    def test_statement_count_does_not_grow_with_tutors(self):
+        # The first run fills per-process caches such as the content types.
+        self.enroll([tutor_input(0)])
+        _, one = self.enroll([tutor_input(0)])
+        _, three = self.enroll([tutor_input(number) for number in range(1, 4)])
+        # Without INSERT ... RETURNING the tutors are saved (and logged) one by one.
+        extra = 0 if connection.features.can_return_rows_from_bulk_insert else 4
+        self.assertEqual(three, one + extra)
+
+    def test_invalid_rows_write_nothing(self):
+        result, _ = self.enroll([tutor_input(0), tutor_input(1, emailPadreTutor='nope', scanIne='1' * 64)])
+        self.assertEqual(self.counts(), [0, 0, 0, 0, 0])
+        message = result.errors[0].message
+        self.assertIn('tutors.1.emailPadreTutor', message)
+        self.assertIn('tutors.1.scanIne', message)
+
+    def test_failed_write_rolls_back_the_enrollment(self):
+        with mock.patch('easyenroll.schema.insert', side_effect=IntegrityError('tutor rejected')):
+            result, _ = self.enroll([tutor_input(0)])
+        self.assertIn('tutor rejected', result.errors[0].message)
+        self.assertEqual(self.counts(), [0, 0, 0, 0, 0])
+
+    def test_required_arguments(self):
+        result = schema.execute('''mutation {
+            enrollStudent(student: {nombre: "Ana"}, payment: {monto: 1}) { enrollment { id } }
+        }''')
+        messages = ' '.join(error.message for error in result.errors)
+        for argument in ['tipoInscripcion', 'modalidadPago', 'idUsuario']:
+            self.assertIn('argument "%s" of type' % argument, messages)
@@ -0,0 +1,68 @@
+import csv
+import gzip
+import io
+import json
+
+from django.test import TestCase
+from django.urls import reverse
+
+from easyenroll.views import EXPORT_COLUMNS
+
+from . import factories
+
+
+def content(response):
+    return b''.join(response.streaming_content)
+
+
+class ExportEnrollmentsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = factories.user()
+        cls.enrollments = factories.enrolled(3, cls.user)
+        cls.enrollments[1].idAlumno.gradoGrupoAsignado = '2B'
+        cls.enrollments[1].idAlumno.save()
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def export(self, **params):
+        return self.client.get(reverse('export-enrollments'), params)
+
+    def test_staff_only(self):
+        self.client.logout()
+        self.assertEqual(self.export().status_code, 302)
+
+    def test_csv(self):
+        response = self.export()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('inscripciones.csv', response['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(content(response).decode())))
+        self.assertEqual(rows[0], [name for name, _ in EXPORT_COLUMNS])
+        self.assertEqual([row[0] for row in rows[1:]], [str(enrollment.pk) for enrollment in self.enrollments])
+        first = dict(zip(rows[0], rows[1]))
+        self.assertEqual(first['curp'], self.enrollments[0].idAlumno.curp)
+        self.assertEqual(first['monto'], '1500.00')
+        self.assertEqual(first['usuario'], self.user.username)
+
+    def test_ndjson_with_filter(self):
+        response = self.export(format='ndjson', grupo='2B')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in content(response).decode().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.enrollments[1].pk])
+        self.assertEqual(rows[0]['gradoGrupoAsignado'], '2B')
+        self.assertEqual(rows[0]['fechaPago'], '2024-08-01')
+
+    def test_gzip(self):
+        response = self.export(gzip='1')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('inscripciones.csv.gz', response['Content-Disposition'])
+        lines = gzip.decompress(content(response)).decode().splitlines()
+        self.assertEqual(len(lines), 4)
+
+    def test_bad_parameters(self):
+        self.assertEqual(self.export(format='xml').status_code, 400)
+        response = self.export(fechaPagoDesde='yesterday')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fechaPagoDesde', response.json())
@@ -0,0 +1,79 @@
+import csv
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from easyenroll import changes
+from easyenroll.models import Alumno, PadresTutores
+
+from . import factories
+
+STUDENTS = '''nombre,apellidoPaterno,apellidoMaterno,correoInstitucional,curp,sexo,escuelaProcedencia,gradoGrupoAsignado
+Ana,García,López,ana@secundaria.edu.mx,gala00000000000001,M,Primaria,1A
+Luis,Pérez,Ruiz,not an email,PERL00000000000002,H,Primaria,1A
+Ana,García,López,ana@secundaria.edu.mx,GALA00000000000001,M,Primaria,1A
+Eva,Sosa,Díaz,eva@secundaria.edu.mx,GALA00000000000000,M,Primaria,1B
+Iván,Mora,Gil,ivan@secundaria.edu.mx,MOGI00000000000003,H,Primaria,2A
+'''
+
+TUTORS = '''nombrePadreTutor,curpTutor,scanIne,telefono,scanComprobanteDomicilio,emailPadreTutor,alumnoCurp
+Rosa,LORO00000000000001,{doc},5500000000,{doc},rosa@example.com,GALA00000000000000
+Rosa,loro00000000000001,{doc},5500000000,{doc},rosa@example.com,gala00000000000000
+Juan,GALU00000000000000,{doc},5500000000,{doc},juan@example.com,GALA00000000000000
+Nadie,NADA00000000000009,{doc},5500000000,{doc},nadie@example.com,XXXX00000000000000
+'''.format(doc=factories.DOCUMENT)
+
+
+class ImportCsvTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = factories.student(0)
+        factories.tutor(cls.student, 0)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def run_import(self, kind, content):
+        path = os.path.join(self.directory, '%s.csv' % kind)
+        rejects = os.path.join(self.directory, '%s-rejects.csv' % kind)
+        with open(path, 'w', encoding='utf-8') as source:
+            source.write(content)
+        output = StringIO()
+        with mock.patch.object(changes, 'record', wraps=changes.record) as record:
+            call_command('import_csv', kind, path, rejects=rejects, batch_size=2, stdout=output)
+        with open(rejects, encoding='utf-8') as source:
+            rows = list(csv.reader(source))
+        recorded = [pk for call in record.call_args_list for pk in call.args[1]]
+        return output.getvalue(), rows, recorded
+
+    def test_students(self):
+        summary, rejects, recorded = self.run_import('alumnos', STUDENTS)
+        self.assertIn('5 rows read, 2 imported, 2 duplicates skipped, 1 rejected', summary)
+        self.assertEqual(rejects[0], ['line', 'errors'])
+        self.assertEqual([row[0] for row in rejects[1:]], ['3'])
+        self.assertIn('correoInstitucional', rejects[1][1])
+        imported = Alumno.objects.exclude(pk=self.student.pk)
+        self.assertEqual(sorted(imported.values_list('curp', flat=True)), ['GALA00000000000001', 'MOGI00000000000003'])
+        self.assertEqual(sorted(recorded), sorted(imported.values_list('pk', flat=True)))
+
+    def test_tutors(self):
+        summary, rejects, recorded = self.run_import('tutores', TUTORS)
+        self.assertIn('4 rows read, 1 imported, 2 duplicates skipped, 1 rejected', summary)
+        self.assertEqual([row[0] for row in rejects[1:]], ['5'])
+        self.assertIn('Unknown student CURP.', rejects[1][1])
+        tutor = PadresTutores.objects.get(curpTutor='LORO00000000000001')
+        self.assertEqual(tutor.alumno_id, self.student.pk)
+        self.assertEqual(recorded, [tutor.pk])
+
+    def test_tutors_keep_legacy_document_urls(self):
+        legacy = TUTORS.splitlines()[0] + '\nLuz,LULU00000000000002,https://example.com/ine/2.pdf,5500000000,/scans/2.pdf,luz@example.com,GALA00000000000000\n'
+        summary, rejects, _ = self.run_import('tutores', legacy)
+        self.assertIn('1 rows read, 1 imported', summary)
+        tutor = PadresTutores.objects.get(curpTutor='LULU00000000000002')
+        self.assertEqual((tutor.scanIne, tutor.scanComprobanteDomicilio), ('https://example.com/ine/2.pdf', '/scans/2.pdf'))
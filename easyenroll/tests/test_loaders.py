@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+from django.test import TestCase
+from promise import Promise
+
+from easyenroll.loaders import get_loaders, load_instance, load_related, load_related_set
+from easyenroll.models import Alumno, Inscripcion, PadresTutores
+
+from . import factories
+
+
+def info():
+    return SimpleNamespace(context=SimpleNamespace())
+
+
+def resolve_all(loads):
+    # Loads batch when issued from a promise callback, as resolvers are.
+    return Promise.resolve(None).then(lambda _: Promise.all(loads())).get()
+
+
+class LoaderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = factories.user()
+        factories.enrolled(5, cls.user)
+        cls.lonely = factories.student(99)
+
+    def test_foreign_keys_load_in_one_query_per_model(self):
+        enrollments = list(Inscripcion.objects.all())
+        context = info()
+        with self.assertNumQueries(2):
+            students = resolve_all(lambda: [load_related(context, row, 'idAlumno') for row in enrollments])
+            users = resolve_all(lambda: [load_related(context, row, 'idUsuario') for row in enrollments])
+        self.assertEqual([student.pk for student in students], [row.idAlumno_id for row in enrollments])
+        self.assertEqual({user.pk for user in users}, {self.user.pk})
+
+    def test_reverse_sets_load_in_one_query(self):
+        students = list(Alumno.objects.order_by('pk'))
+        context = info()
+        with self.assertNumQueries(1):
+            tutors = resolve_all(lambda: [load_related_set(context, student, 'padrestutores_set') for student in students])
+        self.assertEqual([len(rows) for rows in tutors], [1] * 5 + [0])
+        self.assertTrue(all(row.alumno_id == student.pk for student, rows in zip(students, tutors) for row in rows))
+
+    def test_loaded_values_are_reused(self):
+        context = info()
+        enrollment = Inscripcion.objects.select_related('idAlumno').first()
+        with self.assertNumQueries(0):
+            self.assertEqual(load_related(context, enrollment, 'idAlumno'), enrollment.idAlumno)
+        student = Alumno.objects.prefetch_related('padrestutores_set').get(pk=enrollment.idAlumno_id)
+        with self.assertNumQueries(0):
+            self.assertEqual(len(load_related_set(context, student, 'padrestutores_set')), 1)
+        with self.assertNumQueries(1):
+            load_instance(context, Alumno, self.lonely.pk)
+            load_instance(context, Alumno, self.lonely.pk)
+
+    def test_prime_and_forget_related(self):
+        context = info()
+        loaders = get_loaders(context)
+        self.assertIs(get_loaders(context), loaders)
+        loaders.prime(self.lonely)
+        with self.assertNumQueries(0):
+            self.assertIs(load_instance(context, Alumno, self.lonely.pk), self.lonely)
+
+        self.assertEqual(load_related_set(context, self.lonely, 'padrestutores_set').get(), [])
+        tutor = factories.tutor(self.lonely, 99)
+        loaders.forget_related(tutor)
+        self.assertEqual(load_related_set(context, self.lonely, 'padrestutores_set').get(), [tutor])
+
+    def test_missing_instance_raises(self):
+        with self.assertRaises(PadresTutores.DoesNotExist):
+            load_instance(info(), PadresTutores, 12345)
@@ -0,0 +1,224 @@
+import os
+import re
+import tempfile
+from unittest import mock
+
+from django.apps import apps
+from django.db import connection, models, transaction
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from modulo_secundaria.jobs.models import Job
+from modulo_secundaria.schema import schema
+
+from easyenroll import seed
+from easyenroll.models import Alumno, Cambio, PadresTutores
+
+# A typical nested selection for every root query field. Lists ask for more
+# rows than the small data set has so both sizes exercise every relation.
+QUERIES = {
+    'students': '''{
+        students(first: 100) { edges { node {
+            id nombre curp gradoGrupoAsignado
+            inscripcionSet { tipoInscripcion idPago { monto fechaPago } idUsuario { username } }
+            padrestutoresSet { nombrePadreTutor alumno { curp } }
+            anexoalumnosSet { lateralidad }
+        } } pageInfo { hasNextPage endCursor } }
+    }''',
+    'enrollments': '''{
+        enrollments(first: 100) { edges { node {
+            id tipoInscripcion
+            idAlumno { nombre padrestutoresSet { nombrePadreTutor } }
+            idPago { monto inscripcionSet { id } }
+            idUsuario { username }
+        } } }
+    }''',
+    'payments': '''{
+        payments(first: 100, metodoPago: "EF") { edges { node {
+            idPago monto fechaPago inscripcionSet { idAlumno { nombre } }
+        } } }
+    }''',
+    'tutors': '''{
+        tutors(first: 100) { edges { node { nombrePadreTutor alumno { nombre anexoalumnosSet { lateralidad } } } } }
+    }''',
+    'annexes': '''{
+        annexes(first: 100) { edges { node { lateralidad idAlumno { nombre inscripcionSet { tipoInscripcion } } } } }
+    }''',
+    'studentByCurp': '''query ($curp: String!) {
+        studentByCurp(curp: $curp) { nombre padrestutoresSet { nombrePadreTutor } }
+    }''',
+    'tutorsByCurp': '''query ($tutorCurp: String!) {
+        tutorsByCurp(curp: $tutorCurp) { nombrePadreTutor alumno { nombre } }
+    }''',
+    'searchStudents': '''{
+        searchStudents(text: "Ana", first: 100) { nombre curp inscripcionSet { idPago { monto } } }
+    }''',
+    'paymentTotals': '''{
+        paymentTotals(groupBy: MONTH, metodoPago: "EF") { key count total average }
+    }''',
+    'users': '''{
+        users(first: 100) { edges { node { username inscripcionSet { idAlumno { nombre } } } } }
+    }''',
+    'changesSince': '''{
+        changesSince(first: 100) { cursor hasMore changes {
+            cursor model objectId operation
+            student { nombre inscripcionSet { tipoInscripcion } padrestutoresSet { nombrePadreTutor } }
+            tutor { nombrePadreTutor alumno { curp } }
+            enrollment { tipoInscripcion idAlumno { nombre } idPago { monto } }
+            payment { monto inscripcionSet { idUsuario { username } } }
+            annex { lateralidad idAlumno { nombre } }
+        } }
+    }''',
+    'job': '''query ($job: ID!) {
+        job(id: $job) { id task status attempts maxAttempts runAt finishedAt lastError }
+    }''',
+}
+
+SMALL = 10
+LARGE = 1000
+HEAVIEST = 5
+LOOKUP = re.compile(r'"(\w+)"\."(\w+)"\s*(?:=|IN\b|>|<)', re.IGNORECASE)
+
+
+def indexed_columns():
+    """Map each table to the columns an index can seek on."""
+    tables = {}
+    for model in apps.get_models():
+        opts = model._meta
+        columns = tables.setdefault(opts.db_table, set())
+        for field in opts.concrete_fields:
+            if field.primary_key or field.unique or field.db_index or isinstance(field, models.ForeignKey):
+                columns.add(field.column)
+        for index in opts.indexes:
+            columns.add(opts.get_field(index.fields[0].lstrip('-')).column)
+        for fields in opts.unique_together:
+            columns.add(opts.get_field(fields[0]).column)
+    return tables
+
+
+def indexed_lookups(sql, tables):
+    """Tables the statement filters through an indexed column."""
+    if ' WHERE ' not in sql:
+        return set()
+    where = sql.split(' WHERE ', 1)[1]
+    return {table for table, column in LOOKUP.findall(where) if column in tables.get(table, ())}
+
+
+def explain(sql):
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # Small test tables are cheaper to scan; only a missing index should show up.
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        cursor.execute('%s %s' % (connection.ops.explain_query_prefix(), sql))
+        plan = [str(row[-1]) for row in cursor.fetchall()]
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET LOCAL enable_seqscan = on')
+        return plan
+
+
+def sequential_scans(plan):
+    """Tables read without an index according to an EXPLAIN plan."""
+    tables = set()
+    for line in plan:
+        if connection.vendor == 'postgresql':
+            match = re.search(r'Seq Scan on (\w+)', line)
+        else:
+            match = re.match(r'\s*SCAN (?:TABLE )?(\w+)', line)
+        if match:
+            tables.add(match.group(1))
+    return tables
+
+
+@override_settings(
+    GRAPHQL_RESPONSE_CACHE={'ENABLED': False},
+    DOCUMENT_STORAGE={'ROOT': os.path.join(tempfile.gettempdir(), 'easyenroll-test-documents')},
+)
+class QueryBudgetTests(TestCase):
+    """Every root field runs a fixed number of SQL statements, whatever the row count."""
+
+    plans = []
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.job = Job.objects.create(task='easyenroll.tasks.generate_receipt', args=[1], max_attempts=5)
+
+    def setUp(self):
+        self.variables = {'job': self.job.pk, 'curp': '', 'tutorCurp': ''}
+
+    @classmethod
+    def tearDownClass(cls):
+        # QUERY_PLANS=path keeps the plans of the slowest statements for review.
+        if os.environ.get('QUERY_PLANS'):
+            with open(os.environ['QUERY_PLANS'], 'w', encoding='utf-8') as output:
+                for name, duration, sql, plan in cls.plans:
+                    output.write('-- %s (%s s)\n%s\n%s\n\n' % (name, duration, sql, '\n'.join(plan)))
+        super().tearDownClass()
+
+    def execute(self, name):
+        request = RequestFactory().post('/graphql/')
+        with CaptureQueriesContext(connection) as queries:
+            result = schema.execute(QUERIES[name], context_value=request, variable_values=self.variables)
+        self.assertIsNone(result.errors, name)
+        # A root field that finds nothing would not exercise its relations.
+        self.assertTrue(all(result.data.values()), name)
+        return queries.captured_queries
+
+    def test_every_root_field_is_covered(self):
+        root_fields = set(schema.get_query_type().fields)
+        self.assertEqual(root_fields - set(QUERIES), set(), 'add a typical selection to QUERIES')
+
+    def test_sql_count_does_not_grow_with_rows(self):
+        seed.generate(students=SMALL, seed=1)
+        self.variables['curp'] = Alumno.objects.order_by('pk').values_list('curp', flat=True).first()
+        self.variables['tutorCurp'] = PadresTutores.objects.order_by('pk').values_list('curpTutor', flat=True).first()
+        # Logged in the seeding transaction, so changesSince has entries to resolve.
+        self.assertEqual(Cambio.objects.filter(modelo='alumno').count(), SMALL)
+        for name in QUERIES:
+            # Warm up per-process lookups such as the FTS table check.
+            self.execute(name)
+        small = {name: len(self.execute(name)) for name in QUERIES}
+
+        seed.generate(students=LARGE - SMALL, seed=2)
+        tables = indexed_columns()
+        statements = []
+        for name in QUERIES:
+            queries = self.execute(name)
+            with self.subTest(name):
+                self.assertEqual(len(queries), small[name], 'SQL count changed with data size')
+            statements.extend((name, query['time'], query['sql']) for query in queries)
+
+        for name, duration, sql in statements:
+            checked = indexed_lookups(sql, tables)
+            if not checked:
+                continue
+            plan = explain(sql)
+            with self.subTest(name, sql=sql):
+                scanned = sequential_scans(plan) & checked
+                self.assertFalse(scanned, 'sequential scan on an indexed lookup:\n%s' % '\n'.join(plan))
+
+        heaviest = sorted(statements, key=lambda statement: float(statement[1]), reverse=True)[:HEAVIEST]
+        type(self).plans = [(name, duration, sql, explain(sql)) for name, duration, sql in heaviest]
+
+
+class PlanHelperTests(SimpleTestCase):
+    def test_indexed_columns(self):
+        tables = indexed_columns()
+        self.assertLessEqual({'id', 'curp'}, tables['easyenroll_alumno'])
+        self.assertIn('idAlumno_id', tables['easyenroll_inscripcion'])
+        self.assertNotIn('nombre', tables['easyenroll_alumno'])
+
+    def test_indexed_lookups(self):
+        tables = {'easyenroll_alumno': {'id', 'curp'}}
+        sql = 'SELECT "easyenroll_alumno"."nombre" FROM "easyenroll_alumno" WHERE ("easyenroll_alumno"."curp" = %s'
+        self.assertEqual(indexed_lookups(sql, tables), {'easyenroll_alumno'})
+        self.assertEqual(indexed_lookups(sql.replace('"curp" =', '"nombre" ='), tables), set())
+        self.assertEqual(indexed_lookups('SELECT "easyenroll_alumno"."id" FROM "easyenroll_alumno"', tables), set())
+
+    def test_sequential_scans(self):
+        with mock.patch.object(connection, 'vendor', 'sqlite'):
+            plan = ['SCAN easyenroll_alumno', 'SEARCH easyenroll_inscripcion USING INDEX x (idAlumno_id=?)']
+            self.assertEqual(sequential_scans(plan), {'easyenroll_alumno'})
+        with mock.patch.object(connection, 'vendor', 'postgresql'):
+            plan = ['Nested Loop', '  ->  Seq Scan on easyenroll_pago  (cost=0.00..1.01 rows=1 width=4)',
+                    '  ->  Index Scan using easyenroll_alumno_pkey on easyenroll_alumno']
+            self.assertEqual(sequential_scans(plan), {'easyenroll_pago'})
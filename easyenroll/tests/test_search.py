@@ -0,0 +1,72 @@
+import json
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+
+from easyenroll import search
+
+from . import factories
+
+
+class SearchMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.maria = factories.student(0, nombre='María', apellidoPaterno='Hernández', apellidoMaterno='Peña')
+        cls.mariana = factories.student(1, nombre='Mariana', apellidoPaterno='Núñez', apellidoMaterno='Ortiz')
+        cls.jose = factories.student(2, nombre='José', apellidoPaterno='Mendoza', apellidoMaterno='Ruiz')
+        cls.rosa = factories.student(3, nombre='Rosa', apellidoPaterno='Amaria', apellidoMaterno='Ruiz')
+
+    def search(self, text):
+        return set(search.search_students(text))
+
+    def test_words_match_name_prefixes(self):
+        self.assertEqual(self.search('Mari'), {self.maria.pk, self.mariana.pk})
+        self.assertEqual(self.search('mariana'), {self.mariana.pk})
+        self.assertEqual(self.search('Ruiz'), {self.jose.pk, self.rosa.pk})
+        # Amaria contains "maria" but does not start with it.
+        self.assertEqual(self.search('aria'), set())
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.search('mar her'), {self.maria.pk})
+        self.assertEqual(self.search('ruiz ros'), {self.rosa.pk})
+        self.assertEqual(self.search('jose ortiz'), set())
+
+    def test_accents_are_ignored(self):
+        self.assertEqual(self.search('Maria Hernandez'), {self.maria.pk})
+        self.assertEqual(self.search('jose'), {self.jose.pk})
+        self.assertEqual(self.search('nunez'), {self.mariana.pk})
+        self.assertEqual(self.search('Péna'), {self.maria.pk})
+
+    def test_limit(self):
+        self.assertEqual(len(search.search_students('mari', limit=1)), 1)
+
+    def test_email_and_curp(self):
+        self.assertEqual(search.search_students('alumno2@secundaria.edu.mx'), [self.jose.pk])
+        self.assertEqual(
+            search.search_students('gala0000000000000'), [self.maria.pk, self.mariana.pk, self.jose.pk, self.rosa.pk],
+        )
+        self.assertEqual(search.search_students('GALA00000000000002'), [self.jose.pk])
+
+
+class FullTextSearchTests(SearchMixin, TestCase):
+    def setUp(self):
+        if connection.vendor == 'sqlite' and not search.has_fts_table():
+            self.skipTest('SQLite was built without FTS5')
+
+    def test_graphql(self):
+        response = self.client.post('/graphql/', json.dumps({
+            'query': '{ searchStudents(text: "maria hernandez") { nombre apellidoPaterno } }',
+        }), content_type='application/json')
+        self.assertEqual(response.json()['data']['searchStudents'], [{'nombre': 'María', 'apellidoPaterno': 'Hernández'}])
+
+
+class FallbackSearchTests(SearchMixin, TestCase):
+    """The LIKE search used by SQLite builds without FTS5."""
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('PostgreSQL always searches its trigram index')
+        patcher = mock.patch('easyenroll.search.has_fts_table', return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
@@ -0,0 +1,156 @@
+import hashlib
+import io
+import os
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from easyenroll import storage
+from easyenroll.models import Documento
+
+from . import factories
+
+PDF = b'%PDF-1.4\n' + bytes(range(256)) * 4
+
+
+def content(response):
+    return b''.join(response.streaming_content)
+
+
+class StorageTestCase(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+        override = override_settings(DOCUMENT_STORAGE={'ROOT': self.root, 'MAX_SIZE': 2048})
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+class StoreTests(StorageTestCase):
+    def test_content_is_stored_once(self):
+        document, created = storage.store(io.BytesIO(PDF))
+        self.assertTrue(created)
+        self.assertEqual(document.sha256, hashlib.sha256(PDF).hexdigest())
+        self.assertEqual((document.tamano, document.tipoContenido), (len(PDF), 'application/pdf'))
+        self.assertEqual(storage.path_for(document.sha256).read_bytes(), PDF)
+
+        again, created = storage.store(io.BytesIO(PDF))
+        self.assertFalse(created)
+        self.assertEqual(again, document)
+        self.assertEqual(Documento.objects.count(), 1)
+        self.assertEqual(os.listdir(os.path.join(self.root, 'tmp')), [])
+
+    def test_rejected_uploads_leave_nothing_behind(self):
+        for stream, status in [
+            (io.BytesIO(b'GIF89a'), 415),
+            (io.BytesIO(b'%PDF-' + b'x' * 4096), 413),
+            (io.BytesIO(b''), 400),
+        ]:
+            with self.subTest(status=status), self.assertRaises(storage.UploadError) as raised:
+                storage.store(stream)
+            self.assertEqual(raised.exception.status, status)
+        self.assertEqual(os.listdir(os.path.join(self.root, 'tmp')), [])
+        self.assertFalse(Documento.objects.exists())
+
+    def test_legacy_values_only_fail_the_mutation_check(self):
+        Documento.objects.create(sha256=factories.DOCUMENT, tamano=1, tipoContenido='application/pdf')
+        payments = [
+            factories.payment(0),
+            factories.payment(1),
+            factories.payment(2),
+        ]
+        payments[1].recibo = 'https://example.com/recibos/1.pdf'
+        payments[2].recibo = '1' * 64
+        for payment in payments:
+            payment.full_clean()
+        self.assertEqual(storage.missing_documents(payments), [
+            (1, 'recibo', ['Enter the id of an uploaded document.']),
+            (2, 'recibo', ['Documento matching query does not exist.']),
+        ])
+
+
+class DocumentViewTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(factories.user())
+
+    def upload(self, data, content_type='application/pdf'):
+        return self.client.post(reverse('upload-document'), data, content_type=content_type)
+
+    def test_upload(self):
+        response = self.upload(PDF)
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual(body['id'], hashlib.sha256(PDF).hexdigest())
+        self.assertEqual(body['size'], len(PDF))
+        self.assertTrue(body['url'].endswith(reverse('document', args=[body['id']])))
+        self.assertEqual(self.upload(PDF).status_code, 200)
+
+    def test_upload_validation(self):
+        self.assertEqual(self.upload(b'GIF89a').status_code, 415)
+        self.assertEqual(self.upload(b'%PDF-' + b'x' * 4096).status_code, 413)
+        self.assertEqual(self.upload({'file': 'x'}, 'multipart/form-data; boundary=BoUnDaRy').status_code, 415)
+        self.client.force_login(factories.user('teacher', is_staff=False))
+        self.assertEqual(self.upload(PDF).status_code, 302)
+        self.assertFalse(Documento.objects.exists())
+
+    def get(self, **headers):
+        return self.client.get(reverse('document', args=[hashlib.sha256(PDF).hexdigest()]), **headers)
+
+    def test_serve(self):
+        self.upload(PDF)
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content(response), PDF)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_ranges(self):
+        self.upload(PDF)
+        size = len(PDF)
+        response = self.get(HTTP_RANGE='bytes=5-9')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 5-9/%d' % size)
+        self.assertEqual(content(response), PDF[5:10])
+
+        response = self.get(HTTP_RANGE='bytes=-4')
+        self.assertEqual((response['Content-Range'], content(response)), ('bytes %d-%d/%d' % (size - 4, size - 1, size), PDF[-4:]))
+
+        response = self.get(HTTP_RANGE='bytes=%d-' % size)
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */%d' % size)
+
+        # A stale validator gets the whole file.
+        response = self.get(HTTP_RANGE='bytes=5-9', HTTP_IF_RANGE='"other"')
+        self.assertEqual((response.status_code, content(response)), (200, PDF))
+
+    def test_missing_file_is_not_found(self):
+        Documento.objects.create(sha256=factories.DOCUMENT, tamano=1, tipoContenido='application/pdf')
+        self.assertEqual(self.client.get(reverse('document', args=[factories.DOCUMENT])).status_code, 404)
+
+    @override_settings(DOCUMENT_STORAGE={'SENDFILE_HEADER': 'X-Accel-Redirect'})
+    def test_sendfile(self):
+        Documento.objects.create(sha256=factories.DOCUMENT, tamano=1, tipoContenido='application/pdf')
+        response = self.client.get(reverse('document', args=[factories.DOCUMENT]))
+        self.assertEqual(response['X-Accel-Redirect'], '/protected/documents/00/00/' + factories.DOCUMENT)
+
+
+class ParseRangeTests(TestCase):
+    def test_parse_range(self):
+        for header, expected in [
+            (None, None),
+            ('bytes=0-0', (0, 0)),
+            ('bytes=10-', (10, 99)),
+            ('bytes=90-200', (90, 99)),
+            ('bytes=-500', (0, 99)),
+            ('bytes=0-1,5-6', None),
+            ('bytes=9-3', None),
+            ('items=0-1', None),
+        ]:
+            with self.subTest(header=header):
+                self.assertEqual(storage.parse_range(header, 100), expected)
+        for header in ['bytes=100-', 'bytes=-0']:
+            with self.subTest(header=header), self.assertRaises(ValueError):
+                storage.parse_range(header, 100)
@@ -0,0 +1,41 @@
+import datetime
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from easyenroll import changes, storage
+from easyenroll.models import Cambio, Documento, Pago
+from easyenroll.tasks import generate_receipt
+
+from . import factories
+
+
+class GenerateReceiptTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(DOCUMENT_STORAGE={'ROOT': directory.name})
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_receipt_is_stored_and_the_payment_updated(self):
+        payment = factories.payment(recibo='')
+        stale = timezone.now() - datetime.timedelta(days=1)
+        Pago.objects.filter(pk=payment.pk).update(fechaActualizacion=stale)
+
+        content_id = generate_receipt(payment.pk)
+        payment.refresh_from_db()
+        self.assertEqual(payment.recibo, content_id)
+        self.assertGreater(payment.fechaActualizacion, stale)
+        self.assertEqual(Documento.objects.get().tipoContenido, 'application/pdf')
+        self.assertTrue(storage.path_for(content_id).exists())
+        self.assertEqual(
+            Cambio.objects.filter(modelo='pago', objetoId=payment.pk).latest('id').operacion, changes.UPDATE,
+        )
+
+    def test_payments_with_a_receipt_are_left_alone(self):
+        payment = factories.payment()
+        self.assertIsNone(generate_receipt(payment.pk))
+        self.assertIsNone(generate_receipt(payment.pk + 1))
+        self.assertFalse(Documento.objects.exists())
@@ -1,3 +1,197 @@
-from django.shortcuts import render
+import csv
+import json
+import os
+import zlib
 
-# Create your views here.
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseBadRequest, HttpResponseNotModified, JsonResponse,
+    StreamingHttpResponse,
+)
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.http import parse_etags
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST, require_safe
+
+from . import storage
+from .filters import EnrollmentExportFilter
+from .models import Documento, Inscripcion
+
+EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('factura', 'factura'),
+    ('tipoInscripcion', 'tipoInscripcion'),
+    ('modalidadPago', 'modalidadPago'),
+    ('alumnoId', 'idAlumno__id'),
+    ('nombre', 'idAlumno__nombre'),
+    ('apellidoPaterno', 'idAlumno__apellidoPaterno'),
+    ('apellidoMaterno', 'idAlumno__apellidoMaterno'),
+    ('curp', 'idAlumno__curp'),
+    ('sexo', 'idAlumno__sexo'),
+    ('correoInstitucional', 'idAlumno__correoInstitucional'),
+    ('escuelaProcedencia', 'idAlumno__escuelaProcedencia'),
+    ('gradoGrupoAsignado', 'idAlumno__gradoGrupoAsignado'),
+    ('idPago', 'idPago__idPago'),
+    ('idRecibo', 'idPago__idRecibo'),
+    ('recibo', 'idPago__recibo'),
+    ('monto', 'idPago__monto'),
+    ('descuento', 'idPago__descuento'),
+    ('fechaPago', 'idPago__fechaPago'),
+    ('metodoPago', 'idPago__metodoPago'),
+    ('usuario', 'idUsuario__username'),
+]
+CHUNK_SIZE = 2000
+# Rows are grouped into writes of roughly this many bytes.
+BUFFER_SIZE = 64 * 1024
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(rows):
+    names = [name for name, _ in EXPORT_COLUMNS]
+    for row in rows:
+        yield json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def buffered(lines):
+    buffer, size = [], 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= BUFFER_SIZE:
+            yield ''.join(buffer).encode()
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode()
+
+
+def gzipped(chunks):
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+@require_GET
+@staff_member_required
+def export_enrollments(request):
+    output = request.GET.get('format', 'csv')
+    if output not in ('csv', 'ndjson'):
+        return HttpResponseBadRequest('format must be csv or ndjson')
+    filterset = EnrollmentExportFilter(request.GET, queryset=Inscripcion.objects.all())
+    if not filterset.is_valid():
+        return HttpResponseBadRequest(filterset.form.errors.as_json(), content_type='application/json')
+
+    rows = filterset.qs.order_by('id').values_list(*[lookup for _, lookup in EXPORT_COLUMNS])
+    # iterator() streams through a server-side cursor on PostgreSQL.
+    rows = rows.iterator(chunk_size=CHUNK_SIZE)
+    lines = csv_lines(rows) if output == 'csv' else ndjson_lines(rows)
+    chunks = buffered(lines)
+
+    use_gzip = request.GET.get('gzip') in ('1', 'true')
+    if use_gzip:
+        chunks = gzipped(chunks)
+    response = StreamingHttpResponse(
+        chunks,
+        content_type='text/csv; charset=utf-8' if output == 'csv' else 'application/x-ndjson',
+    )
+    filename = 'inscripciones.%s%s' % (output, '.gz' if use_gzip else '')
+    response['Content-Disposition'] = 'attachment; filename="%s"' % filename
+    if use_gzip:
+        response['Content-Type'] = 'application/gzip'
+    return response
+
+
+def describe_document(request, document):
+    return {
+        'id': document.sha256,
+        'size': document.tamano,
+        'contentType': document.tipoContenido,
+        'url': request.build_absolute_uri(reverse('document', args=[document.sha256])),
+    }
+
+
+@csrf_exempt
+@require_POST
+@staff_member_required
+def upload_document(request):
+    """Store the raw request body (not a multipart form) and return its content id."""
+    if request.content_type.startswith('multipart/'):
+        return JsonResponse({'error': 'Send the file itself as the request body.'}, status=415)
+    try:
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        length = 0
+    if length > storage.config()['MAX_SIZE']:
+        return JsonResponse({'error': 'Files are limited to %d bytes.' % storage.config()['MAX_SIZE']}, status=413)
+    try:
+        # Read from the request stream directly: request.body would hold the whole file.
+        document, created = storage.store(request, request.user)
+    except storage.UploadError as error:
+        return JsonResponse({'error': str(error)}, status=error.status)
+    return JsonResponse(describe_document(request, document), status=201 if created else 200)
+
+
+@require_safe
+@staff_member_required
+def serve_document(request, content_id):
+    document = get_object_or_404(Documento, sha256=content_id)
+    etag = '"%s"' % document.sha256
+    headers = {
+        'ETag': etag,
+        'Accept-Ranges': 'bytes',
+        # A content id always names the same bytes.
+        'Cache-Control': 'private, max-age=31536000, immutable',
+    }
+    if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        response = HttpResponseNotModified()
+    elif storage.config()['SENDFILE_HEADER']:
+        response = HttpResponse(content_type=document.tipoContenido)
+        response[storage.config()['SENDFILE_HEADER']] = storage.config()['SENDFILE_PREFIX'] + storage.relative_path(content_id)
+    else:
+        response = file_response(request, document, etag)
+    for name, value in headers.items():
+        response[name] = value
+    return response
+
+
+def file_response(request, document, etag):
+    try:
+        file = open(storage.path_for(document.sha256), 'rb')
+    except FileNotFoundError:
+        raise Http404('The document is missing from storage.')
+    size = os.fstat(file.fileno()).st_size
+    filename = document.sha256 + storage.EXTENSIONS.get(document.tipoContenido, '')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    try:
+        byte_range = storage.parse_range(request.META.get('HTTP_RANGE'), size) if if_range in (None, etag) else None
+    except ValueError:
+        file.close()
+        response = HttpResponse(status=416)
+        response['Content-Range'] = 'bytes */%d' % size
+        return response
+    if byte_range is None:
+        # Under a WSGI server with a file wrapper the file goes out through sendfile().
+        return FileResponse(file, content_type=document.tipoContenido, filename=filename)
+    start, end = byte_range
+    file.seek(start)
+    response = FileResponse(
+        storage.FileRange(file, end - start + 1), status=206, content_type=document.tipoContenido, filename=filename,
+    )
+    response['Content-Range'] = 'bytes %d-%d/%d' % (start, end, size)
+    response['Content-Length'] = end - start + 1
+    return response
@@ -0,0 +1,86 @@
+import graphene
+from django.core.exceptions import ValidationError
+from django.db import connections, router, transaction
+from django.dispatch import Signal
+
+from . import response_cache
+
+BATCH_SIZE = 500
+
+# Sent with ``instances`` and ``using`` after insert() saved rows without
+# post_save signals, for handlers that track every new row.
+inserted = Signal()
+
+
+class BulkError(graphene.ObjectType):
+    index = graphene.Int()
+    field = graphene.String()
+    messages = graphene.List(graphene.String)
+
+
+def bulk_errors(errors):
+    return [BulkError(index=index, field=field, messages=messages) for index, field, messages in errors]
+
+
+def bulk_create(model, instances, all_or_nothing=False, checks=()):
+    """Validate unsaved ``instances`` and insert the valid ones in one transaction.
+
+    Foreign keys are given as ids (``<field>_id``) and resolved with a single
+    ``in`` lookup per field; each of ``checks`` is called with the instances
+    and returns more errors. Returns ``(created, errors)`` where each error is
+    an ``(index, field, messages)`` tuple. With ``all_or_nothing`` a single
+    error means nothing is inserted.
+    """
+    errors = []
+    foreign_keys = [
+        field for field in model._meta.concrete_fields
+        if field.is_relation and field.many_to_one
+    ]
+    for field in foreign_keys:
+        ids = {getattr(instance, field.attname) for instance in instances} - {None}
+        related = field.related_model._default_manager.in_bulk(ids)
+        for index, instance in enumerate(instances):
+            value = getattr(instance, field.attname)
+            if value is None:
+                errors.append((index, field.name, ['This field cannot be null.']))
+            elif value not in related:
+                errors.append((index, field.name, [
+                    '%s matching query does not exist.' % field.related_model._meta.object_name
+                ]))
+            else:
+                setattr(instance, field.name, related[value])
+
+    for check in checks:
+        errors.extend(check(instances))
+
+    exclude = [field.name for field in foreign_keys]
+    for index, instance in enumerate(instances):
+        try:
+            instance.full_clean(exclude=exclude, validate_unique=False)
+        except ValidationError as error:
+            errors.extend((index, name, messages) for name, messages in error.message_dict.items())
+    errors.sort(key=lambda error: error[0])
+
+    failed = {index for index, _, _ in errors}
+    if errors and all_or_nothing:
+        return [], errors
+    valid = [instance for index, instance in enumerate(instances) if index not in failed]
+    if valid:
+        with transaction.atomic(using=router.db_for_write(model)):
+            insert(model, valid)
+    return valid, errors
+
+
+def insert(model, instances):
+    """INSERT ``instances`` with as few statements as the backend allows, setting pks."""
+    using = router.db_for_write(model)
+    if connections[using].features.can_return_rows_from_bulk_insert:
+        model._default_manager.db_manager(using).bulk_create(instances, batch_size=BATCH_SIZE)
+        inserted.send(sender=model, instances=instances, using=using)
+    else:
+        # Without RETURNING (e.g. SQLite) bulk_create leaves pks unset.
+        for instance in instances:
+            instance.save(force_insert=True, using=using)
+    if instances:
+        # bulk_create sends no post_save signals.
+        response_cache.bump_on_commit(model)
@@ -0,0 +1,134 @@
+import contextvars
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from graphql.backend.base import GraphQLBackend, GraphQLDocument
+from graphql.execution import ExecutionResult, execute
+from graphql.language import ast
+
+from . import instrumentation
+from .optimizer import collect_fields, get_fragments, get_operation
+
+DEFAULTS = {
+    # Requests executing at once per process on the async endpoint.
+    'REQUEST_THREADS': 16,
+    # Operations of batched requests executing at once per process.
+    'BATCH_THREADS': 16,
+    # Root fields of those requests resolving at once per process.
+    'FIELD_THREADS': 16,
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def config():
+    return dict(DEFAULTS, **getattr(settings, 'GRAPHQL_ASYNC', {}))
+
+
+def pool(name):
+    """The process-wide thread pool sized by GRAPHQL_ASYNC[name]."""
+    with _pools_lock:
+        if name not in _pools:
+            _pools[name] = ThreadPoolExecutor(max_workers=config()[name], thread_name_prefix='graphql-' + name.lower())
+        return _pools[name]
+
+
+def submit(name, function, *args):
+    """Run ``function(*args)`` on the named pool in a copy of the caller's context
+    (so it reads from the same database)."""
+    return pool(name).submit(contextvars.copy_context().run, _with_connections, function, *args)
+
+
+def _with_connections(function, *args):
+    # Pool threads outlive requests, so honour CONN_MAX_AGE the way the
+    # request_started/request_finished signals do for request threads.
+    close_old_connections()
+    try:
+        return function(*args)
+    finally:
+        close_old_connections()
+
+
+class FieldContext:
+    """The request as seen by one root field: reads go to the request, writes
+    (such as the per-request loaders) stay local to the field's thread."""
+
+    def __init__(self, request):
+        self.__dict__['_request'] = request
+
+    def __getattr__(self, name):
+        return getattr(self._request, name)
+
+
+class ConcurrentDocumentBackend(GraphQLBackend):
+    """Wrap a backend so each root field of a query executes in its own thread.
+
+    Mutations, single-field queries and profiled requests keep the serial path.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def document_from_string(self, schema, document_string):
+        document = self.backend.document_from_string(schema, document_string)
+        if getattr(document, 'validation_errors', None):
+            return document
+
+        def execute_document(*args, **kwargs):
+            return execute_concurrently(document, *args, **kwargs)
+
+        return GraphQLDocument(schema, document_string, document.document_ast, execute_document)
+
+
+def execute_concurrently(document, root_value=None, variable_values=None, operation_name=None,
+                         context_value=None, middleware=None, **options):
+    document_ast = document.document_ast
+    operation = get_operation(document_ast, operation_name)
+    profile = getattr(context_value, 'graphql_profile', None)
+    fields = None
+    if operation is not None and operation.operation == 'query' and not (profile and profile.detailed):
+        fields = collect_fields(
+            operation.selection_set.selections, get_fragments(document_ast), variable_values or {}, by_alias=True,
+        )
+    if not fields or len(fields) < 2:
+        return document.execute(
+            root_value=root_value, variable_values=variable_values, operation_name=operation_name,
+            context_value=context_value, middleware=middleware, **options
+        )
+
+    fragments = [definition for definition in document_ast.definitions if isinstance(definition, ast.FragmentDefinition)]
+    futures = OrderedDict()
+    for key, field_asts in fields.items():
+        field_document = ast.Document(definitions=[
+            ast.OperationDefinition(
+                operation='query',
+                name=operation.name,
+                variable_definitions=operation.variable_definitions,
+                directives=operation.directives,
+                selection_set=ast.SelectionSet(selections=field_asts),
+            ),
+        ] + fragments)
+        futures[key] = submit(
+            'FIELD_THREADS', _execute_field, document.schema, field_document, root_value, context_value,
+            variable_values, middleware, profile,
+        )
+
+    data = OrderedDict()
+    errors = []
+    for key, future in futures.items():
+        result = future.result()
+        data[key] = result.data.get(key) if result.data else None
+        errors.extend(result.errors or [])
+    return ExecutionResult(data=data, errors=errors or None)
+
+
+def _execute_field(schema, field_document, root_value, context_value, variable_values, middleware, profile):
+    with instrumentation.capture_sql(profile):
+        return execute(
+            schema, field_document, root_value=root_value, context_value=FieldContext(context_value),
+            variable_values=variable_values, middleware=middleware,
+        )
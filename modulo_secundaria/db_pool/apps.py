@@ -0,0 +1,17 @@
+from django.apps import AppConfig
+from django.conf import settings
+from health_check.plugins import plugin_dir
+
+ENGINE = 'modulo_secundaria.db_pool'
+
+
+class DbPoolConfig(AppConfig):
+    name = 'modulo_secundaria.db_pool'
+    label = 'db_pool'
+
+    def ready(self):
+        from .health import PoolHealthCheck
+
+        for alias, database in settings.DATABASES.items():
+            if database['ENGINE'] == ENGINE:
+                plugin_dir.register(PoolHealthCheck, alias=alias)
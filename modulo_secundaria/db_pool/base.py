@@ -0,0 +1,62 @@
+from functools import partial
+
+from django.db.backends.postgresql import base, creation
+from psycopg2 import extensions
+
+from .pool import close_pools, get_pool
+
+
+def check(connection):
+    if connection.closed:
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    return True
+
+
+def reset(connection):
+    if connection.closed:
+        return False
+    status = connection.get_transaction_status()
+    if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+        return False
+    if status != extensions.TRANSACTION_STATUS_IDLE:
+        connection.rollback()
+    return True
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # PostgreSQL refuses to drop a database with open sessions.
+        close_pools(self.connection.alias)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL backend that borrows connections from a per-process pool,
+    configured by the database's POOL setting, instead of opening one per
+    request. Use it with CONN_MAX_AGE = 0 so requests return their connection.
+    """
+
+    creation_class = DatabaseCreation
+    pool = None
+
+    def get_new_connection(self, conn_params):
+        self.pool = get_pool(self.alias, conn_params, self.settings_dict.get('POOL', {}), check, reset)
+        connect = partial(super().get_new_connection, conn_params)
+        self.pool.prefill(connect)
+        connection = self.pool.checkout(connect)
+        self.isolation_level = self.settings_dict['OPTIONS'].get('isolation_level', connection.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        with self.wrap_database_errors:
+            if self.pool is None:
+                return self.connection.close()
+            if self.in_atomic_block:
+                # Django holds on to a connection closed inside atomic() until
+                # the block exits, so it must not be lent to another thread.
+                return self.pool.discard(self.connection)
+            return self.pool.checkin(self.connection)
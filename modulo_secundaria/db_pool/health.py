@@ -0,0 +1,37 @@
+from django.db import DatabaseError, connections
+from health_check.backends import BaseHealthCheckBackend
+from health_check.exceptions import ServiceUnavailable
+
+from .pool import pools
+
+
+class PoolHealthCheck(BaseHealthCheckBackend):
+    """Check out a pooled connection and report the pool's statistics."""
+
+    def __init__(self, alias='default'):
+        super().__init__()
+        self.alias = alias
+
+    def identifier(self):
+        return 'Database pool: %s' % self.alias
+
+    def check_status(self):
+        connection = connections[self.alias]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except DatabaseError as error:
+            raise ServiceUnavailable('Cannot borrow a working connection: %s' % error)
+        finally:
+            # Give the connection back when run outside a request.
+            connection.close()
+
+    def pretty_status(self):
+        status = super().pretty_status()
+        for pool in pools(self.alias):
+            stats = pool.stats()
+            status += (
+                '; %(in_use)d/%(max_size)d in use, %(idle)d idle, %(waiting)d waiting, '
+                '%(checkouts_per_second).1f checkouts/s, %(average_wait_ms).2f ms average wait, %(timeouts)d timeouts'
+            ) % dict(stats, average_wait_ms=stats['average_wait_seconds'] * 1000)
+        return status
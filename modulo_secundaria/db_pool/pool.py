@@ -0,0 +1,299 @@
+import os
+import threading
+import time
+from collections import deque
+
+from django.db.utils import OperationalError
+
+from .. import metrics
+
+DEFAULTS = {
+    # Connections opened when the process first connects, and idle ones kept
+    # open however long they sit unused.
+    'MIN_SIZE': 0,
+    # Open connections (in use plus idle) per process.
+    'MAX_SIZE': 20,
+    # Seconds a checkout waits for a free connection before failing.
+    'TIMEOUT': 5,
+    # Connections are replaced after this many seconds, and idle ones above
+    # MIN_SIZE are closed after MAX_IDLE.
+    'MAX_LIFETIME': 1800,
+    'MAX_IDLE': 300,
+    # A connection idle this long is checked with a round trip before reuse.
+    'CHECK_AFTER': 5,
+}
+RATE_WINDOW = 60
+
+_pools = {}
+_pools_lock = threading.Lock()
+# Connections inherited across fork(); closing them would end the parent's sessions.
+_forked = []
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+class Pool:
+    """A thread-safe pool of DB-API connections for one database alias.
+
+    ``check(connection)`` tells whether an idle connection still works and
+    ``reset(connection)`` readies a returned one for reuse; either may return
+    False to have the connection closed instead.
+    """
+
+    def __init__(self, alias, options, check, reset):
+        options = dict(DEFAULTS, **options)
+        self.alias = alias
+        self.min_size = options['MIN_SIZE']
+        self.max_size = options['MAX_SIZE']
+        self.timeout = options['TIMEOUT']
+        self.max_lifetime = options['MAX_LIFETIME']
+        self.max_idle = options['MAX_IDLE']
+        self.check_after = options['CHECK_AFTER']
+        self.check = check
+        self.reset = reset
+        self.pid = os.getpid()
+
+        # (connection, opened at, returned at); the newest is reused first so
+        # surplus connections go idle and get closed.
+        self._idle = deque()
+        self._opened_at = {}
+        self._condition = threading.Condition()
+        self.size = 0
+        self.in_use = 0
+        self.waiting = 0
+        self.checkouts = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+        self.opened = 0
+        self.closed = 0
+        self._recent = deque()
+        self._prefilled = False
+
+    def prefill(self, connect):
+        """Open idle connections up to MIN_SIZE; only the first successful call does anything."""
+        with self._condition:
+            if self._prefilled:
+                return
+            self._prefilled = True
+            missing = max(0, min(self.min_size, self.max_size) - self.size)
+            self.size += missing
+        opened = []
+        try:
+            for _ in range(missing):
+                opened.append(connect())
+        finally:
+            now = time.monotonic()
+            with self._condition:
+                self.size -= missing - len(opened)
+                self.opened += len(opened)
+                self._idle.extend((connection, now, now) for connection in opened)
+                if len(opened) < missing:
+                    # Try again on the next connection.
+                    self._prefilled = False
+                self._condition.notify_all()
+
+    def checkout(self, connect):
+        """Borrow a connection, opening one with ``connect()`` if none is idle."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        with self._condition:
+            while not self._idle and self.size >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(
+                        'No connection to %r was free within %s seconds (%d in use).' % (self.alias, self.timeout, self.in_use)
+                    )
+                self.waiting += 1
+                self._condition.wait(remaining)
+                self.waiting -= 1
+            entry = self._idle.pop() if self._idle else None
+            if entry is None:
+                self.size += 1
+            self.in_use += 1
+            now = time.monotonic()
+            self._count_checkout(now, now - started)
+
+        try:
+            if entry is not None:
+                connection, opened_at, returned_at = entry
+                if self._usable(connection, opened_at, returned_at, now):
+                    self._opened_at[id(connection)] = opened_at
+                    return connection
+                self._close(connection)
+            connection = connect()
+        except BaseException:
+            with self._condition:
+                self.size -= 1
+                self.in_use -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self.opened += 1
+        self._opened_at[id(connection)] = time.monotonic()
+        return connection
+
+    def checkin(self, connection):
+        """Return a borrowed connection; it is closed if it cannot be reused."""
+        opened_at = self._opened_at.pop(id(connection), None)
+        if opened_at is None or os.getpid() != self.pid:
+            # Lent before this process was forked.
+            _forked.append(connection)
+            return
+        now = time.monotonic()
+        reusable = now - opened_at < self.max_lifetime and self._safely(self.reset, connection)
+        with self._condition:
+            self.in_use -= 1
+            if reusable:
+                self._idle.append((connection, opened_at, now))
+                connection = None
+            else:
+                self.size -= 1
+            stale = self._take_stale(now)
+            self._condition.notify()
+        for idle_connection in [connection] + stale:
+            if idle_connection is not None:
+                self._close(idle_connection)
+
+    def discard(self, connection):
+        """Close a borrowed connection instead of returning it."""
+        if self._opened_at.pop(id(connection), None) is None or os.getpid() != self.pid:
+            _forked.append(connection)
+            return
+        with self._condition:
+            self.in_use -= 1
+            self.size -= 1
+            self._condition.notify()
+        self._close(connection)
+
+    def stats(self):
+        with self._condition:
+            now = time.monotonic()
+            self._expire_rate(now)
+            return {
+                'size': self.size,
+                'max_size': self.max_size,
+                'in_use': self.in_use,
+                'idle': len(self._idle),
+                'waiting': self.waiting,
+                'checkouts': self.checkouts,
+                'checkouts_per_second': sum(count for second, count in self._recent) / RATE_WINDOW,
+                'wait_seconds': self.wait_seconds,
+                'average_wait_seconds': self.wait_seconds / self.checkouts if self.checkouts else 0.0,
+                'timeouts': self.timeouts,
+                'opened': self.opened,
+                'closed': self.closed,
+            }
+
+    def _usable(self, connection, opened_at, returned_at, now):
+        if now - opened_at >= self.max_lifetime:
+            return False
+        if now - returned_at >= self.check_after:
+            return self._safely(self.check, connection)
+        return True
+
+    def _take_stale(self, now):
+        # Oldest returned first; only surplus idle connections are closed.
+        stale = []
+        while len(self._idle) > self.min_size and now - self._idle[0][2] >= self.max_idle:
+            stale.append(self._idle.popleft()[0])
+            self.size -= 1
+        return stale
+
+    def _count_checkout(self, now, waited):
+        self.checkouts += 1
+        self.wait_seconds += waited
+        second = int(now)
+        if self._recent and self._recent[-1][0] == second:
+            self._recent[-1][1] += 1
+        else:
+            self._recent.append([second, 1])
+        self._expire_rate(now)
+
+    def _expire_rate(self, now):
+        while self._recent and self._recent[0][0] <= now - RATE_WINDOW:
+            self._recent.popleft()
+
+    def _close(self, connection):
+        with self._condition:
+            self.closed += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _safely(self, function, connection):
+        try:
+            return function(connection)
+        except Exception:
+            return False
+
+
+def get_pool(alias, params, options, check, reset):
+    """The process's pool of connections opened with ``params`` for ``alias``.
+
+    A forked child starts fresh pools rather than share its parent's sockets.
+    """
+    key = (alias, repr(sorted(params.items())))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            if pool is not None:
+                _forked.extend(connection for connection, opened_at, returned_at in pool._idle)
+            pool = _pools[key] = Pool(alias, options, check, reset)
+        return pool
+
+
+def close_pools(alias):
+    """Close the idle connections of ``alias``'s pools and forget the pools."""
+    with _pools_lock:
+        pools = [_pools.pop(key) for key in list(_pools) if key[0] == alias]
+    for pool in pools:
+        with pool._condition:
+            idle = [connection for connection, opened_at, returned_at in pool._idle]
+            pool._idle.clear()
+            pool.size -= len(idle)
+        for connection in idle:
+            pool._close(connection)
+
+
+def pools(alias=None):
+    with _pools_lock:
+        return [pool for key, pool in _pools.items() if alias is None or key[0] == alias]
+
+
+def _collect(key):
+    return [({'database': pool.alias}, pool.stats()[key]) for pool in pools()] or 0
+
+
+def _collect_connections():
+    samples = []
+    for pool in pools():
+        stats = pool.stats()
+        samples.append(({'database': pool.alias, 'state': 'in_use'}, stats['in_use']))
+        samples.append(({'database': pool.alias, 'state': 'idle'}, stats['idle']))
+    return samples or 0
+
+
+metrics.register('database_pool_connections', 'Open pooled connections by state.', 'gauge', _collect_connections)
+metrics.register('database_pool_max_connections', 'Pool size limit.', 'gauge', lambda: _collect('max_size'))
+metrics.register('database_pool_waiting', 'Threads waiting for a pooled connection.', 'gauge', lambda: _collect('waiting'))
+metrics.register('database_pool_checkouts_total', 'Connections borrowed from the pool.', 'counter', lambda: _collect('checkouts'))
+metrics.register(
+    'database_pool_wait_seconds_total', 'Time spent waiting for a pooled connection.',
+    'counter', lambda: _collect('wait_seconds'),
+)
+metrics.register(
+    'database_pool_timeouts_total', 'Checkouts that gave up waiting for a connection.',
+    'counter', lambda: _collect('timeouts'),
+)
+metrics.register(
+    'database_pool_connections_opened_total', 'Connections the pool opened.',
+    'counter', lambda: _collect('opened'),
+)
+metrics.register(
+    'database_pool_connections_closed_total', 'Connections the pool closed (expired, idle, broken).',
+    'counter', lambda: _collect('closed'),
+)
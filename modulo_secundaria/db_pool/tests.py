@@ -0,0 +1,158 @@
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from . import pool as pool_module
+from .pool import Pool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.closed = False
+        self.healthy = True
+
+    def close(self):
+        self.closed = True
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class PoolTests(SimpleTestCase):
+    def setUp(self):
+        self.connections = []
+        self.checked = []
+        self.clock = Clock()
+        patcher = mock.patch.object(pool_module, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def connect(self):
+        connection = FakeConnection(len(self.connections))
+        self.connections.append(connection)
+        return connection
+
+    def check(self, connection):
+        self.checked.append(connection)
+        return connection.healthy
+
+    def pool(self, **options):
+        return Pool('default', options, self.check, lambda connection: not connection.closed)
+
+    def test_returned_connections_are_reused(self):
+        pool = self.pool()
+        first = pool.checkout(self.connect)
+        pool.checkin(first)
+        self.assertIs(pool.checkout(self.connect), first)
+        self.assertEqual(pool.stats()['opened'], 1)
+        self.assertEqual((pool.stats()['in_use'], pool.stats()['checkouts']), (1, 2))
+
+    def test_connections_are_replaced_after_max_lifetime(self):
+        pool = self.pool(MAX_LIFETIME=100, CHECK_AFTER=1000)
+        first = pool.checkout(self.connect)
+        pool.checkin(first)
+        self.clock.now += 100
+        second = pool.checkout(self.connect)
+        self.assertIsNot(second, first)
+        self.assertTrue(first.closed)
+        # Expired while lent: closed on return instead of going idle.
+        self.clock.now += 100
+        pool.checkin(second)
+        self.assertTrue(second.closed)
+        self.assertEqual(pool.stats()['size'], 0)
+
+    def test_surplus_idle_connections_are_closed(self):
+        pool = self.pool(MIN_SIZE=2, MAX_IDLE=300)
+        first, second, third = [pool.checkout(self.connect) for _ in range(3)]
+        pool.checkin(first)
+        pool.checkin(second)
+        self.clock.now += 300
+        pool.checkin(third)
+        # second has been idle as long as first, but MIN_SIZE connections stay open.
+        self.assertEqual([connection.closed for connection in (first, second, third)], [True, False, False])
+        self.assertEqual((pool.stats()['size'], pool.stats()['idle'], pool.stats()['closed']), (2, 2, 1))
+
+    def test_connections_idle_past_check_after_are_checked(self):
+        pool = self.pool(CHECK_AFTER=5)
+        first = pool.checkout(self.connect)
+        pool.checkin(first)
+        self.clock.now += 4
+        pool.checkin(pool.checkout(self.connect))
+        self.assertEqual(self.checked, [])
+
+        self.clock.now += 5
+        first.healthy = False
+        second = pool.checkout(self.connect)
+        self.assertEqual(self.checked, [first])
+        self.assertIsNot(second, first)
+        self.assertTrue(first.closed)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_broken_connections_are_not_returned(self):
+        pool = self.pool()
+        first = pool.checkout(self.connect)
+        first.close()
+        pool.checkin(first)
+        second = pool.checkout(self.connect)
+        pool.discard(second)
+        stats = pool.stats()
+        self.assertEqual([stats[key] for key in ('size', 'idle', 'in_use', 'opened', 'closed')], [0, 0, 0, 2, 2])
+        self.assertTrue(second.closed)
+
+    def test_failed_connects_free_their_slot(self):
+        pool = self.pool(MAX_SIZE=1)
+        with self.assertRaises(OSError):
+            pool.checkout(mock.Mock(side_effect=OSError))
+        self.assertEqual((pool.stats()['size'], pool.stats()['in_use']), (0, 0))
+        pool.checkout(self.connect)
+
+    def test_prefill_opens_min_size_connections_once(self):
+        pool = self.pool(MIN_SIZE=3, MAX_SIZE=5)
+        pool.prefill(self.connect)
+        self.assertEqual((pool.stats()['size'], pool.stats()['idle']), (3, 3))
+        pool.prefill(self.connect)
+        self.assertIn(pool.checkout(self.connect), self.connections)
+        self.assertEqual(len(self.connections), 3)
+
+    def test_failed_prefill_is_retried(self):
+        pool = self.pool(MIN_SIZE=2)
+        connect = mock.Mock(side_effect=[FakeConnection(0), OSError, FakeConnection(1)])
+        with self.assertRaises(OSError):
+            pool.prefill(connect)
+        self.assertEqual((pool.stats()['size'], pool.stats()['idle']), (1, 1))
+        pool.prefill(connect)
+        self.assertEqual(pool.stats()['idle'], 2)
+
+
+class PoolLimitTests(SimpleTestCase):
+    # Real time: these wait on the pool's condition.
+
+    def pool(self, **options):
+        return Pool('default', dict(options, MAX_SIZE=1), lambda connection: True, lambda connection: True)
+
+    def test_checkout_times_out_when_the_pool_is_exhausted(self):
+        pool = self.pool(TIMEOUT=0.05)
+        pool.checkout(lambda: FakeConnection(0))
+        with self.assertRaisesMessage(PoolTimeout, "No connection to 'default' was free within 0.05 seconds (1 in use)."):
+            pool.checkout(lambda: FakeConnection(1))
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_waiters_get_returned_connections(self):
+        pool = self.pool(TIMEOUT=5)
+        first = pool.checkout(lambda: FakeConnection(0))
+        borrowed = []
+        waiter = threading.Thread(target=lambda: borrowed.append(pool.checkout(lambda: FakeConnection(1))))
+        waiter.start()
+        while not pool.stats()['waiting']:
+            waiter.join(0.001)
+        pool.checkin(first)
+        waiter.join()
+        self.assertEqual(borrowed, [first])
+        self.assertEqual(pool.stats()['opened'], 1)
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from functools import partial
+
+from django.conf import settings
+from graphql.backend.base import GraphQLBackend, GraphQLDocument
+from graphql.execution import ExecutionResult, execute
+from graphql.language.parser import parse
+from graphql.validation import validate
+
+from . import metrics
+
+
+def query_hash(query):
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+
+def _invalid(errors, *args, **kwargs):
+    return ExecutionResult(errors=errors, invalid=True)
+
+
+class CachedDocumentBackend(GraphQLBackend):
+    """Parse and validate each distinct query once, keeping an LRU of the results."""
+
+    def __init__(self, max_size=500, executor=None):
+        self.max_size = max_size
+        self.execute_params = {'executor': executor}
+        self.hits = self.misses = self.evictions = 0
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+
+    def document_from_string(self, schema, document_string):
+        key = (id(schema), query_hash(document_string))
+        with self._lock:
+            document = self._documents.get(key)
+            if document is not None:
+                self._documents.move_to_end(key)
+                self.hits += 1
+                return document
+            self.misses += 1
+
+        document_ast = parse(document_string)
+        errors = validate(schema, document_ast)
+        if errors:
+            execute_document = partial(_invalid, errors)
+        else:
+            execute_document = partial(execute, schema, document_ast, **self.execute_params)
+        document = GraphQLDocument(schema, document_string, document_ast, execute_document)
+        document.validation_errors = errors
+
+        with self._lock:
+            self._documents[key] = document
+            while len(self._documents) > self.max_size:
+                self._documents.popitem(last=False)
+                self.evictions += 1
+        return document
+
+    def clear(self):
+        with self._lock:
+            self._documents.clear()
+
+    def stats(self):
+        return {
+            'size': len(self._documents),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+class PersistedQueryRegistry:
+    """Queries registered ahead of time, addressed by the SHA-256 of their text."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._queries = None
+
+    @property
+    def queries(self):
+        if self._queries is None:
+            self._queries = self.load(self.path) if self.path else {}
+        return self._queries
+
+    @staticmethod
+    def load(path):
+        with open(path, encoding='utf-8') as manifest:
+            entries = json.load(manifest)
+        if isinstance(entries, dict):
+            entries = entries.values()
+        # Key on the hash we compute so a bad manifest entry can never match.
+        return {query_hash(query): query for query in entries}
+
+    def get(self, sha256):
+        return self.queries.get(sha256)
+
+
+document_backend = CachedDocumentBackend(getattr(settings, 'GRAPHQL_DOCUMENT_CACHE_SIZE', 500))
+persisted_queries = PersistedQueryRegistry(getattr(settings, 'GRAPHQL_PERSISTED_QUERIES', None))
+
+metrics.register(
+    'graphql_document_cache_hits_total', 'Parsed GraphQL documents served from the cache.',
+    'counter', lambda: document_backend.hits,
+)
+metrics.register(
+    'graphql_document_cache_misses_total', 'GraphQL documents parsed and validated.',
+    'counter', lambda: document_backend.misses,
+)
+metrics.register(
+    'graphql_document_cache_evictions_total', 'GraphQL documents evicted from the cache.',
+    'counter', lambda: document_backend.evictions,
+)
+metrics.register(
+    'graphql_document_cache_size', 'GraphQL documents currently cached.',
+    'gauge', lambda: len(document_backend._documents),
+)
@@ -0,0 +1,182 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+from .documents import persisted_queries, query_hash
+from .optimizer import get_operation
+
+logger = logging.getLogger('modulo_secundaria.graphql')
+
+DEBUG_HEADER = 'HTTP_X_GRAPHQL_DEBUG'
+DEFAULTS = {
+    # Log and count every operation, not only those sent with the debug header.
+    'ENABLED': False,
+    'SLOW_OPERATION_MS': 500,
+    # Operation names counted under their own metric label. Persisted queries
+    # are labelled by their hash and all other operations as "other", since
+    # clients choose operation names freely.
+    'OPERATIONS': [],
+}
+
+operations = metrics.Counter('graphql_operations_total', 'GraphQL operations executed.', ['operation', 'type'])
+operation_seconds = metrics.Counter(
+    'graphql_operation_seconds_total', 'Time spent executing GraphQL operations.', ['operation', 'type'],
+)
+sql_queries = metrics.Counter('graphql_sql_queries_total', 'SQL statements run by GraphQL operations.', ['operation', 'type'])
+sql_seconds = metrics.Counter('graphql_sql_seconds_total', 'Time spent in SQL by GraphQL operations.', ['operation', 'type'])
+
+
+def config():
+    return dict(DEFAULTS, **getattr(settings, 'GRAPHQL_INSTRUMENTATION', {}))
+
+
+def field_path(info):
+    # List indices are dropped so every row of a list shares one entry.
+    return '.'.join(str(key) for key in info.path if not isinstance(key, int))
+
+
+class Profile:
+    def __init__(self, detailed):
+        self.detailed = detailed
+        self.started = time.perf_counter()
+        self.duration = 0
+        self.current = None
+        self.fields = OrderedDict()
+        self.statements = OrderedDict()
+        self.sql_count = 0
+        self.sql_time = 0
+        # Root fields of the async endpoint record SQL from several threads.
+        self._lock = threading.Lock()
+
+    def field(self, path):
+        if path not in self.fields:
+            self.fields[path] = {'calls': 0, 'resolverMs': 0.0, 'sqlCount': 0, 'sqlMs': 0.0}
+        return self.fields[path]
+
+    def record_sql(self, sql, duration):
+        with self._lock:
+            self.sql_count += 1
+            self.sql_time += duration
+        if not self.detailed:
+            return
+        path = self.current or '(deferred)'
+        entry = self.field(path)
+        entry['sqlCount'] += 1
+        entry['sqlMs'] += duration * 1000
+        statement = self.statements.setdefault(sql, {'count': 0, 'paths': set()})
+        statement['count'] += 1
+        statement['paths'].add(path)
+
+    def duplicates(self):
+        """Statements run more than once with different parameters: likely N+1s."""
+        return [
+            {'sql': sql, 'count': statement['count'], 'paths': sorted(statement['paths'])}
+            for sql, statement in self.statements.items()
+            if statement['count'] > 1
+        ]
+
+    def as_dict(self):
+        return {
+            'durationMs': round(self.duration * 1000, 3),
+            'sqlCount': self.sql_count,
+            'sqlMs': round(self.sql_time * 1000, 3),
+            'fields': OrderedDict(
+                (path, dict(entry, resolverMs=round(entry['resolverMs'], 3), sqlMs=round(entry['sqlMs'], 3)))
+                for path, entry in self.fields.items()
+            ),
+            'duplicates': self.duplicates(),
+        }
+
+
+def start(request):
+    """Return a Profile for this request, or None when instrumentation is off."""
+    detailed = request.META.get(DEBUG_HEADER) and (settings.DEBUG or getattr(request.user, 'is_staff', False))
+    if not detailed and not config()['ENABLED']:
+        return None
+    profile = Profile(bool(detailed))
+    request.graphql_profile = profile
+    return profile
+
+
+@contextmanager
+def capture_sql(profile):
+    if profile is None:
+        yield
+        return
+
+    def wrapper(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            profile.record_sql(sql, time.perf_counter() - started)
+
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(wrapper))
+        yield
+
+
+def operation_label(document, operation_name):
+    if document is None:
+        return 'other'
+    operation = get_operation(document.document_ast, operation_name)
+    if operation is not None and operation.name and operation.name.value in config()['OPERATIONS']:
+        return operation.name.value
+    sha256 = query_hash(document.document_string)
+    if persisted_queries.get(sha256) is not None:
+        return sha256
+    return 'other'
+
+
+def finish(profile, request, document, operation_name, operation_type, result):
+    profile.duration = time.perf_counter() - profile.started
+    labels = {'operation': operation_label(document, operation_name), 'type': operation_type or ''}
+    operations.inc(**labels)
+    operation_seconds.inc(profile.duration, **labels)
+    sql_queries.inc(profile.sql_count, **labels)
+    sql_seconds.inc(profile.sql_time, **labels)
+
+    record = {
+        'event': 'graphql.operation',
+        'operation': operation_name,
+        'type': operation_type,
+        'durationMs': round(profile.duration * 1000, 3),
+        'sqlCount': profile.sql_count,
+        'sqlMs': round(profile.sql_time * 1000, 3),
+        'errors': len(result.errors or []) if result is not None else 0,
+    }
+    if profile.detailed:
+        record['duplicateStatements'] = len(profile.duplicates())
+    level = logging.WARNING if record['durationMs'] >= config()['SLOW_OPERATION_MS'] else logging.INFO
+    logger.log(level, json.dumps(record))
+
+    if profile.detailed and result is not None:
+        result.extensions['profile'] = profile.as_dict()
+    del request.graphql_profile
+
+
+class InstrumentationMiddleware:
+    """Graphene middleware timing each resolver of a profiled request."""
+
+    def resolve(self, next, root, info, **args):
+        profile = getattr(info.context, 'graphql_profile', None)
+        if profile is None or not profile.detailed:
+            return next(root, info, **args)
+        path = field_path(info)
+        previous, profile.current = profile.current, path
+        started = time.perf_counter()
+        try:
+            return next(root, info, **args)
+        finally:
+            entry = profile.field(path)
+            entry['calls'] += 1
+            entry['resolverMs'] += (time.perf_counter() - started) * 1000
+            profile.current = previous
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class JobsConfig(AppConfig):
+    name = 'modulo_secundaria.jobs'
+    label = 'jobs'
+
+    def ready(self):
+        # Tasks register themselves from each app's tasks.py.
+        autodiscover_modules('tasks')
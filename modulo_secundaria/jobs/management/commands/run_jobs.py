@@ -0,0 +1,52 @@
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from modulo_secundaria.jobs import queue
+
+PRUNE_SECONDS = 3600
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (receipts and other slow work) until stopped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Jobs run at once; defaults to JOB_QUEUE["WORKERS"].')
+        parser.add_argument('--once', action='store_true', help='Exit once no job is due instead of polling.')
+
+    def handle(self, *args, **options):
+        workers = options['workers'] or queue.config()['WORKERS']
+        if workers < 1:
+            raise CommandError('--workers must be positive.')
+        # Saves made by jobs invalidate cached GraphQL responses only for
+        # models the schema exposes, so load it as the web processes do.
+        import modulo_secundaria.schema  # noqa: F401
+
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            # Running jobs finish; nothing new is claimed.
+            signal.signal(signum, lambda signum, frame: stop.set())
+        prefix = '%s:%d' % (socket.gethostname(), os.getpid())
+        threads = [
+            threading.Thread(target=queue.work, args=('%s:%d' % (prefix, number), stop, options['once']), daemon=True)
+            for number in range(workers)
+        ]
+        self.stdout.write('%d workers running %s' % (workers, ', '.join(sorted(queue.tasks)) or 'no tasks'))
+        for thread in threads:
+            thread.start()
+
+        next_prune = 0
+        while any(thread.is_alive() for thread in threads):
+            if time.monotonic() >= next_prune:
+                next_prune = time.monotonic() + PRUNE_SECONDS
+                pruned = queue.prune()
+                if pruned:
+                    self.stdout.write('%d finished jobs deleted' % pruned)
+            stop.wait(1)
+            if stop.is_set():
+                for thread in threads:
+                    thread.join()
@@ -0,0 +1,174 @@
+import datetime
+import functools
+import json
+import logging
+import random
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connections, router, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .. import metrics, response_cache
+from .models import Job
+
+DEFAULTS = {
+    # Jobs run at once by each run_jobs process.
+    'WORKERS': 2,
+    # How often idle workers look for due jobs.
+    'POLL_SECONDS': 1,
+    # Runs of a job before it is marked failed; tasks may set their own.
+    'MAX_ATTEMPTS': 5,
+    # Retries wait BACKOFF_SECONDS, doubling per attempt up to MAX_BACKOFF_SECONDS.
+    'BACKOFF_SECONDS': 10,
+    'MAX_BACKOFF_SECONDS': 3600,
+    # A job still running after this long has lost its worker and runs again.
+    'LEASE_SECONDS': 600,
+    # Finished jobs are deleted after this long.
+    'KEEP_DAYS': 7,
+}
+# Due jobs a worker tries to claim per poll where SKIP LOCKED is not available.
+CANDIDATES = 10
+
+logger = logging.getLogger(__name__)
+tasks = {}
+
+
+def config():
+    return dict(DEFAULTS, **getattr(settings, 'JOB_QUEUE', {}))
+
+
+class Task:
+    def __init__(self, function, max_attempts=None):
+        functools.update_wrapper(self, function)
+        self.function = function
+        self.name = '%s.%s' % (function.__module__, function.__qualname__)
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args, **kwargs):
+        return self.function(*args, **kwargs)
+
+    def enqueue(self, *args, **kwargs):
+        """Queue a run with JSON-serializable arguments. Inside a transaction,
+        workers only see the job once it commits."""
+        return Job.objects.create(task=self.name, args=list(args), kwargs=kwargs, max_attempts=self._max_attempts())
+
+    def enqueue_many(self, calls):
+        """Queue one run per tuple of positional arguments in ``calls``."""
+        return Job.objects.bulk_create([
+            Job(task=self.name, args=list(args), max_attempts=self._max_attempts()) for args in calls
+        ])
+
+    def _max_attempts(self):
+        return self.max_attempts or config()['MAX_ATTEMPTS']
+
+
+def task(function=None, max_attempts=None):
+    """Register a function that workers can run, under its dotted path."""
+    def register(function):
+        registered = Task(function, max_attempts)
+        tasks[registered.name] = registered
+        return registered
+    return register(function) if function is not None else register
+
+
+def claim(worker):
+    """Mark the next due job as running for ``worker`` and return it, or None."""
+    now = timezone.now()
+    due = Job.objects.filter(
+        Q(status=Job.QUEUED, run_at__lte=now)
+        | Q(status=Job.RUNNING, started_at__lt=now - datetime.timedelta(seconds=config()['LEASE_SECONDS']))
+    ).order_by('run_at', 'id')
+    changes = {'status': Job.RUNNING, 'worker': worker, 'started_at': now, 'attempts': F('attempts') + 1}
+    using = router.db_for_write(Job)
+    job = None
+    if connections[using].features.has_select_for_update_skip_locked:
+        with transaction.atomic(using=using):
+            job = due.using(using).select_for_update(skip_locked=True).first()
+            if job is not None:
+                Job.objects.using(using).filter(pk=job.pk).update(**changes)
+    else:
+        # Without SKIP LOCKED (SQLite) a job is claimed with an UPDATE that only
+        # matches while nobody else has claimed it, so one worker wins.
+        for candidate in due.using(using)[:CANDIDATES]:
+            claimed = Job.objects.using(using).filter(
+                pk=candidate.pk, status=candidate.status, attempts=candidate.attempts,
+            ).update(**changes)
+            if claimed:
+                job = candidate
+                break
+    if job is None:
+        return None
+    job.refresh_from_db(using=using)
+    response_cache.bump(Job)
+    return job
+
+
+def backoff(attempts):
+    """Seconds before retrying a job that has failed ``attempts`` times, with jitter."""
+    delay = min(config()['MAX_BACKOFF_SECONDS'], config()['BACKOFF_SECONDS'] * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1)
+
+
+def execute(job):
+    """Run a claimed job and record whether it succeeded, will be retried or failed."""
+    try:
+        result = tasks[job.task](*job.args, **job.kwargs)
+    except Exception as error:
+        logger.exception('Job %s (%s) failed on attempt %d of %d', job.pk, job.task, job.attempts, job.max_attempts)
+        now = timezone.now()
+        changes = {'last_error': '%s: %s' % (type(error).__name__, error)}
+        if job.attempts >= job.max_attempts:
+            changes.update(status=Job.FAILED, finished_at=now)
+        else:
+            changes.update(status=Job.QUEUED, run_at=now + datetime.timedelta(seconds=backoff(job.attempts)))
+    else:
+        try:
+            json.dumps(result)
+        except TypeError:
+            result = repr(result)
+        changes = {'status': Job.SUCCEEDED, 'finished_at': timezone.now(), 'result': result, 'last_error': ''}
+    # A worker that outlived its lease no longer owns the job.
+    Job.objects.filter(pk=job.pk, attempts=job.attempts).update(**changes)
+    response_cache.bump(Job)
+    for name, value in changes.items():
+        setattr(job, name, value)
+    return job
+
+
+def prune():
+    """Delete jobs that finished more than KEEP_DAYS ago; returns how many."""
+    cutoff = timezone.now() - datetime.timedelta(days=config()['KEEP_DAYS'])
+    deleted, _ = Job.objects.filter(status__in=[Job.SUCCEEDED, Job.FAILED], finished_at__lt=cutoff).delete()
+    return deleted
+
+
+def work(worker, stop, once=False):
+    """Claim and run jobs until ``stop`` is set (or, with ``once``, none is due)."""
+    while not stop.is_set():
+        # Like a request: connections past CONN_MAX_AGE (or pooled) are given back.
+        close_old_connections()
+        try:
+            job = claim(worker)
+        except DatabaseError:
+            logger.exception('Worker %s could not claim a job', worker)
+            job = None
+        if job is not None:
+            try:
+                execute(job)
+            except DatabaseError:
+                # The job stays running until its lease expires, then runs again.
+                logger.exception('Worker %s could not record the outcome of job %s', worker, job.pk)
+        elif once:
+            break
+        else:
+            stop.wait(config()['POLL_SECONDS'])
+    close_old_connections()
+
+
+def _count_by_status():
+    counts = dict(Job.objects.values_list('status').annotate(Count('id')).order_by())
+    return [({'status': status}, counts.get(status, 0)) for status, _ in Job.STATUSES]
+
+
+metrics.register('background_jobs', 'Background jobs by status.', 'gauge', _count_by_status)
@@ -0,0 +1,21 @@
+import graphene
+
+from modulo_secundaria.optimizer import OptimizedDjangoObjectType
+
+from .models import Job
+
+
+class JobType(OptimizedDjangoObjectType):
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'task', 'status', 'attempts', 'max_attempts', 'run_at', 'created_at', 'started_at', 'finished_at',
+            'last_error',
+        ]
+
+
+class Query(graphene.ObjectType):
+    job = graphene.Field(JobType, id=graphene.ID(required=True))
+
+    def resolve_job(self, info, id):
+        return JobType.get_queryset(Job.objects.filter(pk=id), info).first()
@@ -0,0 +1,134 @@
+import datetime
+import threading
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from . import queue
+from .models import Job
+
+QUEUE = dict(queue.DEFAULTS, MAX_ATTEMPTS=2, BACKOFF_SECONDS=10, MAX_BACKOFF_SECONDS=60, LEASE_SECONDS=600, KEEP_DAYS=7)
+
+
+@queue.task
+def add(a, b):
+    return a + b
+
+
+@queue.task(max_attempts=3)
+def fail(message):
+    raise ValueError(message)
+
+
+@override_settings(JOB_QUEUE=QUEUE)
+class WorkTests(TransactionTestCase):
+    def test_enqueue_and_run(self):
+        job = add.enqueue(2, 3)
+        self.assertEqual((job.task, job.args, job.status, job.max_attempts), (add.name, [2, 3], Job.QUEUED, 2))
+        queue.work('worker-1', threading.Event(), once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.attempts, job.worker), (Job.SUCCEEDED, 5, 1, 'worker-1'))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_jobs_are_not_run_before_run_at(self):
+        Job.objects.create(task=add.name, args=[1, 1], max_attempts=1, run_at=timezone.now() + datetime.timedelta(hours=1))
+        queue.work('worker-1', threading.Event(), once=True)
+        self.assertEqual(Job.objects.get().status, Job.QUEUED)
+
+
+@override_settings(JOB_QUEUE=QUEUE)
+class ExecuteTests(TestCase):
+    def run_next(self):
+        with self.assertLogs(queue.logger, 'ERROR'):
+            return queue.execute(queue.claim('worker-1'))
+
+    def test_failures_are_retried_then_failed(self):
+        job = fail.enqueue('boom')
+        before = timezone.now()
+        with mock.patch.object(queue.random, 'uniform', return_value=1):
+            self.run_next()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.last_error), (Job.QUEUED, 1, 'ValueError: boom'))
+        self.assertGreaterEqual(job.run_at, before + datetime.timedelta(seconds=10))
+        self.assertLessEqual(job.run_at, timezone.now() + datetime.timedelta(seconds=10))
+        self.assertIsNone(queue.claim('worker-1'))
+
+        for _ in range(2):
+            Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+            self.run_next()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 3))
+        self.assertIsNotNone(job.finished_at)
+        self.assertIsNone(queue.claim('worker-1'))
+
+    def test_backoff_doubles_up_to_the_cap(self):
+        with mock.patch.object(queue.random, 'uniform', return_value=1):
+            self.assertEqual([queue.backoff(attempts) for attempts in range(1, 6)], [10, 20, 40, 60, 60])
+        with mock.patch.object(queue.random, 'uniform', side_effect=lambda low, high: low):
+            self.assertEqual(queue.backoff(2), 10)
+
+
+@override_settings(JOB_QUEUE=QUEUE)
+class ClaimTests(TestCase):
+    def setUp(self):
+        add.enqueue_many([(1, 1), (2, 2)])
+        self.jobs = list(Job.objects.order_by('id'))
+
+    def assert_claims(self):
+        first, second = queue.claim('worker-1'), queue.claim('worker-2')
+        self.assertEqual(sorted([first.args, second.args]), [[1, 1], [2, 2]])
+        self.assertEqual((first.status, first.worker, first.attempts), (Job.RUNNING, 'worker-1', 1))
+        self.assertIsNone(queue.claim('worker-3'))
+
+    def test_each_job_is_claimed_once(self):
+        self.assert_claims()
+
+    def test_skip_locked(self):
+        with mock.patch.object(connection.features, 'has_select_for_update_skip_locked', True):
+            self.assert_claims()
+
+    def test_claimed_elsewhere_meanwhile(self):
+        taken = []
+
+        def take_first(execute, sql, params, many, context):
+            # Another worker claims the first candidate between the SELECT and this UPDATE.
+            if sql.startswith('UPDATE') and not taken:
+                taken.append(self.jobs[0].pk)
+                Job.objects.filter(pk=self.jobs[0].pk).update(status=Job.RUNNING, worker='worker-2')
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(take_first):
+            job = queue.claim('worker-1')
+        self.assertEqual((job.pk, job.worker), (self.jobs[1].pk, 'worker-1'))
+        self.assertEqual(Job.objects.get(pk=self.jobs[0].pk).worker, 'worker-2')
+
+    def test_expired_leases_are_claimed_again(self):
+        Job.objects.filter(pk=self.jobs[1].pk).delete()
+        lost = queue.claim('worker-1')
+        self.assertIsNone(queue.claim('worker-2'))
+        Job.objects.filter(pk=lost.pk).update(started_at=timezone.now() - datetime.timedelta(seconds=601))
+        job = queue.claim('worker-2')
+        self.assertEqual((job.pk, job.worker, job.attempts), (lost.pk, 'worker-2', 2))
+
+        # The worker that lost the lease cannot record its outcome over the new run.
+        queue.execute(lost)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.RUNNING)
+        queue.execute(job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), (Job.SUCCEEDED, 2))
+
+
+@override_settings(JOB_QUEUE=QUEUE)
+class PruneTests(TestCase):
+    def test_finished_jobs_are_kept_for_keep_days(self):
+        now = timezone.now()
+        old = Job.objects.create(task=add.name, max_attempts=1, status=Job.SUCCEEDED, finished_at=now - datetime.timedelta(days=8))
+        failed = Job.objects.create(task=add.name, max_attempts=1, status=Job.FAILED, finished_at=now - datetime.timedelta(days=8))
+        recent = Job.objects.create(task=add.name, max_attempts=1, status=Job.SUCCEEDED, finished_at=now - datetime.timedelta(days=6))
+        waiting = Job.objects.create(task=add.name, max_attempts=1, run_at=now - datetime.timedelta(days=30))
+        self.assertEqual(queue.prune(), 2)
+        self.assertEqual(set(Job.objects.values_list('pk', flat=True)), {recent.pk, waiting.pk})
+        self.assertFalse(Job.objects.filter(pk__in=[old.pk, failed.pk]).exists())
@@ -0,0 +1,71 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+_collectors = OrderedDict()
+_lock = threading.Lock()
+
+
+def register(name, help_text, kind, collect):
+    """Expose ``collect()`` on /metrics/ as a Prometheus ``kind`` metric.
+
+    ``collect`` returns a number or a list of ``(labels_dict, number)`` pairs.
+    """
+    with _lock:
+        _collectors[name] = (help_text, kind, collect)
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        register(name, help_text, 'counter', self.collect)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(label, '') for label in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        with self._lock:
+            return [(dict(zip(self.labels, key)), value) for key, value in self._values.items()]
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ('%s="%s"' % (key, str(value).replace('\\', '\\\\').replace('"', '\\"')) for key, value in labels.items())
+    return '{%s}' % ','.join(pairs)
+
+
+def render():
+    lines = []
+    with _lock:
+        collectors = list(_collectors.items())
+    for name, (help_text, kind, collect) in collectors:
+        lines.append('# HELP %s %s' % (name, help_text))
+        lines.append('# TYPE %s %s' % (name, kind))
+        samples = collect()
+        if not isinstance(samples, list):
+            samples = [({}, samples)]
+        for labels, value in samples:
+            lines.append('%s%s %s' % (name, _format_labels(labels), value))
+    return '\n'.join(lines) + '\n'
+
+
+def authorized(request):
+    """Staff, or a scraper sending ``Authorization: Bearer <METRICS_TOKEN>``."""
+    if getattr(request.user, 'is_staff', False):
+        return True
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    return bool(token) and constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''), 'Bearer %s' % token)
+
+
+def metrics_view(request):
+    if not authorized(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
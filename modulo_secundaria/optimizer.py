@@ -0,0 +1,218 @@
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.db.models import Prefetch
+from graphene.relay import Connection
+from graphene.utils.str_converters import to_camel_case
+from graphene_django import DjangoObjectType
+from graphql.language import ast
+from graphql.type.definition import get_named_type
+
+
+def optimize(queryset, info):
+    """Add select_related/prefetch_related and an ``only()`` projection for ``info``."""
+    graphql_type = get_named_type(info.return_type)
+    selections = merge_selections(info.field_asts)
+    if is_connection(graphql_type):
+        graphql_type, selections = connection_nodes(graphql_type, selections, info.fragments, info.variable_values)
+    return _optimize(queryset, graphql_type, selections, info)
+
+
+def is_connection(graphql_type):
+    graphene_type = getattr(graphql_type, 'graphene_type', None)
+    return isinstance(graphene_type, type) and issubclass(graphene_type, Connection)
+
+
+def connection_nodes(graphql_type, selections, fragments, variables):
+    """Return the node type and the selections made under ``edges { node }``."""
+    edge_type = get_named_type(graphql_type.fields['edges'].type)
+    node_type = get_named_type(edge_type.fields['node'].type)
+    edges = collect_fields(selections, fragments, variables).get('edges', [])
+    nodes = collect_fields(merge_selections(edges), fragments, variables).get('node', [])
+    return node_type, merge_selections(nodes)
+
+
+def merge_selections(field_asts):
+    selections = []
+    for field_ast in field_asts:
+        if field_ast.selection_set:
+            selections.extend(field_ast.selection_set.selections)
+    return selections
+
+
+def collect_fields(selections, fragments, variables, by_alias=False):
+    """Group the field nodes of a selection set by field name (or by response
+    key with ``by_alias``), expanding fragments."""
+    fields = OrderedDict()
+    for selection in selections:
+        if not _included(selection, variables):
+            continue
+        if isinstance(selection, ast.Field):
+            key = selection.alias.value if by_alias and selection.alias else selection.name.value
+            fields.setdefault(key, []).append(selection)
+        elif isinstance(selection, ast.InlineFragment):
+            nested = collect_fields(selection.selection_set.selections, fragments, variables, by_alias)
+            for name, nodes in nested.items():
+                fields.setdefault(name, []).extend(nodes)
+        elif isinstance(selection, ast.FragmentSpread):
+            fragment = fragments.get(selection.name.value)
+            if fragment is None:
+                continue
+            nested = collect_fields(fragment.selection_set.selections, fragments, variables, by_alias)
+            for name, nodes in nested.items():
+                fields.setdefault(name, []).extend(nodes)
+    return fields
+
+
+def get_operation(document_ast, operation_name):
+    operations = [
+        definition for definition in document_ast.definitions
+        if isinstance(definition, ast.OperationDefinition)
+    ]
+    for operation in operations:
+        if operation.name and operation.name.value == operation_name:
+            return operation
+    if not operation_name and len(operations) == 1:
+        return operations[0]
+    return None
+
+
+def get_fragments(document_ast):
+    return {
+        definition.name.value: definition
+        for definition in document_ast.definitions
+        if isinstance(definition, ast.FragmentDefinition)
+    }
+
+
+def model_type(graphql_type):
+    graphene_type = getattr(graphql_type, 'graphene_type', None)
+    if isinstance(graphene_type, type) and issubclass(graphene_type, DjangoObjectType):
+        return graphene_type
+    return None
+
+
+@lru_cache(maxsize=None)
+def attribute_names(graphene_type):
+    """Map schema field names of ``graphene_type`` back to attribute names."""
+    names = {}
+    for attr, field in graphene_type._meta.fields.items():
+        names[attr] = attr
+        names[getattr(field, 'name', None) or to_camel_case(attr)] = attr
+    return names
+
+
+@lru_cache(maxsize=None)
+def model_relations(model):
+    relations = {}
+    for field in model._meta.get_fields():
+        if not field.is_relation or field.related_model is None:
+            continue
+        if field.concrete:
+            relations[field.name] = field
+        else:
+            accessor = field.get_accessor_name()
+            if accessor:
+                relations[accessor] = field
+    return relations
+
+
+class QueryPlan:
+    def __init__(self):
+        self.select = []
+        self.prefetch = []
+        self.only = []
+
+    def apply(self, queryset):
+        if self.select:
+            queryset = queryset.select_related(*self.select)
+        if self.prefetch:
+            queryset = queryset.prefetch_related(*self.prefetch)
+        if self.only:
+            queryset = queryset.only(*self.only)
+        return queryset
+
+
+def _optimize(queryset, graphql_type, selections, info):
+    plan = QueryPlan()
+    _plan(queryset.model, graphql_type, selections, info, '', plan)
+    return plan.apply(queryset)
+
+
+def _plan(model, graphql_type, selections, info, prefix, plan, back_field=None):
+    backrefs = []
+    graphene_type = model_type(graphql_type)
+    if graphene_type is None:
+        return backrefs
+    names = attribute_names(graphene_type)
+    relations = model_relations(model)
+    concrete = {field.name for field in model._meta.concrete_fields}
+    # Foreign keys are always loaded: joins, prefetches and DataLoaders key on them.
+    columns = [field.name for field in model._meta.concrete_fields if field.is_relation]
+    project = True
+    fields = collect_fields(selections, info.fragments, info.variable_values)
+    for name, field_asts in fields.items():
+        if name.startswith('__'):
+            continue
+        attr = names.get(name)
+        relation = relations.get(attr)
+        if relation is None:
+            if attr in concrete:
+                columns.append(attr)
+            else:
+                # Unknown resolver: it may read any column, so load them all.
+                project = False
+            continue
+        child_type = get_named_type(graphql_type.fields[name].type)
+        child = model_type(child_type)
+        if child is None or not issubclass(relation.related_model, child._meta.model):
+            continue
+        child_selections = merge_selections(field_asts)
+        if attr == back_field:
+            # Prefetching assigns the parent instance itself to this relation.
+            backrefs.append((child_type, child_selections))
+        elif relation.concrete and (relation.many_to_one or relation.one_to_one):
+            path = prefix + relation.name
+            plan.select.append(path)
+            _plan(relation.related_model, child_type, child_selections, info, path + '__', plan)
+        elif prefix + attr not in [lookup.prefetch_through for lookup in plan.prefetch]:
+            child_plan = QueryPlan()
+            parent_field = relation.field.name if relation.one_to_many else None
+            parent_refs = _plan(relation.related_model, child_type, child_selections, info, '', child_plan, parent_field)
+            queryset = child_plan.apply(relation.related_model._default_manager.all())
+            plan.prefetch.append(Prefetch(prefix + attr, queryset=queryset))
+            for parent_type, parent_selections in parent_refs:
+                _plan(model, parent_type, parent_selections, info, prefix, plan)
+    if not project:
+        columns = concrete
+    plan.only.extend(prefix + column for column in columns)
+    return backrefs
+
+
+def _included(selection, variables):
+    for directive in selection.directives or []:
+        name = directive.name.value
+        if name not in ('skip', 'include'):
+            continue
+        value = False
+        for argument in directive.arguments:
+            if argument.name.value != 'if':
+                continue
+            if isinstance(argument.value, ast.Variable):
+                value = bool((variables or {}).get(argument.value.name.value))
+            else:
+                value = argument.value.value in (True, 'true')
+        if (name == 'skip') == value:
+            return False
+    return True
+
+
+class OptimizedDjangoObjectType(DjangoObjectType):
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def get_queryset(cls, queryset, info):
+        if queryset._result_cache is not None:
+            return queryset
+        return optimize(queryset, info)
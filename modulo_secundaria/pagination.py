@@ -0,0 +1,96 @@
+import base64
+from functools import partial
+
+import graphene
+from django.core.exceptions import ValidationError
+from graphene.relay import Connection, PageInfo
+from graphene_django.filter.utils import get_filtering_args_from_filterset
+from graphene_django.settings import graphene_settings
+from graphene_django.utils import maybe_queryset
+from graphql import GraphQLError
+
+CURSOR_PREFIX = 'keyset:'
+
+_connections = {}
+
+
+def connection_for(node_type):
+    if node_type not in _connections:
+        _connections[node_type] = Connection.create_type(
+            '%sConnection' % node_type.__name__, node=node_type
+        )
+    return _connections[node_type]
+
+
+def pk_to_cursor(pk):
+    return base64.b64encode(('%s%s' % (CURSOR_PREFIX, pk)).encode()).decode()
+
+
+def cursor_to_pk(cursor):
+    try:
+        value = base64.b64decode(cursor.encode()).decode()
+    except (ValueError, UnicodeError):
+        value = ''
+    if not value.startswith(CURSOR_PREFIX):
+        raise GraphQLError('Invalid cursor: %s' % cursor)
+    return value[len(CURSOR_PREFIX):]
+
+
+class KeysetConnectionField(graphene.Field):
+    """Relay connection over a DjangoObjectType, paginated by primary key."""
+
+    def __init__(self, node_type, filterset_class=None, **kwargs):
+        self.node_type = node_type
+        self.filterset_class = filterset_class
+        kwargs.setdefault('first', graphene.Int())
+        kwargs.setdefault('after', graphene.String())
+        if filterset_class is not None:
+            for name, argument in get_filtering_args_from_filterset(filterset_class, node_type).items():
+                kwargs.setdefault(name, argument)
+        super().__init__(connection_for(node_type), **kwargs)
+
+    def get_resolver(self, parent_resolver):
+        resolver = super().get_resolver(parent_resolver)
+        return partial(self.connection_resolver, resolver, self.node_type, self.filterset_class)
+
+    @staticmethod
+    def connection_resolver(resolver, node_type, filterset_class, root, info, first=None, after=None, **filters):
+        max_limit = graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+        if first is None:
+            first = max_limit
+        if first < 0:
+            raise GraphQLError('`first` must be a positive integer.')
+        if first > max_limit:
+            raise GraphQLError(
+                'Requesting {} records on the `{}` connection exceeds the `first` limit of {} records.'.format(
+                    first, info.field_name, max_limit
+                )
+            )
+
+        queryset = maybe_queryset(resolver(root, info))
+        if queryset is None:
+            queryset = node_type._meta.model._default_manager.all()
+        if filterset_class is not None:
+            filterset = filterset_class(data=filters, queryset=queryset, request=info.context)
+            if not filterset.is_valid():
+                raise ValidationError(filterset.form.errors.as_json())
+            queryset = filterset.qs
+        if after is not None:
+            queryset = queryset.filter(pk__gt=cursor_to_pk(after))
+        queryset = node_type.get_queryset(queryset.order_by('pk'), info)
+
+        rows = list(queryset[:first + 1])
+        has_next_page = len(rows) > first
+        rows = rows[:first]
+
+        connection_type = connection_for(node_type)
+        edges = [connection_type.Edge(node=row, cursor=pk_to_cursor(row.pk)) for row in rows]
+        return connection_type(
+            edges=edges,
+            page_info=PageInfo(
+                start_cursor=edges[0].cursor if edges else None,
+                end_cursor=edges[-1].cursor if edges else None,
+                has_previous_page=after is not None,
+                has_next_page=has_next_page,
+            ),
+        )
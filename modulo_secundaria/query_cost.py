@@ -0,0 +1,174 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from graphene_django.settings import graphene_settings
+from graphql import GraphQLError
+from graphql.language import ast
+from graphql.type.definition import GraphQLList, GraphQLNonNull, get_named_type
+
+from .optimizer import collect_fields, connection_nodes, get_fragments, get_operation, is_connection, merge_selections
+
+DEFAULTS = {
+    'MAX_COST': 20000,
+    'MAX_DEPTH': 10,
+    # Assumed size of lists without a `first` argument, e.g. reverse relations.
+    'DEFAULT_LIST_SIZE': 20,
+    # Total cost one client may spend per minute; None disables throttling.
+    'THROTTLE_COST_PER_MINUTE': None,
+    'CACHE': 'default',
+    # Operations one batched request may hold, and their combined cost.
+    'MAX_BATCH_OPERATIONS': 10,
+    'MAX_BATCH_COST': 40000,
+}
+
+
+def config():
+    return dict(DEFAULTS, **getattr(settings, 'GRAPHQL_QUERY_COST', {}))
+
+
+class QueryCost:
+    def __init__(self, cost, depth):
+        self.cost = cost
+        self.depth = depth
+
+    def as_dict(self):
+        limits = config()
+        return {
+            'requested': self.cost,
+            'depth': self.depth,
+            'maximumCost': limits['MAX_COST'],
+            'maximumDepth': limits['MAX_DEPTH'],
+        }
+
+
+class QueryCostError(GraphQLError):
+    pass
+
+
+def analyze(schema, document_ast, operation_name, variables):
+    """Estimate the cost of a validated operation before running it.
+
+    Every object costs 1 plus its children; lists multiply that by `first` or
+    by the configured default size. Scalars are free.
+    """
+    operation = get_operation(document_ast, operation_name)
+    if operation is None:
+        return None
+    if operation.operation == 'mutation':
+        root = schema.get_mutation_type()
+    else:
+        root = schema.get_query_type()
+    cost, depth = _selection_cost(
+        root, operation.selection_set.selections, get_fragments(document_ast), variables or {}, 0, config(),
+    )
+    return QueryCost(cost, depth)
+
+
+def _selection_cost(parent_type, selections, fragments, variables, depth, limits):
+    total, deepest = 0, depth
+    for name, field_asts in collect_fields(selections, fragments, variables).items():
+        field = parent_type.fields.get(name) if not name.startswith('__') else None
+        if field is None:
+            continue
+        named = get_named_type(field.type)
+        if not getattr(named, 'fields', None):
+            continue
+        selections = merge_selections(field_asts)
+        if is_connection(named):
+            size = _argument(field_asts[0], 'first', variables)
+            if size is None:
+                size = graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+            named, selections = connection_nodes(named, selections, fragments, variables)
+        elif _is_list(field.type):
+            size = _list_size(field, field_asts[0], variables, limits)
+        else:
+            size = 1
+        cost, child_depth = _selection_cost(named, selections, fragments, variables, depth + 1, limits)
+        total += max(size, 0) * (1 + cost)
+        deepest = max(deepest, child_depth)
+    return total, deepest
+
+
+def _list_size(field, field_ast, variables, limits):
+    """`first` (given or defaulted) for list fields that take one, such as
+    searchStudents; DEFAULT_LIST_SIZE for the rest."""
+    if 'first' not in field.args:
+        return limits['DEFAULT_LIST_SIZE']
+    size = _argument(field_ast, 'first', variables)
+    if size is None:
+        size = field.args['first'].default_value
+    if not isinstance(size, int):
+        return limits['DEFAULT_LIST_SIZE']
+    # Their resolvers return at most a connection's worth of rows.
+    return min(size, graphene_settings.RELAY_CONNECTION_MAX_LIMIT)
+
+
+def _is_list(graphql_type):
+    if isinstance(graphql_type, GraphQLNonNull):
+        graphql_type = graphql_type.of_type
+    return isinstance(graphql_type, GraphQLList)
+
+
+def _argument(field_ast, name, variables):
+    for argument in field_ast.arguments or []:
+        if argument.name.value != name:
+            continue
+        if isinstance(argument.value, ast.Variable):
+            value = variables.get(argument.value.name.value)
+            # Variables are costed before they are coerced; a value that is not
+            # an integer fails execution anyway, so cost it like a missing one.
+            return value if isinstance(value, int) and not isinstance(value, bool) else None
+        if isinstance(argument.value, ast.IntValue):
+            return int(argument.value.value)
+    return None
+
+
+def check(query_cost, request):
+    """Raise QueryCostError if the operation is over the depth, cost or rate budget."""
+    limits = config()
+    if query_cost.depth > limits['MAX_DEPTH']:
+        raise QueryCostError(
+            'Query depth {} exceeds the maximum of {}.'.format(query_cost.depth, limits['MAX_DEPTH'])
+        )
+    if query_cost.cost > limits['MAX_COST']:
+        raise QueryCostError(
+            'Query cost {} exceeds the maximum of {}.'.format(query_cost.cost, limits['MAX_COST'])
+        )
+    budget = limits['THROTTLE_COST_PER_MINUTE']
+    if budget is None or not query_cost.cost:
+        return
+    window = int(time.time() // 60)
+    key = 'graphql:cost:%s:%d' % (client_id(request), window)
+    cache = caches[limits['CACHE']]
+    cache.add(key, 0, timeout=120)
+    try:
+        spent = cache.incr(key, query_cost.cost)
+    except ValueError:
+        cache.set(key, query_cost.cost, timeout=120)
+        spent = query_cost.cost
+    if spent > budget:
+        raise QueryCostError(
+            'Query cost budget of {} per minute exceeded; retry in {} seconds.'.format(
+                budget, 60 - int(time.time()) % 60
+            )
+        )
+
+
+def check_batch_size(operations):
+    limit = config()['MAX_BATCH_OPERATIONS']
+    if operations > limit:
+        raise QueryCostError('Batch of {} operations exceeds the maximum of {}.'.format(operations, limit))
+
+
+def check_batch_cost(cost):
+    limit = config()['MAX_BATCH_COST']
+    if cost > limit:
+        raise QueryCostError('Batch cost {} exceeds the maximum of {}.'.format(cost, limit))
+
+
+def client_id(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return 'user:%s' % user.pk
+    return 'ip:%s' % request.META.get('REMOTE_ADDR', '')
@@ -0,0 +1,171 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from graphene_django.registry import get_global_registry
+from graphql.language.printer import print_ast
+from graphql.type.definition import get_named_type
+
+from . import metrics
+from .documents import query_hash
+from .optimizer import collect_fields, get_fragments, get_operation, merge_selections, model_type
+
+DEFAULTS = {
+    'ENABLED': False,
+    'CACHE': 'default',
+    'TIMEOUT': 300,
+}
+VERSION_PREFIX = 'graphql:version:'
+RESPONSE_PREFIX = 'graphql:response:'
+
+# Root fields whose type is not a DjangoObjectType can still be cached if they
+# declare which models their result is computed from.
+FIELD_DEPENDENCIES = {}
+
+hits = misses = 0
+
+
+def config():
+    return dict(DEFAULTS, **getattr(settings, 'GRAPHQL_RESPONSE_CACHE', {}))
+
+
+def enabled():
+    return config()['ENABLED']
+
+
+def get_cache():
+    return caches[config()['CACHE']]
+
+
+def register_dependencies(field_name, *models):
+    FIELD_DEPENDENCIES[field_name] = models
+
+
+def version_key(model):
+    return VERSION_PREFIX + model._meta.label_lower
+
+
+def bump(*models):
+    """Invalidate every cached response that read any of ``models``."""
+    cache = get_cache()
+    for model in models:
+        key = version_key(model._meta.concrete_model)
+        cache.add(key, 0, timeout=None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Evicted between add() and incr(); a fresh value is just as new.
+            cache.set(key, 1, timeout=None)
+
+
+def bump_on_commit(*models):
+    transaction.on_commit(lambda: bump(*models))
+
+
+def tracked_models():
+    return set(get_global_registry()._registry)
+
+
+def _on_change(sender, **kwargs):
+    if sender in tracked_models():
+        bump_on_commit(sender)
+
+
+def connect_signals():
+    from django.db.models.signals import post_delete, post_save
+
+    post_save.connect(_on_change, dispatch_uid='graphql_response_cache_save')
+    post_delete.connect(_on_change, dispatch_uid='graphql_response_cache_delete')
+
+
+def operation_models(schema, document, operation_name, variables):
+    """Models an operation can read, or None if it cannot be cached."""
+    operation = get_operation(document.document_ast, operation_name)
+    if operation is None:
+        return None
+    fragments = get_fragments(document.document_ast)
+    root = schema.get_query_type()
+    models = set()
+    for name, field_asts in collect_fields(operation.selection_set.selections, fragments, variables).items():
+        if name.startswith('__'):
+            if name == '__typename':
+                continue
+            return None
+        field = root.fields.get(name)
+        if field is None:
+            return None
+        root_models = set(FIELD_DEPENDENCIES.get(name, ()))
+        _collect_models(field.type, field_asts, fragments, variables, root_models)
+        if not root_models:
+            return None
+        models |= root_models
+    return models
+
+
+def _collect_models(graphql_type, field_asts, fragments, variables, models):
+    graphql_type = get_named_type(graphql_type)
+    graphene_type = model_type(graphql_type)
+    if graphene_type is not None:
+        models.add(graphene_type._meta.model)
+    fields = getattr(graphql_type, 'fields', None)
+    if not fields:
+        return
+    for name, child_asts in collect_fields(merge_selections(field_asts), fragments, variables).items():
+        if name in fields:
+            _collect_models(fields[name].type, child_asts, fragments, variables, models)
+
+
+def document_hash(document):
+    """Hash of the printed AST, so spacing, commas and comments do not split entries."""
+    # Documents come from the document cache, so this is printed once per query.
+    if getattr(document, 'normalized_hash', None) is None:
+        document.normalized_hash = query_hash(print_ast(document.document_ast))
+    return document.normalized_hash
+
+
+def response_key(schema, document, operation_name, variables, user):
+    """Cache key of a validated query document, or None if it cannot be cached."""
+    models = operation_models(schema, document, operation_name, variables)
+    if models is None:
+        return None
+    labels = sorted(model._meta.concrete_model._meta.label_lower for model in models)
+    versions = get_cache().get_many([VERSION_PREFIX + label for label in labels])
+    payload = json.dumps(
+        [
+            document_hash(document),
+            operation_name,
+            variables,
+            getattr(user, 'pk', None),
+            [(label, versions.get(VERSION_PREFIX + label, 0)) for label in labels],
+        ],
+        sort_keys=True,
+        cls=DjangoJSONEncoder,
+    )
+    return RESPONSE_PREFIX + hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def fetch(key):
+    global hits, misses
+    data = get_cache().get(key)
+    if data is None:
+        misses += 1
+    else:
+        hits += 1
+    return data
+
+
+def store(key, data):
+    get_cache().set(key, data, timeout=config()['TIMEOUT'])
+
+
+metrics.register(
+    'graphql_response_cache_hits_total', 'Query results served from the response cache.',
+    'counter', lambda: hits,
+)
+metrics.register(
+    'graphql_response_cache_misses_total', 'Cacheable queries that had to execute.',
+    'counter', lambda: misses,
+)
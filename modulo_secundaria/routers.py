@@ -0,0 +1,151 @@
+import contextvars
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from . import metrics
+
+DEFAULTS = {
+    # Replica alias -> relative share of the reads it serves.
+    'WEIGHTS': {},
+    # A client's reads stay on the primary this long after its last mutation.
+    'PIN_SECONDS': 5,
+    # Consecutive failed connection attempts that take a replica out of rotation,
+    'MAX_FAILURES': 1,
+    # and for how long.
+    'EJECT_SECONDS': 30,
+}
+PIN_COOKIE = 'db_pin'
+
+_replica = contextvars.ContextVar('replica', default=None)
+routed = metrics.Counter(
+    'graphql_operations_by_database_total', 'GraphQL operations by the database serving their reads.', ['database'],
+)
+
+
+def config():
+    return dict(DEFAULTS, **getattr(settings, 'DATABASE_REPLICAS', {}))
+
+
+class Health:
+    """Per-process failure counts and ejections of the replicas."""
+
+    def __init__(self):
+        self.failures = {}
+        self.ejected_until = {}
+        self._lock = threading.Lock()
+
+    def available(self, alias):
+        return self.ejected_until.get(alias, 0) <= time.monotonic()
+
+    def failed(self, alias):
+        with self._lock:
+            self.failures[alias] = self.failures.get(alias, 0) + 1
+            if self.failures[alias] >= config()['MAX_FAILURES']:
+                self.failures[alias] = 0
+                self.ejected_until[alias] = time.monotonic() + config()['EJECT_SECONDS']
+
+    def succeeded(self, alias):
+        with self._lock:
+            self.failures.pop(alias, None)
+
+    def ejected(self):
+        return sorted(alias for alias in self.ejected_until if not self.available(alias))
+
+
+health = Health()
+metrics.register(
+    'database_replicas_ejected', 'Replicas currently out of rotation after failing to connect.',
+    'gauge', lambda: [({'database': alias}, 1) for alias in health.ejected()] or 0,
+)
+
+
+def choose_replica():
+    """A healthy replica picked by weight, or None to read from the primary."""
+    weights = {alias: weight for alias, weight in config()['WEIGHTS'].items() if weight > 0}
+    while weights:
+        candidates = [alias for alias in weights if health.available(alias)]
+        if not candidates:
+            return None
+        alias = random.choices(candidates, [weights[alias] for alias in candidates])[0]
+        try:
+            connections[alias].ensure_connection()
+        except DatabaseError:
+            health.failed(alias)
+            del weights[alias]
+            continue
+        health.succeeded(alias)
+        return alias
+    return None
+
+
+def replica_for(request):
+    """The replica to serve this request's query from, or None for the primary.
+
+    A batch reads from the primary once one of its mutations has run.
+    """
+    if not config()['WEIGHTS'] or getattr(request, 'ran_mutation', False) or pinned(request):
+        return None
+    return choose_replica()
+
+
+def pinned(request):
+    """Whether this client ran a mutation within the last PIN_SECONDS."""
+    try:
+        if float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time():
+            return True
+    except ValueError:
+        pass
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_authenticated and cache.get(_pin_key(user)))
+
+
+def pin(request, response):
+    """Keep the client's reads on the primary for PIN_SECONDS.
+
+    The cookie covers anonymous and browser clients; the cache entry covers the
+    user's other sessions and clients that drop cookies.
+    """
+    seconds = config()['PIN_SECONDS']
+    if not config()['WEIGHTS'] or not seconds:
+        return
+    response.set_cookie(PIN_COOKIE, '%.3f' % (time.time() + seconds), max_age=seconds, httponly=True, samesite='Lax')
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        cache.set(_pin_key(user), True, seconds)
+
+
+def _pin_key(user):
+    return 'db-pin:%s' % user.pk
+
+
+@contextmanager
+def reads_from(alias):
+    """Route the reads made inside the block (and in threads copying its context) to ``alias``."""
+    routed.inc(database=alias or DEFAULT_DB_ALIAS)
+    token = _replica.set(alias)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+class ReplicaRouter:
+    """Reads inside reads_from() go to the chosen replica; everything else to the primary."""
+
+    def db_for_read(self, model, **hints):
+        return _replica.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *config()['WEIGHTS']}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
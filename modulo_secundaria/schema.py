@@ -1,9 +1,10 @@
 import graphene
 import easyenroll.schema
+import modulo_secundaria.jobs.schema
 import users.schema
 
 
-class Query(users.schema.Query, easyenroll.schema.Query, graphene.ObjectType):
+class Query(users.schema.Query, easyenroll.schema.Query, modulo_secundaria.jobs.schema.Query, graphene.ObjectType):
     pass
 
 class Mutation(users.schema.Mutation, easyenroll.schema.Mutation, graphene.ObjectType):
@@ -38,7 +38,10 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'graphene_django',
-    'easyenroll',
+    'health_check',
+    'modulo_secundaria.db_pool.apps.DbPoolConfig',
+    'modulo_secundaria.jobs.apps.JobsConfig',
+    'easyenroll.apps.EasyenrollConfig',
 
 ]
 
@@ -76,14 +79,53 @@ WSGI_APPLICATION = 'modulo_secundaria.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.1/ref/settings/#databases
 
+# 'default' borrows connections from a per-process pool instead of opening one
+# per request; CONN_MAX_AGE stays 0 so every request returns its connection.
+# MAX_SIZE should cover the threads that can query at once, including the
+# GRAPHQL_ASYNC pools. Pool statistics are on /health/ and /metrics/.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql_psycopg2',
+        'ENGINE': 'modulo_secundaria.db_pool',
         'NAME':'easyenroll',
         'USER':'postgres',
         'PASSWORD':'123456',
         'HOST':'localhost',
         'PORT':'5432',
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'MIN_SIZE': 2,
+            'MAX_SIZE': 50,
+            'TIMEOUT': 5,
+            'MAX_LIFETIME': 1800,
+            'MAX_IDLE': 300,
+            'CHECK_AFTER': 5,
+        },
+    }
+}
+
+# Query operations read from a replica listed in WEIGHTS (each an alias in
+# DATABASES), picked by weight; mutations and everything outside GraphQL use
+# 'default'. A client's reads stay on 'default' for PIN_SECONDS after a
+# mutation, and a replica that fails MAX_FAILURES connection attempts in a row
+# is skipped for EJECT_SECONDS. Locally, two SQLite files work as primary and
+# replica. Replicas in tests should set 'TEST': {'MIRROR': 'default'}.
+DATABASE_ROUTERS = ['modulo_secundaria.routers.ReplicaRouter']
+DATABASE_REPLICAS = {
+    'WEIGHTS': {},
+    'PIN_SECONDS': 5,
+    'MAX_FAILURES': 1,
+    'EJECT_SECONDS': 30,
+}
+
+
+# Caches
+# https://docs.djangoproject.com/en/3.1/topics/cache/
+# locmem is per process; production must point 'default' at a shared backend
+# (Redis, Memcached) so every worker sees the same invalidation counters.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
@@ -126,6 +168,93 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+# Scans and receipts POSTed to /documents/ are stored once per content under
+# ROOT (relative to BASE_DIR), named by their SHA-256, which is the id the
+# mutations take. Set SENDFILE_HEADER to 'X-Accel-Redirect' (nginx) or
+# 'X-Sendfile' (Apache) to let the front server send the files from ROOT.
+DOCUMENT_STORAGE = {
+    'ROOT': 'documents',
+    'MAX_SIZE': 20 * 1024 * 1024,
+    'SENDFILE_HEADER': None,
+    'SENDFILE_PREFIX': '/protected/documents/',
+}
+
 GRAPHENE = {
     'SCHEMA': 'modulo_secundaria.schema.schema',
-}
\ No newline at end of file
+    'RELAY_CONNECTION_MAX_LIMIT': 100,
+    'MIDDLEWARE': [
+        'modulo_secundaria.instrumentation.InstrumentationMiddleware',
+    ],
+}
+
+# Parsed and validated GraphQL documents kept in memory, per process.
+GRAPHQL_DOCUMENT_CACHE_SIZE = 500
+
+# JSON manifest of queries clients may send by SHA-256 hash only
+# (a list of query strings, or an object whose values are query strings).
+GRAPHQL_PERSISTED_QUERIES = None
+
+# Opt-in cache of query results. Entries are keyed on the document, variables,
+# user and a version counter per model read; saving or deleting any of those
+# models bumps its counter, so a cached result is never served stale.
+GRAPHQL_RESPONSE_CACHE = {
+    'ENABLED': False,
+    'CACHE': 'default',
+    'TIMEOUT': 300,
+}
+
+# Operations are costed before execution (1 per object, lists multiplied by
+# `first` or DEFAULT_LIST_SIZE) and rejected above these limits. The cost is
+# returned in the response "extensions". A POST of a JSON array of operations
+# is a batch of at most MAX_BATCH_OPERATIONS costing MAX_BATCH_COST together.
+GRAPHQL_QUERY_COST = {
+    'MAX_COST': 20000,
+    'MAX_DEPTH': 10,
+    'DEFAULT_LIST_SIZE': 20,
+    'THROTTLE_COST_PER_MINUTE': None,
+    'MAX_BATCH_OPERATIONS': 10,
+    'MAX_BATCH_COST': 40000,
+}
+
+# Users a single createUsers mutation may create; each password hash costs
+# tens of milliseconds of CPU. Larger imports go through `manage.py provision_users`.
+GRAPHQL_MAX_BULK_USERS = 500
+
+# Requests sent with an "X-GraphQL-Debug: 1" header by staff (or any client when
+# DEBUG is on) get per-field resolver/SQL timings and repeated statements in
+# extensions.profile. With ENABLED every operation is also logged as JSON on the
+# "modulo_secundaria.graphql" logger and counted on /metrics/, labelled by the
+# names in OPERATIONS, by persisted query hash, or else as "other".
+GRAPHQL_INSTRUMENTATION = {
+    'ENABLED': False,
+    'SLOW_OPERATION_MS': 500,
+    'OPERATIONS': [],
+}
+
+# /metrics/ is served to staff sessions and to scrapers that send
+# "Authorization: Bearer <METRICS_TOKEN>"; None allows staff only.
+METRICS_TOKEN = None
+
+# /graphql/async/ (served under ASGI) runs each request on a pool of
+# REQUEST_THREADS threads, the queries of batched requests on BATCH_THREADS
+# and the root fields of a query on FIELD_THREADS more. Every busy thread holds
+# its own database connection, so keep the sum under the database's connection
+# limit divided by the number of server processes.
+GRAPHQL_ASYNC = {
+    'REQUEST_THREADS': 16,
+    'BATCH_THREADS': 16,
+    'FIELD_THREADS': 16,
+}
+
+# Slow work (receipt PDFs, for one) is queued in the database and run by
+# `manage.py run_jobs`, WORKERS jobs at a time per process. Failed jobs are
+# retried MAX_ATTEMPTS times in all, BACKOFF_SECONDS apart and doubling.
+JOB_QUEUE = {
+    'WORKERS': 2,
+    'POLL_SECONDS': 1,
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_SECONDS': 10,
+    'MAX_BACKOFF_SECONDS': 3600,
+    'LEASE_SECONDS': 600,
+    'KEEP_DAYS': 7,
+}
@@ -0,0 +1,68 @@
+import json
+from unittest import mock
+from urllib.parse import urlencode
+
+from django.core.handlers.asgi import ASGIHandler
+from django.test import AsyncClient, TransactionTestCase
+
+from easyenroll.tests import factories
+from modulo_secundaria import concurrency
+
+ROSTER = '{ students { edges { node { curp } } } tutors { edges { node { curpTutor } } } }'
+
+
+async def post(path, body):
+    """(status, content) of a JSON POST through the ASGI handler.
+
+    Django 3.1's AsyncClient sends a malformed Content-Length with POST bodies.
+    """
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'POST', 'scheme': 'http',
+        'path': path, 'query_string': b'', 'server': ('testserver', 80), 'client': ('127.0.0.1', 0),
+        'headers': [
+            (b'host', b'testserver'), (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+        ],
+    }
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    await ASGIHandler()(scope, receive, send)
+    return sent[0]['status'], b''.join(message.get('body', b'') for message in sent[1:])
+
+
+class AsyncViewTests(TransactionTestCase):
+    # Requests run on pool threads with their own connections, so the data must be committed.
+
+    def setUp(self):
+        pupil = factories.student()
+        factories.tutor(pupil)
+
+    async def test_root_fields_resolve_concurrently(self):
+        # The query goes in the path: Django 3.1's AsyncClient drops GET data.
+        with mock.patch.object(concurrency, 'submit', wraps=concurrency.submit) as submit:
+            response = await AsyncClient().get('/graphql/async/?' + urlencode({'query': ROSTER}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([call[0][0] for call in submit.call_args_list], ['REQUEST_THREADS', 'FIELD_THREADS', 'FIELD_THREADS'])
+        self.assertEqual(json.loads(response.content)['data'], {
+            'students': {'edges': [{'node': {'curp': 'GALA00000000000000'}}]},
+            'tutors': {'edges': [{'node': {'curpTutor': 'GALU00000000000000'}}]},
+        })
+
+    async def test_batch(self):
+        status, content = await post('/graphql/async/', json.dumps([
+            {'id': 1, 'query': ROSTER},
+            {'id': 2, 'query': '{ studentByCurp(curp: "GALA00000000000000") { nombre } }'},
+            {'id': 3, 'query': '{ nope }'},
+        ]).encode())
+        self.assertEqual(status, 200)
+        results = json.loads(content)
+        self.assertEqual([result['id'] for result in results], [1, 2, 3])
+        self.assertEqual(results[0]['data']['tutors']['edges'], [{'node': {'curpTutor': 'GALU00000000000000'}}])
+        self.assertEqual(results[1]['data'], {'studentByCurp': {'nombre': 'Ana'}})
+        self.assertEqual(results[2]['status'], 400)
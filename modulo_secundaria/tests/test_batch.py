@@ -0,0 +1,66 @@
+import json
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from easyenroll.tests import factories
+from modulo_secundaria import query_cost
+
+STUDENTS = '{ students(first: 5) { edges { node { curp } } } }'
+LIMITS = {
+    'MAX_COST': 20000, 'MAX_DEPTH': 10, 'DEFAULT_LIST_SIZE': 20, 'THROTTLE_COST_PER_MINUTE': None,
+    'CACHE': 'default', 'MAX_BATCH_OPERATIONS': 3, 'MAX_BATCH_COST': 40000,
+}
+
+
+@override_settings(GRAPHQL_QUERY_COST=LIMITS)
+class BatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        factories.student()
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def post(self, entries):
+        return self.client.post('/graphql/', json.dumps(entries), content_type='application/json')
+
+    def test_results_keep_their_own_status(self):
+        response = self.post([
+            {'id': 'a', 'query': STUDENTS},
+            {'id': 'b', 'query': '{ nope }'},
+            'not an operation',
+        ])
+        self.assertEqual(response.status_code, 200)
+        first, second, third = response.json()
+        self.assertEqual((first['id'], first['status']), ('a', 200))
+        self.assertEqual(first['data']['students']['edges'], [{'node': {'curp': 'GALA00000000000000'}}])
+        self.assertEqual((second['id'], second['status']), ('b', 400))
+        self.assertNotIn('data', second)
+        self.assertEqual(third['status'], 400)
+        self.assertEqual(third['errors'][0]['message'], 'Batched operations must be JSON objects.')
+
+    def test_each_operation_is_analyzed_once(self):
+        with mock.patch.object(query_cost, 'analyze', wraps=query_cost.analyze) as analyze:
+            response = self.post([{'query': STUDENTS}, {'query': '{ students(first: 2) { edges { cursor } } }'}])
+        self.assertEqual(analyze.call_count, 2)
+        self.assertEqual([result['extensions']['cost']['requested'] for result in response.json()], [5, 2])
+
+    @override_settings(GRAPHQL_QUERY_COST=dict(LIMITS, MAX_COST=3))
+    def test_over_budget_operations_fail_alone(self):
+        response = self.post([{'query': STUDENTS}, {'query': '{ students(first: 2) { edges { cursor } } }'}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['status'] for result in response.json()], [400, 200])
+        self.assertEqual(response.json()[0]['errors'][0]['message'], 'Query cost 5 exceeds the maximum of 3.')
+
+    def test_oversized_batches_are_rejected_whole(self):
+        response = self.post([{'query': STUDENTS}] * 4)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'][0]['message'], 'Batch of 4 operations exceeds the maximum of 3.')
+
+    @override_settings(GRAPHQL_QUERY_COST=dict(LIMITS, MAX_BATCH_COST=9))
+    def test_expensive_batches_are_rejected_whole(self):
+        response = self.post([{'query': STUDENTS}, {'query': STUDENTS}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'][0]['message'], 'Batch cost 10 exceeds the maximum of 9.')
@@ -0,0 +1,81 @@
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.test import TestCase
+
+from easyenroll.tests import factories
+from modulo_secundaria.documents import CachedDocumentBackend, PersistedQueryRegistry, query_hash
+from modulo_secundaria.schema import schema
+
+QUERY = '{ students { edges { node { curp } } } }'
+
+
+class DocumentCacheTests(TestCase):
+    def test_documents_are_parsed_once(self):
+        backend = CachedDocumentBackend(max_size=2)
+        document = backend.document_from_string(schema, QUERY)
+        self.assertIs(backend.document_from_string(schema, QUERY), document)
+        self.assertEqual(backend.stats(), {'size': 1, 'max_size': 2, 'hits': 1, 'misses': 1, 'evictions': 0})
+
+    def test_least_recently_used_is_evicted(self):
+        backend = CachedDocumentBackend(max_size=2)
+        first = backend.document_from_string(schema, '{ a: students { edges { cursor } } }')
+        backend.document_from_string(schema, '{ b: students { edges { cursor } } }')
+        backend.document_from_string(schema, '{ a: students { edges { cursor } } }')
+        backend.document_from_string(schema, '{ c: students { edges { cursor } } }')
+        self.assertEqual(backend.evictions, 1)
+        self.assertIs(backend.document_from_string(schema, '{ a: students { edges { cursor } } }'), first)
+        self.assertEqual(backend.misses, 3)
+
+    def test_validation_errors_are_cached(self):
+        backend = CachedDocumentBackend()
+        document = backend.document_from_string(schema, '{ nope }')
+        self.assertTrue(document.validation_errors)
+        result = document.execute()
+        self.assertTrue(result.invalid)
+        self.assertIs(backend.document_from_string(schema, '{ nope }'), document)
+
+
+class PersistedQueryTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        manifest = os.path.join(directory.name, 'queries.json')
+        with open(manifest, 'w', encoding='utf-8') as output:
+            json.dump({'students': QUERY}, output)
+        registry = PersistedQueryRegistry(manifest)
+        patcher = mock.patch('modulo_secundaria.views.persisted_queries', registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, body):
+        return self.client.post('/graphql/', json.dumps(body), content_type='application/json')
+
+    def persisted(self, sha256):
+        return {'extensions': {'persistedQuery': {'version': 1, 'sha256Hash': sha256}}}
+
+    def test_query_by_hash(self):
+        factories.student()
+        response = self.post(self.persisted(query_hash(QUERY)))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['students']['edges'], [{'node': {'curp': 'GALA00000000000000'}}])
+
+        response = self.client.get('/graphql/', {'extensions': json.dumps(self.persisted(query_hash(QUERY))['extensions'])})
+        self.assertEqual(response.status_code, 200)
+
+    def test_unknown_hash(self):
+        response = self.post(self.persisted('0' * 64))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'][0]['message'], 'PersistedQueryNotFound')
+
+    def test_manifest_formats(self):
+        registry = PersistedQueryRegistry()
+        self.assertIsNone(registry.get(query_hash(QUERY)))
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'list.json')
+        with open(path, 'w', encoding='utf-8') as output:
+            json.dump([QUERY], output)
+        self.assertEqual(PersistedQueryRegistry(path).get(query_hash(QUERY)), QUERY)
@@ -0,0 +1,94 @@
+import json
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from easyenroll.tests import factories
+from modulo_secundaria import instrumentation
+from modulo_secundaria.documents import PersistedQueryRegistry, query_hash
+
+# Nested tutors are resolved through a DataLoader: one statement however many rows.
+QUERY = 'query Roster { tutors { edges { node { nombrePadreTutor } } } students { edges { node { curp } } } }'
+
+
+class ProfileTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = factories.user()
+        cls.teacher = factories.user('teacher', is_staff=False)
+        factories.enrolled(2, cls.staff)
+
+    def post(self, query=QUERY, **headers):
+        return self.client.post('/graphql/', json.dumps({'query': query}), content_type='application/json', **headers)
+
+    def test_staff_get_a_profile_with_the_debug_header(self):
+        self.client.force_login(self.staff)
+        response = self.post(HTTP_X_GRAPHQL_DEBUG='1')
+        profile = response.json()['extensions']['profile']
+        self.assertEqual(profile['sqlCount'], 2)
+        self.assertEqual(set(profile['fields']), {'tutors', 'students', *[
+            '%s.edges%s' % (root, suffix) for root in ['tutors', 'students']
+            for suffix in ['', '.node', '.node.%s' % ('nombrePadreTutor' if root == 'tutors' else 'curp')]
+        ]})
+        self.assertEqual(profile['fields']['tutors']['sqlCount'], 1)
+        self.assertEqual(profile['fields']['students.edges.node.curp']['calls'], 2)
+        self.assertEqual(profile['duplicates'], [])
+
+        self.assertNotIn('profile', self.post().json().get('extensions', {}))
+
+    def test_repeated_statements_are_reported(self):
+        self.client.force_login(self.staff)
+        response = self.post('{ a: tutors { edges { cursor } } b: tutors { edges { cursor } } }', HTTP_X_GRAPHQL_DEBUG='1')
+        duplicates = response.json()['extensions']['profile']['duplicates']
+        self.assertEqual(len(duplicates), 1)
+        self.assertEqual((duplicates[0]['count'], duplicates[0]['paths']), (2, ['a', 'b']))
+
+    def test_others_need_debug_mode(self):
+        self.client.force_login(self.teacher)
+        self.assertNotIn('profile', self.post(HTTP_X_GRAPHQL_DEBUG='1').json().get('extensions', {}))
+        with override_settings(DEBUG=True):
+            self.assertIn('profile', self.post(HTTP_X_GRAPHQL_DEBUG='1').json()['extensions'])
+
+
+@override_settings(GRAPHQL_INSTRUMENTATION={'ENABLED': True, 'SLOW_OPERATION_MS': 500, 'OPERATIONS': ['Roster']})
+class OperationMetricsTests(TestCase):
+    def counted(self):
+        return {labels['operation']: value for labels, value in instrumentation.operations.collect()}
+
+    def post(self, query):
+        with self.assertLogs('modulo_secundaria.graphql'):
+            self.client.post('/graphql/', json.dumps({'query': query}), content_type='application/json')
+
+    def test_client_chosen_names_share_one_label(self):
+        before = self.counted()
+        self.post(QUERY)
+        self.post('query Random1 { tutors { edges { cursor } } }')
+        self.post('query Random2 { tutors { edges { cursor } } }')
+        after = self.counted()
+        self.assertEqual(after['Roster'] - before.get('Roster', 0), 1)
+        self.assertEqual(after['other'] - before.get('other', 0), 2)
+        self.assertNotIn('Random1', after)
+
+    def test_persisted_queries_are_labelled_by_hash(self):
+        persisted = 'query Anything { students { edges { cursor } } }'
+        registry = PersistedQueryRegistry()
+        registry._queries = {query_hash(persisted): persisted}
+        with mock.patch('modulo_secundaria.instrumentation.persisted_queries', registry):
+            self.post(persisted)
+        self.assertEqual(self.counted()[query_hash(persisted)], 1)
+
+
+class MetricsViewTests(TestCase):
+    def test_staff_only(self):
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
+        self.client.force_login(factories.user('teacher', is_staff=False))
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
+        self.client.force_login(factories.user())
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'# TYPE graphql_operations_total counter', response.content)
+
+    @override_settings(METRICS_TOKEN='scrape-me')
+    def test_bearer_token(self):
+        self.assertEqual(self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer scrape-me').status_code, 200)
+        self.assertEqual(self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer guess').status_code, 403)
@@ -0,0 +1,92 @@
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from easyenroll.tests import factories
+from modulo_secundaria.schema import schema
+
+
+def execute(query, variables=None):
+    with CaptureQueriesContext(connection) as queries:
+        result = schema.execute(query, context_value=RequestFactory().post('/graphql/'), variables=variables)
+    return result, [query['sql'] for query in queries.captured_queries]
+
+
+class OptimizerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        factories.enrolled(3, factories.user())
+
+    def test_foreign_keys_are_joined(self):
+        result, queries = execute('''{ enrollments { edges { node {
+            tipoInscripcion idAlumno { nombre } idPago { monto } idUsuario { username }
+        } } } }''')
+        self.assertIsNone(result.errors)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(queries[0].count(' JOIN '), 3)
+        self.assertEqual(len(result.data['enrollments']['edges']), 3)
+
+    def test_reverse_relations_are_prefetched(self):
+        result, queries = execute('''{ students { edges { node {
+            nombre inscripcionSet { idPago { monto } } padrestutoresSet { nombrePadreTutor }
+        } } } }''')
+        self.assertIsNone(result.errors)
+        # Students, enrollments joined to their payments, tutors.
+        self.assertEqual(len(queries), 3)
+        for edge in result.data['students']['edges']:
+            self.assertEqual(len(edge['node']['inscripcionSet']), 1)
+            self.assertEqual(len(edge['node']['padrestutoresSet']), 1)
+
+    def test_fragments_and_directives_are_followed(self):
+        query = '''query ($withTutors: Boolean!) { students { edges { node {
+            ...names
+            ... on StudentType { inscripcionSet { tipoInscripcion } }
+            padrestutoresSet @include(if: $withTutors) { nombrePadreTutor }
+        } } } }
+        fragment names on StudentType { nombre anexoalumnosSet { lateralidad } }'''
+        result, queries = execute(query, {'withTutors': False})
+        self.assertIsNone(result.errors)
+        self.assertEqual(len(queries), 3)
+        self.assertFalse(any('easyenroll_padrestutores' in sql for sql in queries))
+
+        result, queries = execute(query, {'withTutors': True})
+        self.assertIsNone(result.errors)
+        self.assertEqual(len(queries), 4)
+
+    def test_back_reference_reuses_the_parent(self):
+        result, queries = execute('''{ tutors { edges { node {
+            alumno { nombre padrestutoresSet { alumno { curp } } }
+        } } } }''')
+        self.assertIsNone(result.errors)
+        self.assertEqual(len(queries), 2)
+
+
+class ProjectionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        factories.enrolled(2, factories.user())
+
+    def test_only_requested_columns_are_selected(self):
+        result, queries = execute('{ annexes { edges { node { lateralidad __typename } } } }')
+        self.assertIsNone(result.errors)
+        self.assertIn('"lateralidad"', queries[0])
+        # The foreign key is kept for joins and loaders; long text columns are not read.
+        self.assertIn('"idAlumno_id"', queries[0])
+        self.assertNotIn('"observaciones"', queries[0])
+        self.assertNotIn('"padecimiento"', queries[0])
+
+        result, queries = execute('{ annexes { edges { node { observaciones } } } }')
+        self.assertIsNone(result.errors)
+        self.assertIn('"observaciones"', queries[0])
+        self.assertEqual(result.data['annexes']['edges'][0]['node']['observaciones'], 'Sin observaciones.')
+
+    def test_related_rows_are_projected(self):
+        result, queries = execute('''{ enrollments { edges { node {
+            idAlumno { nombre anexoalumnosSet { lateralidad } }
+        } } } }''')
+        self.assertIsNone(result.errors)
+        enrollments, annexes = queries
+        self.assertIn('"easyenroll_alumno"."nombre"', enrollments)
+        self.assertNotIn('"easyenroll_alumno"."escuelaProcedencia"', enrollments)
+        self.assertNotIn('"tipoInscripcion"', enrollments)
+        self.assertNotIn('"observaciones"', annexes)
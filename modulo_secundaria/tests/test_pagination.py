@@ -0,0 +1,81 @@
+import datetime
+from unittest import mock
+
+from django.test import TestCase
+from graphene_django.settings import graphene_settings
+
+from easyenroll.models import Alumno
+from easyenroll.tests import factories
+from modulo_secundaria.pagination import cursor_to_pk, pk_to_cursor
+from modulo_secundaria.schema import schema
+
+PAGE = '''query ($first: Int, $after: String) {
+    students(first: $first, after: $after) {
+        edges { cursor node { id } }
+        pageInfo { hasNextPage hasPreviousPage endCursor }
+    }
+}'''
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.students = [factories.student(number, gradoGrupoAsignado='1A' if number % 2 else '2B') for number in range(5)]
+        for number, day in enumerate([1, 10, 20]):
+            factories.payment(number, fechaPago=datetime.date(2024, 8, day), metodoPago='TR' if day == 10 else 'EF')
+
+    def execute(self, query, **variables):
+        result = schema.execute(query, variables=variables)
+        return result.data, result.errors
+
+    def test_pages_follow_primary_key_order(self):
+        ids = []
+        after = None
+        pages = 0
+        while True:
+            data, errors = self.execute(PAGE, first=2, after=after)
+            self.assertIsNone(errors)
+            connection = data['students']
+            self.assertEqual(connection['pageInfo']['hasPreviousPage'], after is not None)
+            ids.extend(int(edge['node']['id']) for edge in connection['edges'])
+            pages += 1
+            if not connection['pageInfo']['hasNextPage']:
+                break
+            after = connection['pageInfo']['endCursor']
+        self.assertEqual(pages, 3)
+        self.assertEqual(ids, [student.pk for student in self.students])
+
+    def test_cursor_survives_deleted_rows(self):
+        data, _ = self.execute(PAGE, first=2)
+        after = data['students']['pageInfo']['endCursor']
+        Alumno.objects.filter(pk=self.students[2].pk).delete()
+        data, errors = self.execute(PAGE, first=2, after=after)
+        self.assertIsNone(errors)
+        self.assertEqual([int(edge['node']['id']) for edge in data['students']['edges']], [self.students[3].pk, self.students[4].pk])
+
+    @mock.patch.object(graphene_settings, 'RELAY_CONNECTION_MAX_LIMIT', 3)
+    def test_first_is_bounded(self):
+        data, errors = self.execute(PAGE)
+        self.assertEqual(len(data['students']['edges']), 3)
+        _, errors = self.execute(PAGE, first=4)
+        self.assertIn('exceeds the `first` limit of 3', errors[0].message)
+        _, errors = self.execute(PAGE, first=-1)
+        self.assertIn('positive', errors[0].message)
+
+    def test_invalid_cursor_is_rejected(self):
+        _, errors = self.execute(PAGE, after='bm90IGEgY3Vyc29y')
+        self.assertIn('Invalid cursor', errors[0].message)
+        self.assertEqual(cursor_to_pk(pk_to_cursor(42)), '42')
+
+    def test_filters_run_in_the_database(self):
+        data, errors = self.execute('{ students(gradoGrupoAsignado: "1A") { edges { node { id } } } }')
+        self.assertIsNone(errors)
+        self.assertEqual(
+            [int(edge['node']['id']) for edge in data['students']['edges']],
+            [student.pk for student in self.students if student.gradoGrupoAsignado == '1A'],
+        )
+        data, errors = self.execute('''{
+            payments(fechaPagoDesde: "2024-08-05", metodoPago: "EF") { edges { node { fechaPago } } }
+        }''')
+        self.assertIsNone(errors)
+        self.assertEqual([edge['node']['fechaPago'] for edge in data['payments']['edges']], ['2024-08-20'])
@@ -0,0 +1,105 @@
+import json
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from graphql.language.parser import parse
+
+from modulo_secundaria import query_cost
+from modulo_secundaria.schema import schema
+
+STUDENTS = 'query ($n: Int) { students(first: $n) { edges { node { nombre inscripcionSet { id } } } } }'
+LIMITS = {
+    'MAX_COST': 20000, 'MAX_DEPTH': 10, 'DEFAULT_LIST_SIZE': 20, 'THROTTLE_COST_PER_MINUTE': None,
+    'CACHE': 'default', 'MAX_BATCH_OPERATIONS': 10, 'MAX_BATCH_COST': 40000,
+}
+
+
+def limits(**overrides):
+    return override_settings(GRAPHQL_QUERY_COST=dict(LIMITS, **overrides))
+
+
+@limits()
+class AnalyzeTests(TestCase):
+    def analyze(self, query, variables=None):
+        return query_cost.analyze(schema, parse(query), None, variables)
+
+    def test_lists_multiply_their_children(self):
+        # 10 students, each 1 + 20 enrollments (the default size of a list without `first`).
+        cost = self.analyze(STUDENTS, {'n': 10})
+        self.assertEqual((cost.cost, cost.depth), (10 * (1 + 20), 2))
+        cost = self.analyze('{ students(first: 3) { edges { node { nombre } } } }')
+        self.assertEqual((cost.cost, cost.depth), (3, 1))
+
+    def test_missing_first_costs_the_connection_limit(self):
+        cost = self.analyze(STUDENTS)
+        self.assertEqual(cost.cost, 100 * 21)
+
+    def test_uncoerced_variables_do_not_break_costing(self):
+        for value in ['x', 2.5, True, None, [3]]:
+            with self.subTest(value=value):
+                self.assertEqual(self.analyze(STUDENTS, {'n': value}).cost, 100 * 21)
+
+    def test_list_fields_are_multiplied_by_first(self):
+        search = 'query ($n: Int) { searchStudents(text: "Ana", first: $n) { inscripcionSet { id } } }'
+        self.assertEqual(self.analyze(search, {'n': 10}).cost, 10 * (1 + 20))
+        self.assertEqual(self.analyze(search, {'n': 1}).cost, 1 + 20)
+        # Without `first` the field's default applies; above the connection limit, the limit.
+        self.assertEqual(self.analyze(search).cost, 20 * (1 + 20))
+        self.assertEqual(self.analyze(search, {'n': 1000}).cost, 100 * (1 + 20))
+
+    def test_scalars_are_free(self):
+        cost = self.analyze('{ studentByCurp(curp: "X") { nombre curp } }')
+        self.assertEqual((cost.cost, cost.depth), (1, 1))
+
+
+class CostLimitTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+
+    def post(self, query, variables=None):
+        return self.client.post(
+            '/graphql/', json.dumps({'query': query, 'variables': variables}), content_type='application/json',
+        )
+
+    @limits()
+    def test_cost_is_reported_in_extensions(self):
+        response = self.post(STUDENTS, {'n': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['extensions']['cost'], {
+            'requested': 105, 'depth': 2, 'maximumCost': 20000, 'maximumDepth': 10,
+        })
+
+    @limits(MAX_COST=100)
+    def test_expensive_operations_are_rejected(self):
+        response = self.post(STUDENTS, {'n': 5})
+        self.assertEqual(response.status_code, 400)
+        body = response.json()
+        self.assertNotIn('data', body)
+        self.assertEqual(body['errors'][0]['message'], 'Query cost 105 exceeds the maximum of 100.')
+        self.assertEqual(body['extensions']['cost']['requested'], 105)
+        self.assertEqual(self.post(STUDENTS, {'n': 4}).status_code, 200)
+
+    @limits(MAX_DEPTH=2)
+    def test_deep_operations_are_rejected(self):
+        self.assertEqual(self.post(STUDENTS, {'n': 1}).status_code, 200)
+        response = self.post('{ students(first: 1) { edges { node { inscripcionSet { idPago { monto } } } } } }')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'][0]['message'], 'Query depth 3 exceeds the maximum of 2.')
+
+    @limits(THROTTLE_COST_PER_MINUTE=150)
+    def test_clients_are_throttled(self):
+        self.assertEqual(self.post(STUDENTS, {'n': 5}).status_code, 200)
+        response = self.post(STUDENTS, {'n': 5})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('budget of 150 per minute exceeded', response.json()['errors'][0]['message'])
+
+    @limits()
+    def test_bad_variables_and_documents_are_graphql_errors(self):
+        # Rejected by variable coercion with graphql-core's own message.
+        response = self.post(STUDENTS, {'n': 'x'})
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('data', response.json())
+
+        response = self.post('{ students(first: "x") { edges { cursor } } }')
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('extensions', response.json())
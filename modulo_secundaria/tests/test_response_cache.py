@@ -0,0 +1,93 @@
+import json
+
+from django.core.cache import caches
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from easyenroll.models import Alumno
+from easyenroll.tests import factories
+from modulo_secundaria import response_cache
+
+QUERY = '{ students { edges { node { nombre } } } }'
+MUTATION = '''mutation {
+    createStudent(nombre: "Eva", apellidoPaterno: "Sosa", apellidoMaterno: "Díaz",
+                  correoInstitucional: "eva@secundaria.edu.mx", curp: "SODE00000000000001", sexo: "M",
+                  escuelaProcedencia: "Primaria", gradoGrupoAsignado: "1A") { id }
+}'''
+CACHE = {'ENABLED': True, 'CACHE': 'default', 'TIMEOUT': 300}
+
+
+class CacheClientMixin:
+    def setUp(self):
+        caches['default'].clear()
+
+    def post(self, query):
+        """The response and whether it came from the cache."""
+        hits = response_cache.hits
+        response = self.client.post('/graphql/', json.dumps({'query': query}), content_type='application/json')
+        return response, response_cache.hits > hits
+
+    def names(self, response):
+        return [edge['node']['nombre'] for edge in response.json()['data']['students']['edges']]
+
+
+@override_settings(GRAPHQL_RESPONSE_CACHE=CACHE)
+class ResponseCacheTests(CacheClientMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        factories.student()
+
+    def test_repeated_query_is_served_from_the_cache(self):
+        response, cached = self.post(QUERY)
+        self.assertFalse(cached)
+        self.assertEqual(self.names(response), ['Ana'])
+        again, cached = self.post(QUERY)
+        self.assertTrue(cached)
+        self.assertEqual(again.json(), response.json())
+
+    def test_key_ignores_formatting(self):
+        self.post(QUERY)
+        _, cached = self.post('# students\n{\n  students {\n    edges { node { nombre } }\n  }\n}')
+        self.assertTrue(cached)
+        # An alias changes the response, so it is another entry.
+        _, cached = self.post('{ students { edges { node { name: nombre } } } }')
+        self.assertFalse(cached)
+
+    def test_entries_are_per_user(self):
+        self.post(QUERY)
+        self.client.force_login(factories.user())
+        _, cached = self.post(QUERY)
+        self.assertFalse(cached)
+        _, cached = self.post(QUERY)
+        self.assertTrue(cached)
+
+    def test_invalid_documents_are_rejected_not_cached(self):
+        response, _ = self.post('{ nope { id } }')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Cannot query field "nope"', response.json()['errors'][0]['message'])
+
+    def test_mutations_are_never_cached(self):
+        for _ in range(2):
+            response, cached = self.post(MUTATION)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(cached)
+        self.assertEqual(Alumno.objects.filter(curp='SODE00000000000001').count(), 2)
+
+
+@override_settings(GRAPHQL_RESPONSE_CACHE=CACHE)
+class InvalidationTests(CacheClientMixin, TransactionTestCase):
+    # Versions are bumped when the mutation's transaction commits.
+
+    def test_mutation_invalidates_cached_results(self):
+        factories.student()
+        self.post(QUERY)
+        self.assertTrue(self.post(QUERY)[1])
+        self.post(MUTATION)
+        response, cached = self.post(QUERY)
+        self.assertFalse(cached)
+        self.assertEqual(self.names(response), ['Ana', 'Eva'])
+
+    def test_unrelated_writes_keep_the_entry(self):
+        factories.student()
+        self.post(QUERY)
+        factories.user()
+        self.assertTrue(self.post(QUERY)[1])
@@ -0,0 +1,153 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import DatabaseError, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from easyenroll.models import Alumno
+from easyenroll.tests import factories
+from modulo_secundaria import response_cache, routers
+from modulo_secundaria.tests.test_async import post
+
+QUERY = '{ students { edges { node { nombre } } } }'
+MUTATION = '''mutation {
+    createStudent(nombre: "Eva", apellidoPaterno: "Sosa", apellidoMaterno: "Díaz",
+                  correoInstitucional: "eva@secundaria.edu.mx", curp: "SODE00000000000001", sexo: "M",
+                  escuelaProcedencia: "Primaria", gradoGrupoAsignado: "1A") { id }
+}'''
+REPLICAS = {'WEIGHTS': {'replica': 1}, 'PIN_SECONDS': 5, 'MAX_FAILURES': 1, 'EJECT_SECONDS': 30}
+
+
+def batch_names(results):
+    """The student names each batched query read; None for other operations."""
+    return [
+        [edge['node']['nombre'] for edge in result['data']['students']['edges']] if 'students' in result['data'] else None
+        for result in results
+    ]
+
+
+class ReplicaMixin:
+    """A second SQLite file stands in for the replica. It holds other rows than
+    the primary, so every response shows where it was read from."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Added after the test databases are set up: the replica is a plain
+        # file that keeps its rows outside the test transaction.
+        cls.directory = tempfile.mkdtemp()
+        connections.databases['replica'] = {
+            'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.path.join(cls.directory, 'replica.sqlite3'),
+        }
+        connections.ensure_defaults('replica')
+        connections.prepare_test_settings('replica')
+        call_command('migrate', database='replica', verbosity=0)
+        Alumno.objects.using('replica').create(
+            nombre='Rita', apellidoPaterno='Ruiz', apellidoMaterno='Ruiz', correoInstitucional='rita@secundaria.edu.mx',
+            curp='RURR00000000000000', sexo='M', escuelaProcedencia='Primaria', gradoGrupoAsignado='1A',
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica'].close()
+        del connections._connections.replica
+        del connections.databases['replica']
+        shutil.rmtree(cls.directory)
+        super().tearDownClass()
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaRoutingTests(ReplicaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        factories.student(0, nombre='Ana')
+
+    def setUp(self):
+        cache.clear()
+        caches['default'].clear()
+        patcher = mock.patch.object(routers, 'health', routers.Health())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, query):
+        response = self.client.post('/graphql/', json.dumps({'query': query}), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def names(self, response):
+        return [edge['node']['nombre'] for edge in response.json()['data']['students']['edges']]
+
+    def routed(self):
+        return {labels['database']: value for labels, value in routers.routed.collect()}
+
+    def test_queries_read_from_the_replica(self):
+        before = self.routed()
+        self.assertEqual(self.names(self.post(QUERY)), ['Rita'])
+        self.assertEqual(self.routed()['replica'], before.get('replica', 0) + 1)
+
+    @override_settings(DATABASE_REPLICAS=dict(REPLICAS, WEIGHTS={}))
+    def test_no_replicas(self):
+        self.assertEqual(self.names(self.post(QUERY)), ['Ana'])
+
+    def test_mutations_pin_the_client_to_the_primary(self):
+        response = self.post(MUTATION)
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
+        self.assertEqual(Alumno.objects.using('replica').filter(nombre='Eva').count(), 0)
+        self.assertEqual(self.names(self.post(QUERY)), ['Ana', 'Eva'])
+        # The pin expires with the cookie.
+        del self.client.cookies[routers.PIN_COOKIE]
+        self.assertEqual(self.names(self.post(QUERY)), ['Rita'])
+
+    def test_pins_follow_the_user(self):
+        user = factories.user()
+        self.client.force_login(user)
+        self.post(MUTATION)
+        del self.client.cookies[routers.PIN_COOKIE]
+        self.assertEqual(self.names(self.post(QUERY)), ['Ana', 'Eva'])
+
+    def test_failing_replicas_are_ejected(self):
+        with mock.patch.object(connections['replica'], 'ensure_connection', side_effect=DatabaseError) as connect:
+            self.assertEqual(self.names(self.post(QUERY)), ['Ana'])
+            self.assertEqual(routers.health.ejected(), ['replica'])
+            self.assertEqual(self.names(self.post(QUERY)), ['Ana'])
+        self.assertEqual(connect.call_count, 1)
+
+    def test_batch_queries_after_a_mutation_read_the_primary(self):
+        response = self.client.post('/graphql/', json.dumps([
+            {'query': QUERY}, {'query': MUTATION}, {'query': QUERY},
+        ]), content_type='application/json')
+        self.assertEqual(batch_names(response.json()), [['Rita'], None, ['Ana', 'Eva']])
+
+    @override_settings(GRAPHQL_RESPONSE_CACHE={'ENABLED': True, 'CACHE': 'default', 'TIMEOUT': 300})
+    def test_only_primary_reads_are_cached(self):
+        hits = response_cache.hits
+        self.post(QUERY)
+        self.assertEqual(self.names(self.post(QUERY)), ['Rita'])
+        self.assertEqual(response_cache.hits, hits)
+
+        self.client.cookies[routers.PIN_COOKIE] = '9999999999'
+        self.post(QUERY)
+        self.assertEqual(self.names(self.post(QUERY)), ['Ana'])
+        self.assertEqual(response_cache.hits, hits + 1)
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class AsyncBatchRoutingTests(ReplicaMixin, TransactionTestCase):
+    def setUp(self):
+        factories.student(0, nombre='Ana')
+        patcher = mock.patch.object(routers, 'health', routers.Health())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_queries_after_a_mutation_read_the_primary(self):
+        # The two queries after the mutation run in parallel.
+        status, content = await post('/graphql/async/', json.dumps([
+            {'query': QUERY}, {'query': MUTATION}, {'query': QUERY}, {'query': QUERY},
+        ]).encode())
+        self.assertEqual(status, 200)
+        self.assertEqual(batch_names(json.loads(content)), [['Rita'], None, ['Ana', 'Eva'], ['Ana', 'Eva']])
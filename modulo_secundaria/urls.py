@@ -14,12 +14,21 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path
+from django.urls import include, path
 from django.views.decorators.csrf import csrf_exempt
-from graphene_django.views import GraphQLView
+
+from easyenroll.views import export_enrollments, serve_document, upload_document
+from modulo_secundaria.metrics import metrics_view
+from modulo_secundaria.views import AsyncGraphQLView, GraphQLView
 
 
 urlpatterns = [
    path('admin/', admin.site.urls),
    path('graphql/', csrf_exempt(GraphQLView.as_view(graphiql=True))),
+   path('graphql/async/', AsyncGraphQLView.as_view()),
+   path('export/enrollments/', export_enrollments, name='export-enrollments'),
+   path('documents/', upload_document, name='upload-document'),
+   path('documents/<str:content_id>/', serve_document, name='document'),
+   path('metrics/', metrics_view, name='metrics'),
+   path('health/', include('health_check.urls')),
 ]
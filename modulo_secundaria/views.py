@@ -0,0 +1,281 @@
+import asyncio
+import json
+import threading
+from functools import partial
+
+from django.http import HttpResponse, HttpResponseBadRequest
+from graphene_django.views import GraphQLView as BaseGraphQLView, HttpError
+from graphql.execution import ExecutionResult
+
+from . import concurrency, instrumentation, metrics, query_cost, response_cache, routers
+from .documents import document_backend, persisted_queries
+
+
+class InFlight:
+    """Count the GraphQL requests executing right now, and the most seen at once."""
+
+    def __init__(self):
+        self.current = self.peak = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc_info):
+        with self._lock:
+            self.current -= 1
+
+    def reset_peak(self):
+        with self._lock:
+            self.peak = self.current
+
+
+in_flight = InFlight()
+metrics.register(
+    'graphql_requests_in_flight', 'GraphQL requests executing in this process.',
+    'gauge', lambda: in_flight.current,
+)
+
+
+def persisted_query_hash(request, data):
+    extensions = request.GET.get('extensions') or data.get('extensions')
+    if isinstance(extensions, str):
+        try:
+            extensions = json.loads(extensions)
+        except ValueError:
+            raise HttpError(HttpResponseBadRequest('Extensions are invalid JSON.'))
+    if not isinstance(extensions, dict):
+        return None
+    persisted = extensions.get('persistedQuery')
+    if not isinstance(persisted, dict):
+        return None
+    return persisted.get('sha256Hash')
+
+
+class GraphQLView(BaseGraphQLView):
+    """GraphQLView with cached documents, persisted queries, cost limits, cached query
+    results and replica reads."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('backend', document_backend)
+        super().__init__(*args, **kwargs)
+        # id() of each batched operation -> its QueryCost, analyzed once while planning.
+        self.planned_costs = {}
+
+    def dispatch(self, request, *args, **kwargs):
+        with in_flight:
+            if self.is_batch(request):
+                response = self.dispatch_batch(request)
+            else:
+                response = super().dispatch(request, *args, **kwargs)
+        if getattr(request, 'ran_mutation', False):
+            routers.pin(request, response)
+        return response
+
+    def is_batch(self, request):
+        return (
+            request.method == 'POST' and self.get_content_type(request) == 'application/json'
+            and request.body.lstrip()[:1] == b'['
+        )
+
+    def dispatch_batch(self, request):
+        """Execute a JSON array of operations with one shared request context.
+
+        Results come back in the order of the operations, each with its own
+        "status", in a 200 response like graphene's batch mode; only a batch
+        over the size or combined cost limits is rejected as a whole.
+        """
+        self.batch = True
+        try:
+            entries = self.parse_body(request)
+            try:
+                query_cost.check_batch_size(len(entries))
+                plan = [self.plan_batch_entry(request, entry) for entry in entries]
+                query_cost.check_batch_cost(sum(cost.cost for operation_type, cost in plan if cost is not None))
+            except query_cost.QueryCostError as error:
+                raise HttpError(HttpResponseBadRequest(str(error)))
+            self.planned_costs = {id(entry): cost for entry, (operation_type, cost) in zip(entries, plan)}
+            responses = self.execute_batch(request, entries, [operation_type for operation_type, cost in plan])
+        except HttpError as e:
+            response = e.response
+            response['Content-Type'] = 'application/json'
+            response.content = self.json_encode(request, {'errors': [self.format_error(e)]})
+            return response
+        return HttpResponse(
+            content='[{}]'.format(','.join(result for result, status_code in responses)),
+            content_type='application/json',
+        )
+
+    def plan_batch_entry(self, request, entry):
+        """The operation type and QueryCost of one batched operation; (None, None) if it cannot run."""
+        if not isinstance(entry, dict):
+            return None, None
+        try:
+            query, variables, operation_name, id = self.get_graphql_params(request, entry)
+        except HttpError:
+            return None, None
+        document = self.get_document(request, query)
+        if document is None or getattr(document, 'validation_errors', None):
+            return None, None
+        cost = query_cost.analyze(self.schema, document.document_ast, operation_name, variables)
+        return document.get_operation_type(operation_name), cost
+
+    def execute_batch(self, request, entries, operation_types):
+        return [self.get_batch_response(request, entry) for entry in entries]
+
+    def get_batch_response(self, request, entry):
+        # One bad operation fails alone instead of failing the whole batch.
+        try:
+            if not isinstance(entry, dict):
+                raise HttpError(HttpResponseBadRequest('Batched operations must be JSON objects.'))
+            return self.get_response(request, entry)
+        except HttpError as e:
+            status_code = e.response.status_code
+            result = {'errors': [self.format_error(e)], 'status': status_code}
+            if isinstance(entry, dict):
+                result['id'] = entry.get('id')
+            return self.json_encode(request, result), status_code
+
+    def get_graphql_params(self, request, data):
+        query, variables, operation_name, id = super().get_graphql_params(request, data)
+        if not query:
+            sha256 = persisted_query_hash(request, data)
+            if sha256:
+                query = persisted_queries.get(sha256)
+                if query is None:
+                    raise HttpError(HttpResponseBadRequest('PersistedQueryNotFound'))
+        return query, variables, operation_name, id
+
+    def get_response(self, request, data, show_graphiql=False):
+        # Same as graphene-django's, plus the result's "extensions".
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+        execution_result = self.execute_graphql_request(
+            request, data, query, variables, operation_name, show_graphiql
+        )
+        if not execution_result:
+            return None, 200
+
+        status_code = 200
+        response = {}
+        if execution_result.errors:
+            response['errors'] = [self.format_error(e) for e in execution_result.errors]
+        if execution_result.invalid:
+            status_code = 400
+        else:
+            response['data'] = execution_result.data
+        if execution_result.extensions:
+            response['extensions'] = execution_result.extensions
+        if self.batch:
+            response['id'] = id
+            response['status'] = status_code
+        return self.json_encode(request, response, pretty=show_graphiql), status_code
+
+    def execute_graphql_request(self, request, data, query, variables, operation_name, show_graphiql=False):
+        document = self.get_document(request, query)
+        extensions = {}
+        key = None
+        if document is not None and not getattr(document, 'validation_errors', None):
+            if id(data) in self.planned_costs:
+                cost = self.planned_costs[id(data)]
+            else:
+                cost = query_cost.analyze(self.schema, document.document_ast, operation_name, variables)
+            if cost is not None:
+                extensions['cost'] = cost.as_dict()
+                try:
+                    query_cost.check(cost, request)
+                except query_cost.QueryCostError as error:
+                    return ExecutionResult(errors=[error], invalid=True, extensions=extensions)
+            key = self.response_cache_key(request, document, variables, operation_name)
+            if key is not None:
+                cached = response_cache.fetch(key)
+                if cached is not None:
+                    return ExecutionResult(data=cached, extensions=extensions)
+
+        operation_type = document.get_operation_type(operation_name) if document is not None else None
+        replica = routers.replica_for(request) if operation_type == 'query' else None
+        profile = instrumentation.start(request)
+        with routers.reads_from(replica), instrumentation.capture_sql(profile):
+            result = super().execute_graphql_request(request, data, query, variables, operation_name, show_graphiql)
+        if operation_type == 'mutation':
+            request.ran_mutation = True
+        if profile is not None:
+            instrumentation.finish(profile, request, document, operation_name, operation_type, result)
+        if result is not None:
+            result.extensions.update(extensions)
+            # A replica may lag behind the versions the key was built from, so
+            # only results read from the primary are stored.
+            if key is not None and replica is None and not result.errors and not result.invalid:
+                response_cache.store(key, result.data)
+        return result
+
+    def get_document(self, request, query):
+        if not query:
+            return None
+        try:
+            return self.get_backend(request).document_from_string(self.schema, query)
+        except Exception:
+            # Let the regular execution path report the error.
+            return None
+
+    def response_cache_key(self, request, document, variables, operation_name):
+        if not response_cache.enabled() or getattr(document, 'validation_errors', None):
+            return None
+        if document.get_operation_type(operation_name) != 'query':
+            return None
+        return response_cache.response_key(self.schema, document, operation_name, variables, getattr(request, 'user', None))
+
+
+class AsyncGraphQLView(GraphQLView):
+    """GraphQLView for ASGI.
+
+    Requests run on a bounded thread pool instead of tying up the event loop;
+    the queries of a batch and the root fields of a query run concurrently on
+    further pools. See GRAPHQL_ASYNC in settings.
+    """
+
+    def get_backend(self, request):
+        return concurrency.ConcurrentDocumentBackend(super().get_backend(request))
+
+    def execute_batch(self, request, entries, operation_types):
+        # Consecutive queries run in parallel, each with a FieldContext over the
+        # request; anything else runs alone, in order, with the request itself.
+        pending = []
+        responses = []
+        for entry, operation_type in zip(entries, operation_types):
+            if operation_type == 'query':
+                pending.append(entry)
+                continue
+            responses.extend(self.execute_parallel(request, pending))
+            pending = []
+            responses.append(self.get_batch_response(request, entry))
+        responses.extend(self.execute_parallel(request, pending))
+        return responses
+
+    def execute_parallel(self, request, entries):
+        if len(entries) < 2:
+            return [self.get_batch_response(request, entry) for entry in entries]
+        futures = [
+            concurrency.submit('BATCH_THREADS', self.get_batch_response, concurrency.FieldContext(request), entry)
+            for entry in entries
+        ]
+        return [future.result() for future in futures]
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+
+        async def async_view(request, *args, **kwargs):
+            # Not sync_to_async(executor=...): that argument needs a newer
+            # asgiref than Django 3.1 requires.
+            future = concurrency.submit('REQUEST_THREADS', partial(view, **kwargs), request, *args)
+            return await asyncio.wrap_future(future)
+
+        async_view.view_class = cls
+        async_view.view_initkwargs = initkwargs
+        # Exempt like the synchronous route; csrf_exempt() would turn this
+        # coroutine function into a plain one.
+        async_view.csrf_exempt = True
+        return async_view
+
@@ -1,10 +1,17 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 
 import graphene
-from graphene_django import DjangoObjectType
+from graphql import GraphQLError
 
+from modulo_secundaria.bulk import BulkError, bulk_errors
+from modulo_secundaria.optimizer import OptimizedDjangoObjectType
+from modulo_secundaria.pagination import KeysetConnectionField
 
-class UserType(DjangoObjectType):
+from .provisioning import provision
+
+
+class UserType(OptimizedDjangoObjectType):
     class Meta:
         model = get_user_model()
 
@@ -28,11 +35,34 @@ class CreateUser(graphene.Mutation):
         return CreateUser(user=user)
 
 
+class UserInput(graphene.InputObjectType):
+    username = graphene.String(required=True)
+    password = graphene.String(required=True)
+    email = graphene.String(required=True)
+
+
+class CreateUsuariosBulk(graphene.Mutation):
+    users = graphene.List(UserType)
+    errors = graphene.List(BulkError)
+
+    class Arguments:
+        input = graphene.List(graphene.NonNull(UserInput), required=True)
+        all_or_nothing = graphene.Boolean(default_value=False)
+
+    def mutate(self, info, input, all_or_nothing):
+        limit = getattr(settings, 'GRAPHQL_MAX_BULK_USERS', 500)
+        if len(input) > limit:
+            raise GraphQLError('createUsers takes at most %d users per call.' % limit)
+        users, errors = provision([dict(item) for item in input], all_or_nothing)
+        return CreateUsuariosBulk(users=users, errors=bulk_errors(errors))
+
+
 class Mutation(graphene.ObjectType):
     create_user = CreateUser.Field()
+    create_users = CreateUsuariosBulk.Field()
 
 class Query(graphene.ObjectType):
-    users = graphene.List(UserType)
+    users = KeysetConnectionField(UserType)
 
     def resolve_users(self, info):
         return get_user_model().objects.all()
\ No newline at end of file
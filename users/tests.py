@@ -0,0 +1,91 @@
+import json
+from unittest import mock
+
+from django.contrib.auth import authenticate, get_user_model
+from django.test import TestCase, override_settings
+
+from .provisioning import hash_passwords, provision
+
+MUTATION = '''mutation ($input: [UserInput!]!, $allOrNothing: Boolean) {
+    createUsers(input: $input, allOrNothing: $allOrNothing) { users { id username email } errors { index field messages } }
+}'''
+
+
+def row(username, **fields):
+    return dict({'username': username, 'password': 'secret-%s' % username, 'email': '%s@example.com' % username}, **fields)
+
+
+class CreateUsersTests(TestCase):
+    def post(self, rows, all_or_nothing=False):
+        response = self.client.post('/graphql/', json.dumps({
+            'query': MUTATION, 'variables': {'input': rows, 'allOrNothing': all_or_nothing},
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']['createUsers']
+
+    def test_created_users_can_log_in(self):
+        # Two processes hash the passwords, as on a multi-core server.
+        with mock.patch('users.provisioning.cpu_count', return_value=2):
+            result = self.post([row('ana'), row('luis')])
+        self.assertEqual([user['username'] for user in result['users']], ['ana', 'luis'])
+        self.assertEqual(result['errors'], [])
+        for username in ['ana', 'luis']:
+            user = authenticate(username=username, password='secret-' + username)
+            self.assertIsNotNone(user, username)
+            self.assertEqual(user.email, '%s@example.com' % username)
+        self.assertIsNone(authenticate(username='ana', password='secret-luis'))
+
+    def test_invalid_rows_are_reported_by_index(self):
+        get_user_model().objects.create(username='taken')
+        result = self.post([
+            row('ok'),
+            row('taken'),
+            row('bad name!', email='bad@example.com'),
+            row('ok'),
+            row('noemail', email='not an email'),
+        ])
+        self.assertEqual([user['username'] for user in result['users']], ['ok'])
+        self.assertEqual([(error['index'], error['field']) for error in result['errors']], [
+            (1, 'username'), (2, 'username'), (3, 'username'), (4, 'email'),
+        ])
+        self.assertEqual(result['errors'][0]['messages'], ['A user with that username already exists.'])
+        self.assertTrue(get_user_model().objects.get(username='ok').check_password('secret-ok'))
+
+    def test_all_or_nothing(self):
+        result = self.post([row('ana'), row('bad name!', email='bad@example.com')], all_or_nothing=True)
+        self.assertEqual((result['users'], [error['index'] for error in result['errors']]), ([], [1]))
+        self.assertFalse(get_user_model().objects.filter(username='ana').exists())
+
+    @override_settings(GRAPHQL_MAX_BULK_USERS=2)
+    def test_input_size_is_capped(self):
+        response = self.client.post('/graphql/', json.dumps({
+            'query': MUTATION, 'variables': {'input': [row('a'), row('b'), row('c')]},
+        }), content_type='application/json')
+        body = response.json()
+        self.assertEqual(body['errors'][0]['message'], 'createUsers takes at most 2 users per call.')
+        self.assertFalse(get_user_model().objects.exists())
+        self.assertEqual(len(self.post([row('a'), row('b')])['users']), 2)
+
+
+class ProvisionTests(TestCase):
+    def test_hashes_match_the_serial_ones(self):
+        hashes = hash_passwords(['uno', 'dos', 'tres'], workers=2)
+        user = get_user_model()()
+        for password, encoded in zip(['uno', 'dos', 'tres'], hashes):
+            user.password = encoded
+            self.assertTrue(user.check_password(password))
+
+    def test_one_worker_hashes_in_process(self):
+        with mock.patch('users.provisioning._executor') as executor:
+            created, errors = provision([row('ana'), row('luis')], workers=1)
+        executor.assert_not_called()
+        self.assertEqual((len(created), errors), (2, []))
+
+    def test_rejected_rows_are_not_hashed(self):
+        get_user_model().objects.create(username='taken')
+        with mock.patch('users.provisioning.hash_passwords', wraps=hash_passwords) as hashed:
+            created, errors = provision([row('ok'), row('taken'), row('bad name!', email='bad@example.com')], workers=1)
+            self.assertEqual(hashed.call_args[0][0], ['secret-ok'])
+            provision([row('ana'), row('bad name!', email='bad@example.com')], all_or_nothing=True, workers=1)
+        self.assertEqual(hashed.call_count, 1)
+        self.assertEqual(([user.username for user in created], [error[0] for error in errors]), (['ok'], [1, 2]))